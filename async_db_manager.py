@@ -0,0 +1,339 @@
+import asyncio
+import time
+import weakref
+import aiohttp
+import config
+import models
+from config import api_url
+from http_transport import HTTPTransport
+from circuit_breaker import breakers as default_breakers, CircuitOpenError
+from metrics import metrics as default_metrics
+from single_flight import SingleFlight
+from db_manager import APIClient
+
+
+class AsyncAPIClient:
+    """
+    Асинхронний клієнт API з тим самим набором методів, що й APIClient.
+
+    Для кожного циклу подій тримає одну спільну сесію aiohttp з пулом keep-alive з'єднань,
+    тому один цикл подій обслуговує тисячі одночасних запитів.
+    Однакові одночасні GET-запити об'єднуються в один. Кошики та профілі користувачів читаються
+    з кешів APIClient і оновлюються в них, тож обидва клієнти бачать ті самі дані. Каталог
+    віддається кешем каталогу APIClient (з індексом, знімком і застарілими даними під час
+    збоїв API); блокуючі звернення до нього виконуються поза циклом подій.
+    """
+
+    timeouts = dict(config.api_timeouts)
+    single_flight = SingleFlight()
+    breakers = default_breakers
+    metrics = default_metrics
+    _sessions = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def session(cls):
+        """
+        Повертає спільну сесію aiohttp для поточного циклу подій, створюючи її за потреби.
+
+        Returns:
+            aiohttp.ClientSession: Сесія з пулом з'єднань.
+        """
+        loop = asyncio.get_running_loop()
+        session = cls._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=config.api_async_pool_limit)
+            session = aiohttp.ClientSession(connector=connector)
+            cls._sessions[loop] = session
+        return session
+
+    @classmethod
+    async def close(cls):
+        """
+        Закриває сесію поточного циклу подій.
+        """
+        session = cls._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+    @classmethod
+    async def _get(cls, endpoint, url, decode=None):
+        """
+        Виконує GET-запит, об'єднуючи його з однаковими запитами, що вже виконуються.
+        """
+        return await cls.single_flight.do_async(url, lambda: cls._request("GET", endpoint, url, decode=decode))
+
+    @classmethod
+    async def _request(cls, method, endpoint, url, decode=None, check_status=False, **kwargs):
+        """
+        Виконує запит з тайм-аутом групи запитів та повторює ідемпотентні запити з затримкою.
+
+        Parameters:
+            method (str): HTTP-метод.
+            endpoint (str): Назва логічної групи запитів (menu, details, cart, user, order).
+            url (str): Повна адреса запиту.
+            decode (callable, optional): Перетворює розібраний JSON на модель з models.
+            check_status (bool): Вимагати відповідь 2xx (для записів, які інакше вважались би виконаними).
+
+        Returns:
+            Розібрана відповідь сервера.
+
+        Raises:
+            CircuitOpenError: Якщо запобіжник групи запитів розімкнений.
+            aiohttp.ClientResponseError: Якщо check_status і сервер відповів не 2xx.
+        """
+        connect, read = cls.timeouts.get(endpoint, cls.timeouts['default'])
+        timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        attempts = config.api_retries + 1 if method in HTTPTransport.IDEMPOTENT_METHODS else 1
+        breaker = cls.breakers.get(endpoint)
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                breaker.allow()
+            except CircuitOpenError:
+                cls.metrics.increment('api.rejected', endpoint=endpoint)
+                raise
+            started = time.monotonic()
+            recorded = False
+            try:
+                async with cls.session().request(method, url, timeout=timeout, **kwargs) as response:
+                    body = await response.read()
+                    duration = time.monotonic() - started
+                    breaker.record(duration, ok=response.status < 500)
+                    recorded = True
+                    cls.metrics.record_request(endpoint, method, response.status, duration,
+                                               payload_bytes=len(body), retries=1 if attempt else 0)
+                    if last_attempt or response.status not in HTTPTransport.RETRY_STATUSES:
+                        if check_status and not 200 <= response.status < 300:
+                            raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                              status=response.status, message=response.reason)
+                        data = models.loads(body)
+                        return data if decode is None else decode(data)
+            except BaseException as e:
+                if not recorded:
+                    # Будь-яка помилка до отримання відповіді (зокрема скасування задачі) завершує
+                    # пробний виклик напіввідкритого запобіжника, інакше група запитів лишиться заблокованою
+                    duration = time.monotonic() - started
+                    breaker.record(duration, ok=False)
+                    cls.metrics.record_request(endpoint, method, type(e).__name__, duration,
+                                               retries=1 if attempt else 0)
+                retryable = isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError)) and not recorded
+                if last_attempt or not retryable:
+                    raise
+            await asyncio.sleep(config.api_backoff_factor * (2 ** attempt))
+
+    @classmethod
+    async def gather(cls, *calls):
+        """
+        Виконує незалежні запити одночасно.
+
+        Parameters:
+            *calls: Корутини методів клієнта.
+
+        Returns:
+            list: Результати у порядку переданих викликів.
+        """
+        return list(await asyncio.gather(*calls))
+
+    @classmethod
+    async def get_cart_and_user(cls, user_id):
+        """
+        Одночасно отримує кошик та дані користувача.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+
+        Returns:
+            list: Вміст кошика та інформація про користувача.
+        """
+        return await cls.gather(cls.get_cart(user_id), cls.get_user(user_id))
+
+    @classmethod
+    async def get_menu(cls):
+        """
+        Отримує меню ресторану.
+
+        Returns:
+            list[Product]: Товари меню.
+        """
+        return await asyncio.to_thread(APIClient.get_menu)
+
+    @classmethod
+    async def get_pizza_details(cls, pizza_name):
+        """
+        Отримує деталі товару за назвою з кешу каталогу.
+
+        Parameters:
+            pizza_name (str): Назва товару.
+
+        Returns:
+            Product: Товар або None, якщо його не знайдено.
+        """
+        return await asyncio.to_thread(APIClient.get_pizza_details, pizza_name)
+
+    @classmethod
+    async def get_pizza_details_by_id(cls, product_id):
+        """
+        Отримує деталі товару за ID з індексу каталогу.
+
+        Parameters:
+            product_id (int): Унікальний ID товару.
+
+        Returns:
+            Product: Товар або None, якщо його не знайдено.
+        """
+        return await asyncio.to_thread(APIClient.get_pizza_details_by_id, product_id)
+
+    @classmethod
+    async def add_to_cart(cls, user_id, product_id):
+        """
+        Одразу записує товар у кошик користувача, минаючи чергу відкладеного запису,
+        та скидає дзеркало кошика.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+            product_id (int): Унікальний ID товару.
+
+        Returns:
+            dict: Відповідь сервера у форматі JSON.
+
+        Raises:
+            aiohttp.ClientResponseError: Якщо сервер відповів не 2xx.
+        """
+        data = {'user_id': user_id, 'product_id': product_id}
+        try:
+            return await cls._request("POST", "cart", f"{api_url}/cart/add", json=data, check_status=True)
+        finally:
+            APIClient.carts.invalidate(user_id)
+
+    @classmethod
+    async def get_cart(cls, user_id):
+        """
+        Отримує вміст кошика користувача з дзеркала APIClient або з API, попередньо записавши
+        відкладені додавання товарів.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+
+        Returns:
+            list[CartLine]: Вміст кошика.
+        """
+        if APIClient.cart_writes.pending(user_id):
+            # Запис відкладених товарів блокуючий, тому виконується поза циклом подій
+            await asyncio.to_thread(APIClient.cart_writes.flush, user_id)
+        rows = APIClient.carts.get(user_id)
+        if rows is None:
+            rows = await cls._get("cart", f"{api_url}/cart/{user_id}", models.cart_lines)
+            APIClient.carts.set(user_id, rows)
+        return rows
+
+    @classmethod
+    async def clear_cart(cls, user_id):
+        """
+        Очищає кошик користувача; дзеркало кошика стає порожнім лише після відповіді 2xx.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+
+        Returns:
+            dict: Відповідь сервера про результат очищення кошика.
+
+        Raises:
+            aiohttp.ClientResponseError: Якщо сервер відповів не 2xx.
+        """
+        if APIClient.cart_writes.pending(user_id):
+            await asyncio.to_thread(APIClient.cart_writes.flush, user_id)
+        try:
+            result = await cls._request("DELETE", "cart", f"{api_url}/cart/clear/{user_id}", check_status=True)
+        except Exception:
+            APIClient.carts.invalidate(user_id)
+            raise
+        APIClient.carts.set(user_id, [])
+        return result
+
+    @classmethod
+    async def get_user(cls, user_id):
+        """
+        Отримує профіль користувача з кешу APIClient або з API.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+
+        Returns:
+            UserProfile: Профіль користувача або None, якщо користувача не знайдено.
+        """
+        user = APIClient.users.get(user_id)
+        if user is None:
+            user = await cls._get("user", f"{api_url}/user/{user_id}", models.UserProfile.from_json)
+            if user:
+                APIClient.users.set(user_id, user)
+        return user
+
+    @classmethod
+    async def add_user(cls, user_id, username, firstname, lastname):
+        """
+        Реєструє нового користувача в системі.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+            username (str): Логін користувача.
+            firstname (str): Ім'я користувача.
+            lastname (str): Прізвище користувача.
+
+        Returns:
+            dict: Відповідь сервера у форматі JSON.
+        """
+        data = {'user_id': user_id, 'username': username, 'firstname': firstname, 'lastname': lastname}
+        try:
+            return await cls._request("POST", "user", f"{api_url}/user/add", json=data)
+        finally:
+            APIClient.users.invalidate(user_id)
+
+    @classmethod
+    async def update_user_contact(cls, user_id, phone_number=None, location=None):
+        """
+        Оновлює контактні дані користувача та його кешований профіль.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+            phone_number (str, optional): Новий телефонний номер користувача.
+            location (str, optional): Нова адреса користувача.
+
+        Returns:
+            dict: Відповідь сервера про результат оновлення даних.
+
+        Raises:
+            aiohttp.ClientResponseError: Якщо сервер відповів не 2xx.
+        """
+        data = {'user_id': user_id, 'phone_number': phone_number, 'location': location}
+        try:
+            result = await cls._request("PATCH", "user", f"{api_url}/user/update/contact", json=data,
+                                        check_status=True)
+        except Exception:
+            APIClient.users.invalidate(user_id)
+            raise
+        APIClient._refresh_user_contact(user_id, phone_number, location)
+        return result
+
+    @classmethod
+    async def create_order(cls, user_id, phone_number, order_list, total_price, location, idempotency_key=None):
+        """
+        Створює нове замовлення.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+            phone_number (str): Телефонний номер для зв'язку.
+            order_list (list): Список товарів у замовленні.
+            total_price (float): Загальна сума замовлення.
+            location (str): Місце доставки замовлення.
+            idempotency_key (str, optional): Ключ ідемпотентності (заголовок Idempotency-Key).
+
+        Returns:
+            OrderReceipt: Підтвердження створення замовлення з його ID.
+
+        Raises:
+            aiohttp.ClientResponseError: Якщо сервер відповів не 2xx.
+        """
+        data = {'user_id': user_id, 'phone_number': phone_number, 'order_list': order_list, 'total_price': total_price, 'location': location}
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        return await cls._request("POST", "order", f"{api_url}/order/create", json=data, headers=headers,
+                                  decode=models.OrderReceipt.from_json, check_status=True)
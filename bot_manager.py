@@ -1,5 +1,46 @@
-from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, MessageHandler, Filters
+import asyncio
+import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from telegram import Update
+from telegram.error import NetworkError, TimedOut
+from telegram.ext import Updater, Dispatcher, JobQueue, CommandHandler, CallbackQueryHandler, MessageHandler, \
+    Filters, CallbackContext
+from telegram.utils.request import Request
+import config
 from command_factory import CommandFactory
+from db_manager import APIClient
+from async_db_manager import AsyncAPIClient
+from update_scheduler import UpdateScheduler, AsyncUpdateScheduler, update_key
+from webhook_server import WebhookServer
+from sqlite_persistence import SQLitePersistence
+from outbound_scheduler import ScheduledBot
+
+
+class SchedulingDispatcher(Dispatcher):
+    """
+    Диспетчер, що не обробляє оновлення у власному потоці, а розкладає їх по чергах
+    користувачів планувальника UpdateScheduler.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = UpdateScheduler(self.process_update_now)
+
+    def process_update(self, update):
+        if isinstance(update, Exception) or not hasattr(update, 'effective_user'):
+            # Помилки опитування та службові об'єкти диспетчер обробляє сам
+            self.process_update_now(update)
+            return
+        self.scheduler.submit(update_key(update), update)
+
+    def process_update_now(self, update):
+        """
+        Обробляє оновлення зареєстрованими обробниками в поточному потоці.
+        """
+        super().process_update(update)
 
 
 class BotManager:
@@ -7,36 +48,282 @@ class BotManager:
     Керує всіма аспектами бота Telegram, включаючи ініціалізацію та обробку повідомлень.
 
     Використовує CommandFactory для управління командами, що відповідають на різні типи запитів.
+    Може працювати у чотирьох режимах: 'threads' (Updater з пулом потоків), 'asyncio', в якому
+    оновлення обробляються одночасно в циклі подій з обмеженням кількості одночасних оновлень,
+    'webhook', в якому оновлення приймає вбудований HTTP-сервер, та 'processes', в якому
+    Supervisor розподіляє оновлення за ID користувача між робочими процесами, кожен з власним
+    BotManager. В усіх режимах
+    оновлення одного користувача обробляються по черзі, а різних - паралельно. Вихідні повідомлення
+    надсилаються через OutboundScheduler з урахуванням лімітів Telegram, тож обробники не чекають
+    їх доставки.
     """
 
-    def __init__(self, token):
+    def __init__(self, token, base_url=None, max_concurrent_updates=config.bot_max_concurrent_updates,
+                 persistence=None, outbound=None):
         """
         Керує всіма аспектами бота Telegram, включаючи ініціалізацію та обробку повідомлень.
 
         Використовує CommandFactory для управління командами, що відповідають на різні типи запитів.
+
+        Параметри:
+            token (str): Токен бота.
+            base_url (str, optional): Адреса Bot API (наприклад, підставного сервера для навантажувальних тестів).
+            max_concurrent_updates (int): Скільки оновлень одночасно обробляється в режимі asyncio.
+            persistence (BasePersistence, optional): Сховище стану користувачів; за замовчуванням
+                SQLitePersistence, тож стан оформлення замовлення переживає перезапуск бота.
+            outbound (OutboundScheduler, optional): Планувальник вихідних повідомлень; за замовчуванням
+                новий з лімітами з config.
         """
-        self.updater = Updater(token, use_context=True)
+        # Пул з'єднань до Bot API розрахований на всі потоки, що можуть одночасно звертатися до Bot API
+        bot = ScheduledBot(token, base_url=base_url, outbound=outbound,
+                           request=Request(con_pool_size=config.bot_io_workers + config.bot_outbound_workers + 4))
+        self.base_url = base_url
+        self.persistence = persistence or SQLitePersistence()
+        dispatcher = SchedulingDispatcher(bot, Queue(), job_queue=JobQueue(), use_context=True,
+                                          persistence=self.persistence)
+        dispatcher.job_queue.set_dispatcher(dispatcher)
+        self.updater = Updater(dispatcher=dispatcher, workers=None)
+        self.scheduler = dispatcher.scheduler
+        self.outbound = bot.outbound
+        APIClient.cart_write_dropped = self._cart_write_dropped
+        self.max_concurrent_updates = max_concurrent_updates
+        self.webhook = None
+        self._loop = None
+        self._stop_event = None
         self._register_handlers()
 
     def _register_handlers(self):
         """
         Реєструє обробники команд для різних типів повідомлень та запитів.
+
+        Ті самі обробники використовуються в режимі asyncio для вибору команди за оновленням.
         """
         self.factory = CommandFactory()
+        self.routes = [
+            (CommandHandler("start", self._callback("start")), "start"),
+            (CommandHandler("details", self._callback("details"), pass_args=True), "details"),
+            (CallbackQueryHandler(self._callback("button_handler")), "button_handler"),
+            (MessageHandler(Filters.contact, self._callback("got_phone_number")), "got_phone_number"),
+            (MessageHandler(Filters.location, self._callback("got_location")), "got_location"),
+        ]
         dispatcher = self.updater.dispatcher
-        dispatcher.add_handler(CommandHandler("start", lambda u, c: self.factory.get_command("start").execute(u, c)))
-        dispatcher.add_handler(
-            CommandHandler("details", lambda u, c: self.factory.get_command("details").execute(u, c), pass_args=True))
-        dispatcher.add_handler(
-            CallbackQueryHandler(lambda u, c: self.factory.get_command("button_handler").execute(u, c)))
-        dispatcher.add_handler(
-            MessageHandler(Filters.contact, lambda u, c: self.factory.get_command("got_phone_number").execute(u, c)))
-        dispatcher.add_handler(
-            MessageHandler(Filters.location, lambda u, c: self.factory.get_command("got_location").execute(u, c)))
-
-    def run(self):
+        for handler, _ in self.routes:
+            dispatcher.add_handler(handler)
+
+    def _callback(self, command_name):
+        return lambda u, c: self.factory.get_command(command_name).execute(u, c)
+
+    def _cart_write_dropped(self, user_id, items):
+        """
+        Повідомляє користувача, які саме додані ним товари так і не вдалося записати в кошик.
+
+        Параметри:
+            user_id (int): Унікальний ID користувача (у приватному чаті збігається з ID чату).
+            items (list): ID товарів, які не потрапили в кошик.
+        """
+        try:
+            catalog = APIClient.get_catalog()
+            rows = [catalog.by_id(product_id) for product_id in items]
+        except Exception as e:
+            logging.error(f"Cart write dropped catalog error: {e}", exc_info=True)
+            rows = [None] * len(items)
+        names = ', '.join(row.name if row else f"товар #{product_id}" for row, product_id in zip(rows, items))
+        self.updater.bot.send_message(chat_id=user_id, text=f"😔 Не вдалося додати в кошик: {names}. Спробуйте ще раз")
+
+    def warm_up(self):
+        """
+        Заповнює кеш каталогу зі знімка на диску і перевіряє його актуальність у фоні,
+        щоб перші запити меню після перезапуску обслуговувались без звернень до API.
+        """
+        APIClient.load_snapshot()
+        threading.Thread(target=APIClient.revalidate_catalog, name='catalog-revalidate', daemon=True).start()
+
+    def run(self, mode=config.bot_run_mode):
         """
         Запускає бота та входить в режим очікування повідомлень.
+        Після зупинки дочікується надсилання вихідних повідомлень, записує відкладені додавання
+        товарів у кошик, стан користувачів та зберігає знімок каталогу.
+
+        Параметри:
+            mode (str): Режим роботи: 'threads', 'asyncio' або 'webhook'. Режим 'processes'
+                запускається через Supervisor, без BotManager у батьківському процесі (див. main.py).
+
+        Піднімає:
+            ValueError: Для режиму 'processes'.
+        """
+        if mode == 'processes':
+            raise ValueError("Processes mode is run by Supervisor, not BotManager")
+        self.warm_up()
+        if mode == 'asyncio':
+            asyncio.run(self._run_until_signal())
+        elif mode == 'webhook':
+            stop_event = threading.Event()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda signum, frame: stop_event.set())
+            self.start_webhook()
+            stop_event.wait()
+            self.stop()
+        else:
+            self.start_polling()
+            self.updater.idle()
+            self.scheduler.stop()
+        self.outbound.stop()
+        APIClient.cart_writes.flush_all()
+        APIClient.save_snapshot()
+        self.persistence.close()
+
+    def start_polling(self, **kwargs):
+        """
+        Запускає потоки планувальника оновлень та довге опитування Updater (режим threads).
+
+        Параметри:
+            **kwargs: Аргументи Updater.start_polling.
+        """
+        self.scheduler.start()
+        self.updater.start_polling(**kwargs)
+
+    def start_webhook(self, url=config.bot_webhook_url, local=False, **server_options):
         """
-        self.updater.start_polling()
-        self.updater.idle()
+        Запускає вбудований сервер вебхука та реєструє вебхук у Telegram разом із секретним
+        токеном сервера (заданим або згенерованим, див. WebhookServer).
+
+        Параметри:
+            url (str): Публічна HTTPS-адреса вебхука (WEBHOOK_URL).
+            local (bool): Зареєструвати адресу самого сервера замість url (лише для підставного
+                Telegram у навантажувальних тестах).
+            **server_options: Параметри WebhookServer (host, port, path, secret_token, ...).
+
+        Піднімає:
+            ValueError: Якщо не задано публічну HTTPS-адресу вебхука.
+        """
+        if not local and not (url or '').startswith('https://'):
+            logging.error(f"Webhook URL must be a public HTTPS address (WEBHOOK_URL), got: {url}")
+            raise ValueError("WEBHOOK_URL must be set to a public HTTPS address in webhook mode")
+        self.scheduler.start()
+        self.webhook = WebhookServer(self.updater.dispatcher, **server_options).start()
+        if local:
+            host, port = self.webhook.server.server_address[:2]
+            url = f"http://{host}:{port}{self.webhook.path}"
+        self.updater.bot.set_webhook(url=url, max_connections=config.bot_webhook_max_connections,
+                                     api_kwargs={'secret_token': self.webhook.secret_token})
+
+    def serve_queue(self, inbox):
+        """
+        Обробляє оновлення, які надсилає супервізор (робочий процес режиму processes).
+
+        Параметри:
+            inbox (multiprocessing.Queue): Черга оновлень у вигляді JSON-словників; None - зупинка
+                після обробки вже отриманих оновлень.
+        """
+        self.scheduler.start()
+        dispatcher = self.updater.dispatcher
+        for data in iter(inbox.get, None):
+            dispatcher.process_update(Update.de_json(data, dispatcher.bot))
+        self.scheduler.stop()
+        self.outbound.stop()
+
+    def stop(self):
+        """
+        Зупиняє приймання оновлень (опитування або вебхук) та дочікується обробки оновлень,
+        що вже в черзі, і надсилання відповідей на них (режими threads та webhook).
+        """
+        if self.webhook is not None:
+            self.webhook.stop()
+            self.webhook = None
+        else:
+            self.updater.stop()
+        self.scheduler.stop()
+        self.outbound.stop()
+
+    async def _run_until_signal(self):
+        loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+        await self.serve_async(stop_event)
+
+    async def serve_async(self, stop_event=None, poll_timeout=config.bot_poll_timeout):
+        """
+        Отримує оновлення довгим опитуванням і обробляє їх одночасно в поточному циклі подій.
+
+        Нове оновлення береться в роботу лише тоді, коли кількість оновлень в обробці менша за
+        max_concurrent_updates, тож при перевантаженні бот просто повільніше забирає оновлення.
+        Оновлення одного користувача обробляються по черзі в порядку надходження.
+        Блокуючі виклики Bot API виконуються у власному пулі з bot_io_workers потоків.
+
+        Параметри:
+            stop_event (asyncio.Event, optional): Подія зупинки; після неї бот дочікується
+                завершення оновлень, що вже обробляються.
+            poll_timeout (int): Тайм-аут довгого опитування getUpdates у секундах.
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=config.bot_io_workers, thread_name_prefix='bot-io')
+        loop.set_default_executor(executor)
+        self._loop = loop
+        self._stop_event = stop_event or asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_concurrent_updates)
+        scheduler = AsyncUpdateScheduler(self.process_update_async)
+        bot = self.updater.bot
+        offset = None
+        try:
+            await asyncio.to_thread(bot.delete_webhook)
+            while not self._stop_event.is_set():
+                updates = await self._get_updates(bot, offset, poll_timeout)
+                for update in updates or ():
+                    offset = update.update_id + 1
+                    await semaphore.acquire()
+                    scheduler.submit(update_key(update), update, on_done=semaphore.release)
+            await scheduler.join()
+            await asyncio.to_thread(self.outbound.join)
+        finally:
+            await AsyncAPIClient.close()
+            executor.shutdown(wait=False)
+            self._loop = None
+
+    def stop_async(self):
+        """
+        Зупиняє serve_async; можна викликати з будь-якого потоку.
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def _get_updates(self, bot, offset, timeout):
+        """
+        Виконує один цикл довгого опитування, що переривається подією зупинки.
+        """
+        poll = asyncio.ensure_future(asyncio.to_thread(bot.get_updates, offset=offset, timeout=timeout))
+        stop = asyncio.ensure_future(self._stop_event.wait())
+        await asyncio.wait({poll, stop}, return_when=asyncio.FIRST_COMPLETED)
+        stop.cancel()
+        if not poll.done():
+            # Незавершений запит відкидається, оновлення буде отримано повторно після перезапуску
+            poll.add_done_callback(lambda future: future.cancelled() or future.exception())
+            return []
+        try:
+            return poll.result()
+        except (NetworkError, TimedOut) as e:
+            logging.error(f"Get updates error: {e}", exc_info=True)
+            await asyncio.sleep(1)
+            return []
+
+    async def process_update_async(self, update):
+        """
+        Знаходить команду для оновлення та виконує її асинхронний варіант.
+
+        Параметри:
+            update (Update): Оновлення від Telegram API.
+        """
+        dispatcher = self.updater.dispatcher
+        try:
+            for handler, command_name in self.routes:
+                check = handler.check_update(update)
+                if check is None or check is False:
+                    continue
+                context = CallbackContext.from_update(update, dispatcher)
+                handler.collect_additional_context(context, update, dispatcher, check)
+                await self.factory.get_command(command_name).execute_async(update, context)
+                break
+            # Запис стану користувача в SQLite блокуючий, тому виконується поза циклом подій
+            await asyncio.to_thread(dispatcher.update_persistence, update)
+        except Exception as e:
+            logging.error(f"Process update error: {e}", exc_info=True)
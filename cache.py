@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Потокобезпечний кеш з обмеженим розміром (витіснення LRU) та часом життя записів.
+
+    Застарілі записи не видаляються одразу: їх можна отримати через get_entry,
+    щоб віддавати застарілі дані, поки триває оновлення.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        """
+        Параметри:
+            maxsize (int): Максимальна кількість записів.
+            ttl (float): Час життя запису у секундах.
+            clock (callable): Джерело монотонного часу.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key):
+        """
+        Повертає запис разом з його віком, навіть якщо час життя минув.
+
+        Параметри:
+            key: Ключ запису.
+
+        Повертає:
+            tuple | None: Значення та вік запису у секундах, або None, якщо запису немає.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            value, stored_at = entry
+            return value, self.clock() - stored_at
+
+    def get(self, key, default=None):
+        """
+        Повертає значення, якщо запис існує і його час життя не минув.
+        """
+        entry = self.get_entry(key)
+        if entry is None or entry[1] >= self.ttl:
+            return default
+        return entry[0]
+
+    def set(self, key, value):
+        """
+        Зберігає значення, витісняючи найдавніше використаний запис при переповненні.
+        """
+        with self._lock:
+            self._data[key] = (value, self.clock())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self):
+        """
+        Повертає всі записи (включно із застарілими) від найдавніше до найнещодавніше використаного.
+
+        Повертає:
+            list: Пари (ключ, значення).
+        """
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._data.items()]
+
+    def invalidate(self, key):
+        """
+        Видаляє запис з кешу.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Очищає кеш.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,82 @@
+import base64
+import binascii
+import struct
+from typing import NamedTuple
+from callback_router import parse_id
+
+# Перший символ закодованих даних; назви товарів і службові callback_data з нього не починаються
+MARKER = '~'
+FORMAT_VERSION = 1
+
+# Коди дій: номер зберігається в callback_data, тому наявні коди не можна змінювати
+ACTIONS = {
+    'product_details': 1,
+    'add_to_cart': 2,
+}
+_COMMANDS = {code: command for command, code in ACTIONS.items()}
+
+# Версія формату, код дії, ID товару, версія каталогу
+_LAYOUT = struct.Struct('>BBIH')
+_ENCODED_LENGTH = len(MARKER) + len(base64.urlsafe_b64encode(bytes(_LAYOUT.size)).rstrip(b'='))
+
+
+class CallbackPayload(NamedTuple):
+    """
+    Розкодовані callback_data кнопки товару.
+    """
+    command: str
+    product_id: int
+    catalog_version: int = 0
+
+
+def encode(command, product_id, catalog_version=0):
+    """
+    Кодує дію з товаром у компактні callback_data (12 ASCII-символів незалежно від назви товару).
+
+    Параметри:
+        command (str): Назва команди з ACTIONS.
+        product_id (int): ID товару.
+        catalog_version (int): Версія каталогу, з якого побудовано кнопку (0 - невідома).
+
+    Повертає:
+        str: callback_data.
+    """
+    packed = _LAYOUT.pack(FORMAT_VERSION, ACTIONS[command], int(product_id), catalog_version & 0xFFFF)
+    return MARKER + base64.urlsafe_b64encode(packed).rstrip(b'=').decode('ascii')
+
+
+def decode(callback_data):
+    """
+    Розкодовує callback_data, створені encode.
+
+    Параметри:
+        callback_data (str): Дані натиснутої кнопки.
+
+    Повертає:
+        CallbackPayload: Дія з товаром або None, якщо дані не закодовані encode цієї версії формату.
+    """
+    if len(callback_data) != _ENCODED_LENGTH or not callback_data.startswith(MARKER):
+        return None
+    try:
+        version, action, product_id, catalog_version = _LAYOUT.unpack(
+            base64.urlsafe_b64decode(callback_data[len(MARKER):] + '='))
+    except (binascii.Error, struct.error, ValueError):
+        return None
+    command = _COMMANDS.get(action)
+    if version != FORMAT_VERSION or command is None:
+        return None
+    return CallbackPayload(command, product_id, catalog_version)
+
+
+def legacy_parser(command):
+    """
+    Повертає функцію розбору старих callback_data виду '<префікс><ID>' (кнопки з повідомлень,
+    надісланих до переходу на encode) у CallbackPayload.
+
+    Параметри:
+        command (str): Назва команди.
+    """
+    def parse(payload):
+        product_id = parse_id(payload)
+        return None if product_id is None else CallbackPayload(command, product_id)
+    return parse
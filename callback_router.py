@@ -0,0 +1,84 @@
+from typing import NamedTuple, Any
+
+
+class Route(NamedTuple):
+    """
+    Результат маршрутизації callback_data: назва команди та розібране корисне навантаження
+    (None для точних маршрутів).
+    """
+    command: str
+    payload: Any = None
+
+
+def parse_id(payload):
+    """
+    Розбирає числовий ID з callback_data.
+
+    Параметри:
+        payload (str): Частина callback_data після префікса.
+
+    Повертає:
+        int: ID або None, якщо payload не є невід'ємним цілим числом.
+    """
+    return int(payload) if payload.isdigit() else None
+
+
+class CallbackRouter:
+    """
+    Маршрутизатор callback_data кнопок до команд.
+
+    Закодовані дані (див. callback_codec) розпізнаються за першим символом, точні значення
+    шукаються у словнику, маршрути з префіксом - за частиною callback_data до останнього
+    роздільника '_' включно, тож пошук маршруту виконується за сталий час і без винятків.
+    Корисне навантаження префіксних маршрутів розбирається функцією маршруту; дані, що не
+    відповідають жодному маршруту, передаються маршруту за замовчуванням без змін.
+    """
+
+    SEPARATOR = '_'
+
+    def __init__(self, exact=(), prefixes=None, default=None, decoders=None):
+        """
+        Параметри:
+            exact (iterable): Назви команд, callback_data яких збігається з назвою.
+            prefixes (dict): Префікс (закінчується на '_') -> (назва команди, функція розбору payload).
+            default (str, optional): Команда для невідомих callback_data.
+            decoders (dict): Перший символ -> функція, що розкодовує callback_data у payload з полем
+                command (або повертає None).
+        """
+        self.decoders = decoders or {}
+        self.exact = {name: Route(name) for name in exact}
+        self.prefixes = {}
+        for prefix, (command, parse) in (prefixes or {}).items():
+            if not prefix.endswith(self.SEPARATOR):
+                raise ValueError(f"Route prefix must end with '{self.SEPARATOR}': {prefix}")
+            self.prefixes[prefix] = (command, parse)
+        self.default = default
+
+    def resolve(self, callback_data):
+        """
+        Знаходить маршрут для callback_data.
+
+        Параметри:
+            callback_data (str): Дані натиснутої кнопки.
+
+        Повертає:
+            Route: Маршрут або None, якщо маршрут не знайдено і маршрут за замовчуванням не заданий.
+        """
+        decoder = self.decoders.get(callback_data[:1])
+        if decoder is not None:
+            payload = decoder(callback_data)
+            if payload is not None:
+                return Route(payload.command, payload)
+        route = self.exact.get(callback_data)
+        if route is not None:
+            return route
+        head, separator, payload = callback_data.rpartition(self.SEPARATOR)
+        prefix = self.prefixes.get(head + separator)
+        if prefix is not None:
+            command, parse = prefix
+            value = parse(payload)
+            if value is not None:
+                return Route(command, value)
+        if self.default is None:
+            return None
+        return Route(self.default, callback_data)
@@ -3,6 +3,7 @@ from telegram.ext import CallbackContext
 from prettytable import PrettyTable
 from command_base import CommandBase
 from db_manager import APIClient
+from circuit_breaker import CircuitOpenError
 import logging
 
 class AddToCartCommand(CommandBase):
@@ -31,6 +32,8 @@ class AddToCartCommand(CommandBase):
                                          reply_markup=reply_markup)
             else:
                 context.bot.send_message(chat_id=update.effective_chat.id, text="Товар не знайдено 😶‍🌫️")
+        except CircuitOpenError:
+            self.reply_unavailable(update, context)
         except Exception as e:
             logging.error(f"Add To Cart Command execute error: {e}", exc_info=True)
 
@@ -59,7 +62,7 @@ class OpenCartCommand(CommandBase):
 
             if rows:
                 output.add_rows(rows)
-                total = sum(row[2] for row in rows)
+                total = sum(row.total for row in rows)
                 context.bot.send_message(chat_id=update.effective_chat.id,
                                          text=f"<code>{output}</code>\n\n💵 <b>До сплати:</b> {total} грн",
                                          parse_mode='HTML',
@@ -67,6 +70,8 @@ class OpenCartCommand(CommandBase):
             else:
                 context.bot.send_message(chat_id=update.effective_chat.id, text='Наразі кошик пустий 😔',
                                          reply_markup=InlineKeyboardMarkup([[menu_button]]))
+        except CircuitOpenError:
+            self.reply_unavailable(update, context)
         except Exception as e:
             logging.error(f"Open Cart Command execute error: {e}", exc_info=True)
 
@@ -81,6 +86,9 @@ class CleanCartCommand(CommandBase):
         Параметри:
             update (Update): Об'єкт Update від Telegram API.
             context (CallbackContext): Контекст виконання команди.
+
+        Повертає:
+            bool: True, якщо кошик очищено, інакше None.
         """
         try:
             context.user_data['processing_order'] = False
@@ -89,5 +97,8 @@ class CleanCartCommand(CommandBase):
             menu_button = InlineKeyboardButton("📋 Переглянути меню", callback_data="menu")
             context.bot.send_message(chat_id=update.effective_chat.id, text="Кошик очищено 😔",
                                      reply_markup=InlineKeyboardMarkup([[menu_button]]))
+            return True
+        except CircuitOpenError:
+            self.reply_unavailable(update, context)
         except Exception as e:
             logging.error(f"Clean Cart Command execute error: {e}", exc_info=True)
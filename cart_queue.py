@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+import config
+from circuit_breaker import CircuitOpenError
+
+
+class CartWriteQueue:
+    """
+    Черга відкладеного запису (write-behind) для додавання товарів у кошик.
+
+    Натискання кнопки лише ставить товар у чергу користувача, а всі додавання, що накопичились
+    протягом короткого вікна, надсилаються до API однією пачкою у фоновому потоці. Перед читанням
+    кошика черга користувача скидається синхронно, тому користувач завжди бачить свої додавання.
+    Товари, які не вдалося записати за max_failures спроб, відкидаються і передаються on_dropped,
+    щоб користувача можна було про це повідомити. Поки запобіжник API розімкнений, запис
+    відкладається до його перевірки і не вважається невдалою спробою.
+    """
+
+    STRIPES = 64
+
+    def __init__(self, writer, window=config.cart_write_window, max_pending=config.cart_write_max_pending,
+                 max_failures=config.cart_write_max_failures, on_flushed=None, on_dropped=None):
+        """
+        Параметри:
+            writer (callable): Функція writer(user_id, product_id), що записує один товар у кошик через API.
+            window (float): Скільки секунд накопичувати додавання перед фоновим записом.
+            max_pending (int): Максимальна кількість відкладених товарів користувача; при перевищенні
+                черга користувача скидається одразу.
+            max_failures (int): Кількість невдалих спроб запису, після якої відкладені товари відкидаються.
+            on_flushed (callable): Викликається з user_id після запису товарів користувача.
+            on_dropped (callable): Викликається з user_id та списком ID товарів, відкинутих після
+                max_failures невдалих спроб запису.
+        """
+        self.writer = writer
+        self.window = window
+        self.max_pending = max_pending
+        self.max_failures = max_failures
+        self.on_flushed = on_flushed
+        self.on_dropped = on_dropped
+        self._pending = {}
+        self._due = {}
+        self._failures = {}
+        self._cond = threading.Condition()
+        # Записи одного користувача виконуються послідовно; смуги замків обмежують пам'ять
+        self._stripes = [threading.Lock() for _ in range(self.STRIPES)]
+        self._thread = None
+
+    def enqueue(self, user_id, product_id):
+        """
+        Ставить додавання товару в чергу користувача та повертається без звернення до API.
+
+        Параметри:
+            user_id (int): Унікальний ID користувача.
+            product_id (int): Унікальний ID товару.
+        """
+        with self._cond:
+            items = self._pending.setdefault(user_id, [])
+            items.append(product_id)
+            overflow = len(items) >= self.max_pending
+            if not overflow:
+                self._due.setdefault(user_id, time.monotonic() + self.window)
+                self._cond.notify()
+            self._ensure_worker()
+        if overflow:
+            self.flush(user_id)
+
+    def pending(self, user_id):
+        """
+        Повертає список відкладених товарів користувача.
+        """
+        with self._cond:
+            return list(self._pending.get(user_id, []))
+
+    def flush(self, user_id):
+        """
+        Синхронно записує всі відкладені товари користувача.
+
+        Якщо запис не вдався, незаписані товари повертаються в чергу для повторної спроби
+        у фоні, а помилка передається викликачу.
+
+        Параметри:
+            user_id (int): Унікальний ID користувача.
+        """
+        with self._stripes[hash(user_id) % self.STRIPES]:
+            with self._cond:
+                items = self._pending.pop(user_id, [])
+                self._due.pop(user_id, None)
+            if not items:
+                return
+            written = 0
+            try:
+                for product_id in items:
+                    self.writer(user_id, product_id)
+                    written += 1
+                with self._cond:
+                    self._failures.pop(user_id, None)
+            except Exception as e:
+                self._requeue(user_id, items[written:], e)
+                raise
+            finally:
+                if written and self.on_flushed:
+                    self.on_flushed(user_id)
+
+    def flush_all(self):
+        """
+        Записує відкладені товари всіх користувачів (наприклад, перед зупинкою бота).
+        """
+        with self._cond:
+            users = list(self._pending)
+        for user_id in users:
+            try:
+                self.flush(user_id)
+            except Exception as e:
+                logging.error(f"Cart write queue flush error: {e}", exc_info=True)
+
+    def _requeue(self, user_id, items, error):
+        with self._cond:
+            failures = self._failures.get(user_id, 0)
+            if isinstance(error, CircuitOpenError):
+                # Запит не дійшов до API: повтор після того, як запобіжник пропустить пробний запит
+                delay = max(error.retry_after, self.window)
+            else:
+                failures += 1
+                delay = self.window * (2 ** failures)
+            dropped = failures >= self.max_failures
+            if dropped:
+                self._failures.pop(user_id, None)
+            else:
+                self._failures[user_id] = failures
+                self._pending[user_id] = items + self._pending.get(user_id, [])
+                self._due[user_id] = time.monotonic() + delay
+                self._cond.notify()
+        if dropped:
+            logging.error(f"Cart write queue dropped {len(items)} item(s) for user {user_id} after {failures} failures")
+            if self.on_dropped:
+                try:
+                    self.on_dropped(user_id, items)
+                except Exception as e:
+                    logging.error(f"Cart write queue drop handler error: {e}", exc_info=True)
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="cart-write-queue", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """
+        Фоновий цикл: скидає черги користувачів, вікно накопичення яких минуло.
+        """
+        while True:
+            with self._cond:
+                while not self._due:
+                    self._cond.wait()
+                user_id, deadline = min(self._due.items(), key=lambda item: item[1])
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            try:
+                self.flush(user_id)
+            except Exception as e:
+                logging.error(f"Cart write queue flush error: {e}", exc_info=True)
@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import config
+import models
+from cache import TTLCache
+
+
+class CatalogIndex:
+    """
+    Індекс каталогу, побудований з одного запиту меню.
+
+    Дозволяє знаходити товар за назвою або за ID за O(1). Рядки меню мають ті самі
+    поля, що й деталі товару (models.Product). Версія - 16-бітна контрольна сума вмісту
+    меню, яка записується в callback_data кнопок товарів.
+    """
+
+    def __init__(self, rows):
+        """
+        Параметри:
+            rows (list[Product]): Товари меню, отримані з API.
+        """
+        self.rows = rows
+        self.version = zlib.crc32(models.dumps(rows or [])) & 0xFFFF
+        self._by_name = {}
+        self._by_id = {}
+        self.complete = True
+        for row in rows or []:
+            if row.id is None:
+                # Скорочений рядок (лише назва) - деталі доведеться отримувати окремо
+                self.complete = False
+                continue
+            self._by_name[row.name] = row
+            self._by_id[str(row.id)] = row
+
+    def by_name(self, pizza_name):
+        """
+        Повертає рядок товару за назвою або None.
+        """
+        return self._by_name.get(pizza_name)
+
+    def by_id(self, product_id):
+        """
+        Повертає рядок товару за ID або None.
+        """
+        return self._by_id.get(str(product_id))
+
+    def __len__(self):
+        return len(self._by_id)
+
+
+class CatalogCache:
+    """
+    Кеш каталогу (меню та деталей товарів) перед APIClient.
+
+    Записи живуть ttl секунд. За refresh_ahead секунд до закінчення часу життя запис оновлюється
+    у фоні, а поки оновлення триває, користувачі отримують застарілі дані. Деталі товарів
+    зберігаються в LRU-кеші обмеженого розміру.
+    """
+
+    MENU_KEY = 'menu'
+
+    def __init__(self, ttl=config.catalog_ttl, refresh_ahead=config.catalog_refresh_ahead,
+                 max_stale=config.catalog_max_stale, details_maxsize=config.catalog_details_maxsize, executor=None,
+                 clock=time.monotonic):
+        """
+        Параметри:
+            ttl (float): Час життя запису у секундах.
+            refresh_ahead (float): За скільки секунд до закінчення часу життя починати фонове оновлення.
+            max_stale (float): Скільки секунд після закінчення часу життя ще можна віддавати застарілі дані.
+            details_maxsize (int): Максимальна кількість збережених деталей товарів.
+            executor (Executor): Виконавець фонових оновлень.
+            clock (callable): Джерело монотонного часу.
+        """
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = max_stale
+        self.menu = TTLCache(maxsize=1, ttl=ttl, clock=clock)
+        self.details = TTLCache(maxsize=details_maxsize, ttl=ttl, clock=clock)
+        self._index = CatalogIndex([])
+        self._executor = executor
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get_menu(self, loader):
+        """
+        Повертає меню з кешу, завантажуючи його за допомогою loader за відсутності.
+        """
+        return self._get(self.menu, self.MENU_KEY, loader)
+
+    def get_index(self, loader):
+        """
+        Повертає індекс каталогу для поточного меню з кешу.
+
+        Індекс перебудовується лише тоді, коли в кеші з'являється нове меню.
+        """
+        rows = self.get_menu(loader)
+        index = self._index
+        if index.rows is not rows:
+            index = CatalogIndex(rows)
+            self._index = index
+        return index
+
+    def get_details(self, pizza_name, loader):
+        """
+        Повертає деталі товару за назвою з кешу.
+        """
+        return self._get(self.details, ('name', pizza_name), loader)
+
+    def get_details_by_id(self, product_id, loader):
+        """
+        Повертає деталі товару за ID з кешу.
+        """
+        return self._get(self.details, ('id', str(product_id)), loader)
+
+    def refresh_menu(self, loader):
+        """
+        Синхронно оновлює меню в кеші; помилка оновлення лише записується в лог.
+        """
+        self._refresh(self.menu, self.MENU_KEY, loader)
+
+    def export(self):
+        """
+        Повертає всі записи каталогу для збереження у знімок.
+
+        Повертає:
+            list: Пари (ключ, значення): меню під ключем MENU_KEY та деталі товарів
+            під ключами ('name', назва) або ('id', ID).
+        """
+        return self.menu.items() + self.details.items()
+
+    def restore(self, key, value):
+        """
+        Додає до кешу запис, відновлений зі знімка.
+
+        Параметри:
+            key: Ключ запису у форматі export.
+            value: Значення запису.
+        """
+        if key == self.MENU_KEY:
+            self.menu.set(key, value)
+        else:
+            self.details.set(tuple(key), value)
+
+    def clear(self):
+        """
+        Очищає кеш каталогу.
+        """
+        self.menu.clear()
+        self.details.clear()
+        self._index = CatalogIndex([])
+
+    def _get(self, store, key, loader):
+        """
+        Віддає запис з кешу та за потреби запускає його оновлення.
+
+        Свіжий запис повертається одразу; запис, час життя якого спливає або вже сплив
+        (але не більше ніж на max_stale), повертається одразу з фоновим оновленням.
+        За відсутності запису (або якщо він надто застарів) дані завантажуються синхронно.
+
+        Параметри:
+            store (TTLCache): Сховище записів.
+            key: Ключ запису.
+            loader (callable): Функція завантаження даних з API.
+
+        Повертає:
+            Дані з кешу або з API.
+        """
+        entry = store.get_entry(key)
+        if entry is None:
+            return self._load(store, key, loader)
+
+        value, age = entry
+        if age > self.ttl + self.max_stale:
+            try:
+                return self._load(store, key, loader)
+            except Exception as e:
+                logging.error(f"Catalog cache load error: {e}", exc_info=True)
+                return value
+        if age >= self.ttl - self.refresh_ahead:
+            self._schedule_refresh(store, key, loader)
+        return value
+
+    def _load(self, store, key, loader):
+        value = loader()
+        if value:
+            store.set(key, value)
+        return value
+
+    def _schedule_refresh(self, store, key, loader):
+        """
+        Запускає фонове оновлення запису, якщо воно ще не виконується.
+        """
+        with self._lock:
+            if (id(store), key) in self._refreshing:
+                return
+            self._refreshing.add((id(store), key))
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalog-refresh')
+        self._executor.submit(self._refresh, store, key, loader)
+
+    def _refresh(self, store, key, loader):
+        try:
+            self._load(store, key, loader)
+        except Exception as e:
+            logging.error(f"Catalog cache refresh error: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard((id(store), key))
@@ -0,0 +1,86 @@
+import logging
+import os
+import time
+import config
+import models
+
+
+class CatalogSnapshot:
+    """
+    Знімок каталогу на диску для швидкого старту бота.
+
+    Зберігає записи кешу каталогу разом з валідаторами (ETag/Last-Modified) у компактний
+    JSON-файл. Файл записується атомарно (тимчасовий файл + os.replace), тому навіть
+    при аварійній зупинці на диску лишається попередній або новий знімок, але не пошкоджений.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path=config.catalog_snapshot_path, max_age=config.catalog_ttl + config.catalog_max_stale):
+        """
+        Параметри:
+            path (str): Шлях до файлу знімка.
+            max_age (float): Максимальний вік знімка в секундах; старіший знімок не відновлюється,
+                бо кеш каталогу вже не віддав би такі дані навіть як застарілі.
+        """
+        self.path = path
+        self.max_age = max_age
+
+    def load(self, api_url):
+        """
+        Читає записи знімка.
+
+        Знімок іншої версії, іншого API (наприклад, після зміни API_URL) або старший за max_age
+        ігнорується.
+
+        Параметри:
+            api_url (str): Адреса API, для якої має бути зроблений знімок.
+
+        Повертає:
+            list: Записи знімка (словники з полями key, url, etag, last_modified, data);
+            порожній список, якщо знімка немає або його не вдалося прочитати.
+        """
+        try:
+            with open(self.path, 'rb') as file:
+                snapshot = models.loads(file.read())
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logging.error(f"Catalog snapshot load error: {e}", exc_info=True)
+            return []
+        if not isinstance(snapshot, dict) or snapshot.get('version') != self.VERSION \
+                or snapshot.get('api_url') != api_url:
+            return []
+        age = time.time() - (snapshot.get('saved_at') or 0)
+        if age > self.max_age:
+            logging.warning(f"Catalog snapshot ignored: saved {age:.0f}s ago")
+            return []
+        return snapshot.get('resources') or []
+
+    def save(self, api_url, resources):
+        """
+        Атомарно записує записи каталогу у файл знімка.
+
+        Параметри:
+            api_url (str): Адреса API, з якого отримано дані.
+            resources (list): Записи у форматі, що повертає load.
+
+        Повертає:
+            bool: True, якщо знімок записано.
+        """
+        snapshot = {'version': self.VERSION, 'api_url': api_url, 'saved_at': time.time(), 'resources': resources}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as file:
+                file.write(models.dumps(snapshot))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            logging.error(f"Catalog snapshot save error: {e}", exc_info=True)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from collections import deque
+import config
+
+
+class CircuitOpenError(Exception):
+    """
+    Виникає, коли запит до групи API відхилено, бо запобіжник розімкнений.
+
+    retry_after - скільки секунд запобіжник ще залишатиметься розімкненим (0, якщо вже виконується
+    пробний запит).
+    """
+
+    def __init__(self, endpoint, retry_after=0.0):
+        super().__init__(f"Circuit for '{endpoint}' endpoint is open")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Запобіжник для однієї логічної групи запитів до API.
+
+    Стежить за останніми window викликами. Якщо частка помилок або повільних викликів перевищує
+    поріг, запобіжник розмикається і протягом open_timeout секунд усі запити відхиляються одразу.
+    Після цього пропускається один пробний запит: успіх замикає запобіжник, невдача - розмикає знову.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window=config.breaker_window, min_calls=config.breaker_min_calls,
+                 error_rate=config.breaker_error_rate, slow_call_duration=config.breaker_slow_call_duration,
+                 slow_call_rate=config.breaker_slow_call_rate, open_timeout=config.breaker_open_timeout,
+                 clock=time.monotonic):
+        """
+        Параметри:
+            name (str): Назва групи запитів.
+            window (int): Кількість останніх викликів, за якими рахується статистика.
+            min_calls (int): Мінімальна кількість викликів у вікні для розмикання.
+            error_rate (float): Частка помилок, за якої запобіжник розмикається.
+            slow_call_duration (float): Тривалість у секундах, з якої виклик вважається повільним.
+            slow_call_rate (float): Частка повільних викликів, за якої запобіжник розмикається.
+            open_timeout (float): Скільки секунд запобіжник залишається розімкненим.
+            clock (callable): Джерело монотонного часу.
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.open_timeout = open_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self._calls = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Перевіряє, чи можна виконати запит.
+
+        Піднімає:
+            CircuitOpenError: Якщо запобіжник розімкнений або вже виконується пробний запит.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.open_timeout:
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            retry_after = self.open_timeout - (self.clock() - self._opened_at) if self.state == self.OPEN else 0.0
+            raise CircuitOpenError(self.name, retry_after)
+
+    def record(self, duration, ok):
+        """
+        Враховує результат виконаного запиту.
+
+        Параметри:
+            duration (float): Тривалість запиту у секундах.
+            ok (bool): Чи був запит успішним.
+        """
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                self._calls.clear()
+                self._transition(self.CLOSED if ok and not slow else self.OPEN)
+                return
+            self._calls.append((ok, slow))
+            if self.state == self.CLOSED and len(self._calls) >= self.min_calls:
+                errors = sum(1 for call_ok, _ in self._calls if not call_ok)
+                slow_calls = sum(1 for _, call_slow in self._calls if call_slow)
+                if errors / len(self._calls) >= self.error_rate or slow_calls / len(self._calls) >= self.slow_call_rate:
+                    self._calls.clear()
+                    self._transition(self.OPEN)
+
+    def _transition(self, state):
+        if state == self.OPEN:
+            self._opened_at = self.clock()
+        if state != self.state:
+            logging.warning(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        self.state = state
+
+
+class CircuitBreakerRegistry:
+    """
+    Набір запобіжників, по одному на кожну логічну групу запитів до API.
+    """
+
+    def __init__(self, **options):
+        """
+        Параметри:
+            **options: Параметри, що передаються кожному новому CircuitBreaker.
+        """
+        self.options = options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint):
+        """
+        Повертає запобіжник групи запитів, створюючи його за потреби.
+        """
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(endpoint, **self.options)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def states(self):
+        """
+        Повертає поточний стан кожного запобіжника.
+        """
+        with self._lock:
+            return {endpoint: breaker.state for endpoint, breaker in self._breakers.items()}
+
+
+breakers = CircuitBreakerRegistry()
@@ -1,3 +1,4 @@
+import asyncio
 from telegram import Update
 from telegram.ext import CallbackContext
 
@@ -25,3 +26,45 @@ class CommandBase:
             NotImplementedError: Якщо метод не був перевизначений у похідному класі.
         """
         raise NotImplementedError("Subclasses must implement this method")
+
+    async def execute_async(self, update: Update, context: CallbackContext):
+        """
+        Асинхронний варіант execute для роботи бота в режимі asyncio.
+
+        За замовчуванням виконує синхронний execute в пулі потоків циклу подій, щоб блокуючі
+        виклики не зупиняли обробку інших оновлень. Команди, що можуть звертатися до API
+        без блокування, перевизначають цей метод.
+
+        Параметри:
+            update (Update): Об'єкт Update від Telegram API.
+            context (CallbackContext): Контекст виконання команди.
+
+        Повертає:
+            Результат execute.
+        """
+        return await asyncio.to_thread(self.execute, update, context)
+
+    def repeat_result(self, result, update: Update, context: CallbackContext):
+        """
+        Відповідає на повторне натискання кнопки результатом першого натискання (див. PressGuard).
+
+        За замовчуванням повторне натискання ігнорується, бо перше вже надіслало відповідь.
+
+        Параметри:
+            result: Результат execute для першого натискання.
+            update (Update): Об'єкт Update від Telegram API.
+            context (CallbackContext): Контекст виконання команди.
+        """
+
+    def reply_unavailable(self, update: Update, context: CallbackContext):
+        """
+        Надсилає користувачу повідомлення про тимчасову недоступність сервісу.
+
+        Використовується в деградованому режимі, коли запобіжник API розімкнений.
+
+        Параметри:
+            update (Update): Об'єкт Update від Telegram API.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        context.bot.send_message(chat_id=update.effective_chat.id,
+                                 text="Сервіс тимчасово недоступний 😔 Спробуйте, будь ласка, пізніше")
@@ -9,7 +9,8 @@ class CommandFactory:
     Фабрика команд для створення та управління різними командами в системі.
 
     Використовує словник для зіставлення назв команд з функціями, які створюють
-    екземпляри відповідних командних об'єктів.
+    екземпляри відповідних командних об'єктів. Команди не мають стану між викликами, тому
+    кожна створюється один раз при ініціалізації фабрики і використовується для всіх оновлень.
     """
 
     def __init__(self):
@@ -22,6 +23,7 @@ class CommandFactory:
             "button_handler": lambda: self.set_command_context(ButtonHandler()),
             "details": lambda: DetailsCommand(),
             "all_details": lambda: AllDetailsCommand(),
+            "product_details": lambda: ProductDetailsCommand(),
             "add_to_cart": lambda: AddToCartCommand(),
             "open_cart": lambda: OpenCartCommand(),
             "clean_cart": lambda: CleanCartCommand(),
@@ -34,6 +36,7 @@ class CommandFactory:
             "got_phone_number": lambda: self.set_command_context(GotPhoneNumberCommand()),
             "got_location": lambda: self.set_command_context(GotLocationCommand())
         }
+        self.commands = {name: constructor() for name, constructor in self.command_map.items()}
 
     def set_command_context(self, command):
         """
@@ -54,13 +57,15 @@ class CommandFactory:
         Повертає екземпляр команди на основі її назви.
 
         Параметри:
-            command_name (str): Назва команди для створення.
+            command_name (str): Назва команди.
 
         Повертає:
-            Command: Екземпляр команди.
+            Command: Спільний екземпляр команди.
+
+        Піднімає:
+            ValueError: Якщо команду з такою назвою не зареєстровано.
         """
-        command_constructor = self.command_map.get(command_name)
-        if command_constructor:
-            return command_constructor()
-        else:
+        command = self.commands.get(command_name)
+        if command is None:
             raise ValueError(f"Unknown command: {command_name}")
+        return command
@@ -1,7 +1,18 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import asyncio
+import functools
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 from telegram.ext import CallbackContext
 from command_base import CommandBase
 from db_manager import APIClient
+from circuit_breaker import CircuitOpenError
+from callback_router import CallbackRouter
+import callback_codec
+from callback_codec import CallbackPayload
+from metrics import metrics
+from press_guard import PressGuard, press_key
+import outbound_scheduler
+from photo_cache import PhotoCache
+import config
 import logging
 
 class MenuCommand(CommandBase):
@@ -11,6 +22,8 @@ class MenuCommand(CommandBase):
     def execute(self, update: Update, context: CallbackContext):
         """
         Виводить меню доступних товарів з бази даних як інтерактивні кнопки в чаті.
+        Кнопки товарів несуть закодований ID товару та версію каталогу (див. callback_codec).
+        Якщо API недоступне, меню віддається з кешу каталогу.
 
         Параметри:
             update (Update): Об'єкт Update, що містить інформацію про поточний стан чату.
@@ -18,19 +31,35 @@ class MenuCommand(CommandBase):
         """
         try:
             context.user_data['processing_order'] = False
-            rows = APIClient.get_menu()
-            keyboard = [[InlineKeyboardButton(row[0], callback_data=row[0])] for row in rows]
+            catalog = APIClient.get_catalog()
+            keyboard = [[InlineKeyboardButton(row.name, callback_data=self.product_callback(row, catalog.version))]
+                        for row in catalog.rows or []]
             keyboard.append([InlineKeyboardButton("Показати всі товари", callback_data="all_details")])
             reply_markup = InlineKeyboardMarkup(keyboard)
             context.bot.send_message(chat_id=update.effective_chat.id, text='📋 Меню <b>ADP Pizza</b>',
                                      parse_mode='HTML', reply_markup=reply_markup)
+        except CircuitOpenError:
+            self.reply_unavailable(update, context)
         except Exception as e:
             logging.error(f"Menu Command execute error: {e}", exc_info=True)
 
+    @staticmethod
+    def product_callback(row, catalog_version):
+        """
+        Повертає callback_data кнопки товару: закодований ID або, для скорочених рядків меню без ID, назву.
+        """
+        if row.id is None:
+            return row.name
+        return callback_codec.encode("product_details", row.id, catalog_version)
+
 class DetailsCommand(CommandBase):
     """
     Команда для отримання детальної інформації про товар.
+
+    Фото товарів, що вже надсилалися, надсилаються за file_id з PhotoCache, а не за URL.
     """
+    photos = PhotoCache()
+
     def execute(self, update: Update, context: CallbackContext):
         """
         Показує деталі конкретного товару, якщо він знайдений у базі даних.
@@ -44,27 +73,85 @@ class DetailsCommand(CommandBase):
             pizza_name = ' '.join(context.args)
             row = APIClient.get_pizza_details(pizza_name)
             if row:
-                message = f"🍕 <b>{row[0]}</b>\n\n💡 <b>Склад:</b> <i>{row[1]}</i>\n\n💵 <b>Ціна:</b> {row[3]} грн"
-                cart_button = [[InlineKeyboardButton("➕ Додати до замовлення", callback_data=f"add_to_cart_{row[4]}")]]
-                reply_markup = InlineKeyboardMarkup(cart_button)
-                if row[2]:
-                    context.bot.send_photo(chat_id=update.effective_chat.id, photo=row[2], caption=message,
-                                           parse_mode='HTML', reply_markup=reply_markup)
-                else:
-                    context.bot.send_message(chat_id=update.effective_chat.id, text=message, parse_mode='HTML',
-                                             reply_markup=reply_markup)
+                self.send_details(row, update, context)
             else:
                 context.bot.send_message(chat_id=update.effective_chat.id, text="Товар не знайдено 😶‍🌫️")
+        except CircuitOpenError:
+            self.reply_unavailable(update, context)
         except Exception as e:
             logging.error(f"Details Command execute error: {e}", exc_info=True)
 
+    def send_details(self, row, update: Update, context: CallbackContext, catalog_version=None):
+        """
+        Надсилає картку товару (фото або текст) з кнопкою додавання до замовлення.
+
+        Параметри:
+            row (Product): Деталі товару.
+            update (Update): Об'єкт Update, що містить інформацію про поточний стан чату.
+            context (CallbackContext): Контекст виконання команди.
+            catalog_version (int, optional): Версія каталогу для кнопки; за замовчуванням - поточна.
+        """
+        if catalog_version is None:
+            catalog_version = APIClient.get_catalog().version
+        message = self.caption(row)
+        callback_data = callback_codec.encode("add_to_cart", row.id, catalog_version)
+        cart_button = [[InlineKeyboardButton("➕ Додати до замовлення", callback_data=callback_data)]]
+        reply_markup = InlineKeyboardMarkup(cart_button)
+        if row.photo:
+            self.photos.send([row], functools.partial(self.send_photos, context, update.effective_chat.id, [row],
+                                                      reply_markup))
+        else:
+            context.bot.send_message(chat_id=update.effective_chat.id, text=message, parse_mode='HTML',
+                                     reply_markup=reply_markup)
+
+    @staticmethod
+    def caption(row):
+        """
+        Повертає опис товару (HTML) для картки або підпису до фото.
+        """
+        return f"🍕 <b>{row.name}</b>\n\n💡 <b>Склад:</b> <i>{row.ingredients}</i>\n\n💵 <b>Ціна:</b> {row.price} грн"
+
+    @staticmethod
+    def send_photos(context: CallbackContext, chat_id, rows, reply_markup, media):
+        """
+        Надсилає фото товарів з описами в підписах: одне фото - з клавіатурою, кілька - альбомом.
+
+        Параметри:
+            context (CallbackContext): Контекст виконання команди.
+            chat_id (int): ID чату.
+            rows (list): Товари.
+            reply_markup (InlineKeyboardMarkup): Клавіатура для одного фото (альбоми клавіатур не мають).
+            media (list): file_id або URL фото кожного товару (див. PhotoCache.send).
+
+        Повертає:
+            Результат send_photo або send_media_group.
+        """
+        if len(rows) == 1:
+            return context.bot.send_photo(chat_id=chat_id, photo=media[0], caption=DetailsCommand.caption(rows[0]),
+                                          parse_mode='HTML', reply_markup=reply_markup)
+        return context.bot.send_media_group(chat_id=chat_id, media=[
+            InputMediaPhoto(photo, caption=DetailsCommand.caption(row), parse_mode='HTML') for photo, row in zip(media, rows)])
+
 class AllDetailsCommand(CommandBase):
     """
     Команда для відображення деталей всіх товарів у меню.
+
+    У режимі 'album' (config.bot_all_details_mode) фото товарів з описами надсилаються альбомами
+    до album_size фото, а кнопки додавання всіх товарів - одним повідомленням з компактною
+    клавіатурою, тож весь вивід коштує близько десятої частини викликів Bot API. У режимі 'cards'
+    кожен товар надсилається окремою карткою з власною кнопкою.
     """
+    album_size = 10
+    buttons_per_row = 2
+    # Обмеження Telegram: кількість кнопок у клавіатурі та довжина текстового повідомлення
+    keyboard_size = 100
+    message_length = 4096
+
     def execute(self, update: Update, context: CallbackContext):
         """
-        Виконує послідовний вивід деталей кожного товару з меню.
+        Виводить деталі всіх товарів з меню. Деталі беруться з індексу каталогу, тому весь вивід
+        коштує один запит до API. Товари надсилаються як масові повідомлення, тож відповіді на інші
+        дії користувача їх випереджають.
 
         Параметри:
             update (Update): Об'єкт Update, що містить інформацію про поточний стан чату.
@@ -72,18 +159,111 @@ class AllDetailsCommand(CommandBase):
         """
         try:
             context.user_data['processing_order'] = False
-            rows = APIClient.get_menu()
-            for row in rows:
-                pizza_name = row[0]
-                context.args = [pizza_name]
-                DetailsCommand(self.menu_repository).execute(update, context)
+            catalog_version = APIClient.get_catalog().version
+            rows = APIClient.get_all_pizza_details()
+            with outbound_scheduler.bulk():
+                if config.bot_all_details_mode == 'album':
+                    self.send_albums(rows, update, context, catalog_version)
+                else:
+                    details_command = DetailsCommand()
+                    for row in rows:
+                        details_command.send_details(row, update, context, catalog_version)
         except Exception as e:
             logging.error(f"All-Details Command execute error: {e}", exc_info=True)
 
+    def send_albums(self, rows, update: Update, context: CallbackContext, catalog_version):
+        """
+        Надсилає фото товарів альбомами з описами в підписах, а описи товарів без фото - текстом,
+        останнє повідомлення якого несе клавіатуру додавання всіх товарів до замовлення.
+
+        Параметри:
+            rows (list): Деталі товарів.
+            update (Update): Об'єкт Update, що містить інформацію про поточний стан чату.
+            context (CallbackContext): Контекст виконання команди.
+            catalog_version (int): Версія каталогу для кнопок.
+        """
+        chat_id = update.effective_chat.id
+        for batch in self.batches([row for row in rows if row.photo], self.album_size):
+            # Альбом має містити щонайменше два фото, одне фото надсилається окремо
+            DetailsCommand.photos.send(batch, functools.partial(DetailsCommand.send_photos, context, chat_id, batch, None))
+        header = "➕ <b>Додати до замовлення:</b>"
+        texts = self.pack([DetailsCommand.caption(row) for row in rows if not row.photo] + [header])
+        for text in texts[:-1]:
+            context.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+        buttons = [InlineKeyboardButton(f"➕ {row.name}",
+                                        callback_data=callback_codec.encode("add_to_cart", row.id, catalog_version))
+                   for row in rows if row.id is not None]
+        for start in range(0, max(len(buttons), 1), self.keyboard_size):
+            chunk = buttons[start:start + self.keyboard_size]
+            keyboard = [chunk[index:index + self.buttons_per_row] for index in range(0, len(chunk), self.buttons_per_row)]
+            context.bot.send_message(chat_id=chat_id, text=texts[-1] if start == 0 else header, parse_mode='HTML',
+                                     reply_markup=InlineKeyboardMarkup(keyboard) if keyboard else None)
+
+    @staticmethod
+    def batches(items, size):
+        """
+        Ділить список на найменшу кількість частин не більше size елементів, близьких за розміром
+        (11 фото - альбоми з 5 і 6 фото, а не з 10 і 1).
+        """
+        count = -(-len(items) // size)
+        return [items[index * len(items) // count:(index + 1) * len(items) // count] for index in range(count)]
+
+    def pack(self, paragraphs):
+        """
+        Об'єднує абзаци в повідомлення не довші за message_length символів.
+        """
+        messages = []
+        for paragraph in paragraphs:
+            if messages and len(messages[-1]) + 2 + len(paragraph) <= self.message_length:
+                messages[-1] += "\n\n" + paragraph
+            else:
+                messages.append(paragraph)
+        return messages
+
+class ProductDetailsCommand(CommandBase):
+    """
+    Команда для показу деталей товару за його ID (кнопки меню).
+    """
+    def execute(self, product_id, update: Update, context: CallbackContext):
+        """
+        Показує деталі товару, знайденого за ID в індексі каталогу.
+
+        Параметри:
+            product_id (int): ID товару.
+            update (Update): Об'єкт Update, що містить інформацію про поточний стан чату.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        try:
+            context.user_data['processing_order'] = False
+            row = APIClient.get_pizza_details_by_id(product_id)
+            if row:
+                DetailsCommand().send_details(row, update, context)
+            else:
+                context.bot.send_message(chat_id=update.effective_chat.id, text="Товар не знайдено 😶‍🌫️")
+        except CircuitOpenError:
+            self.reply_unavailable(update, context)
+        except Exception as e:
+            logging.error(f"Product Details Command execute error: {e}", exc_info=True)
+
 class ButtonHandler(CommandBase):
     """
     Обробник кнопок для інтерактивних команд у чаті.
+
+    Команда для натиснутої кнопки визначається заздалегідь побудованим маршрутизатором:
+    кнопки товарів - розкодуванням callback_codec, службові кнопки - за точним збігом, кнопки
+    старого формату 'add_to_cart_<ID>' - за префіксом, а решта (старі кнопки меню з назвою
+    товару) - показом деталей товару за назвою. Повторні натискання кнопок з deduplicated на тому
+    самому повідомленні виконуються один раз, а повтори отримують результат першого натискання.
     """
+    router = CallbackRouter(
+        exact=("menu", "all_details", "open_cart", "clean_cart", "start_order", "confirm_order", "cancel_order",
+               "request_location"),
+        prefixes={"add_to_cart_": ("add_to_cart", callback_codec.legacy_parser("add_to_cart"))},
+        default="details",
+        decoders={callback_codec.MARKER: callback_codec.decode})
+    deduplicated = frozenset({"start_order", "confirm_order", "cancel_order", "clean_cart"})
+    press_guard = PressGuard()
+
     def set_factory(self, factory):
         """
         Встановлює фабрику команд, яка використовується для отримання екземплярів команд.
@@ -104,19 +284,83 @@ class ButtonHandler(CommandBase):
         try:
             query = update.callback_query
             query.answer()
-            callback_data = query.data
-
-            if callback_data.startswith("add_to_cart_"):
-                product_id = callback_data.split("_", 3)[-1]
-                add_to_cart_command = self.command_factory.get_command("add_to_cart")
-                add_to_cart_command.execute(product_id, update, context)
+            route = self.router.resolve(query.data)
+            command = self.command_factory.get_command(route.command)
+            if isinstance(route.payload, CallbackPayload):
+                self.check_catalog_version(route.payload)
+                command.execute(route.payload.product_id, update, context)
+            elif route.command in self.deduplicated:
+                self.execute_once(route.command, command, update, context)
             else:
-                try:
-                    command = self.command_factory.get_command(callback_data)
-                    command.execute(update, context)
-                except:
-                    context.args = [callback_data]
-                    command = self.command_factory.get_command("details")
-                    command.execute(update, context)
+                if route.payload is not None:
+                    context.args = [route.payload]
+                command.execute(update, context)
+        except Exception as e:
+            logging.error(f"Button Handler execute error: {e}", exc_info=True)
+
+    async def execute_async(self, update: Update, context: CallbackContext):
+        """
+        Асинхронно обробляє натискання кнопки, передаючи його асинхронному варіанту відповідної команди.
+
+        Параметри:
+            update (Update): Об'єкт Update, що містить інформацію про запит на кнопку.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        try:
+            query = update.callback_query
+            await asyncio.to_thread(query.answer)
+            route = self.router.resolve(query.data)
+            command = self.command_factory.get_command(route.command)
+            if isinstance(route.payload, CallbackPayload):
+                self.check_catalog_version(route.payload)
+                await asyncio.to_thread(command.execute, route.payload.product_id, update, context)
+                return
+            if route.command in self.deduplicated:
+                await self.execute_once_async(route.command, command, update, context)
+                return
+            if route.payload is not None:
+                context.args = [route.payload]
+            await command.execute_async(update, context)
         except Exception as e:
             logging.error(f"Button Handler execute error: {e}", exc_info=True)
+
+    def execute_once(self, action, command, update: Update, context: CallbackContext):
+        """
+        Виконує команду кнопки один раз для натискань з тим самим ключем (користувач, повідомлення, дія).
+
+        Параметри:
+            action (str): Назва команди.
+            command (CommandBase): Команда.
+            update (Update): Об'єкт Update, що містить інформацію про запит на кнопку.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        result, duplicate = self.press_guard.run(press_key(update, action), lambda: command.execute(update, context))
+        if duplicate:
+            command.repeat_result(result, update, context)
+
+    async def execute_once_async(self, action, command, update: Update, context: CallbackContext):
+        """
+        Асинхронний варіант execute_once: команда виконується своїм execute_async.
+
+        Параметри:
+            action (str): Назва команди.
+            command (CommandBase): Команда.
+            update (Update): Об'єкт Update, що містить інформацію про запит на кнопку.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        result, duplicate = await self.press_guard.run_async(press_key(update, action),
+                                                             lambda: command.execute_async(update, context))
+        if duplicate:
+            await asyncio.to_thread(command.repeat_result, result, update, context)
+
+    @staticmethod
+    def check_catalog_version(payload):
+        """
+        Рахує натискання кнопок, побудованих зі старішої версії каталогу. ID товарів стабільні,
+        тому такі кнопки обробляються як звичайні, а метрика показує, як часто меню застаріває.
+
+        Параметри:
+            payload (CallbackPayload): Розкодовані callback_data.
+        """
+        if payload.catalog_version and payload.catalog_version != APIClient.get_catalog().version:
+            metrics.increment('callback.stale_catalog')
@@ -1 +1,123 @@
-api_url = 'http://206.54.170.126:5000'
+import os
+
+# Адресу API можна перевизначити змінною оточення (наприклад, для навантажувальних тестів)
+api_url = os.getenv('API_URL', 'http://206.54.170.126:5000')
+
+# Пул з'єднань до API: кількість пулів (хостів) та максимальна кількість з'єднань у пулі
+api_pool_connections = 4
+api_pool_maxsize = 32
+
+# Повторні спроби для ідемпотентних запитів (GET) з експоненційною затримкою
+api_retries = 3
+api_backoff_factor = 0.3
+
+# Тайм-аути (з'єднання, читання) у секундах для кожної логічної групи запитів
+api_timeouts = {
+    'default': (3.05, 10),
+    'menu': (3.05, 5),
+    'details': (3.05, 5),
+    'cart': (3.05, 5),
+    'user': (3.05, 5),
+    'order': (3.05, 15),
+}
+
+# Асинхронний клієнт API: загальний ліміт одночасних з'єднань
+api_async_pool_limit = 1000
+
+# Кеш каталогу: час життя, оновлення у фоні за стільки секунд до закінчення, максимальний вік
+# застарілих даних, що віддаються під час оновлення, та розмір LRU-кешу деталей товарів
+catalog_ttl = 600
+catalog_refresh_ahead = 60
+catalog_max_stale = 3600
+catalog_details_maxsize = 512
+
+# Файл знімка каталогу, з якого кеш каталогу заповнюється при старті бота
+catalog_snapshot_path = os.getenv('CATALOG_SNAPSHOT_PATH', 'catalog_snapshot.json')
+
+# Локальне дзеркало кошиків: час життя запису та максимальна кількість користувачів
+# (найдовше неактивні користувачі витісняються першими)
+cart_cache_ttl = 30
+cart_cache_maxsize = 10000
+
+# Кеш профілів користувачів: час життя запису та максимальна кількість профілів
+user_cache_ttl = 300
+user_cache_maxsize = 10000
+
+# Відкладений запис додавань у кошик: вікно накопичення у секундах, максимальна кількість
+# відкладених товарів користувача та кількість невдалих спроб, після якої товари відкидаються
+cart_write_window = 0.5
+cart_write_max_pending = 20
+cart_write_max_failures = 5
+
+# Запобіжник (circuit breaker) для кожної групи запитів: розмір вікна викликів, мінімум викликів
+# для розмикання, порогові частки помилок і повільних викликів, тривалість повільного виклику
+# та час у розімкненому стані (секунди)
+breaker_window = 20
+breaker_min_calls = 10
+breaker_error_rate = 0.5
+breaker_slow_call_duration = 2.0
+breaker_slow_call_rate = 0.5
+breaker_open_timeout = 30
+
+# Режим роботи бота: 'threads' (Updater з пулом потоків), 'asyncio' (цикл подій), 'webhook'
+# (вбудований HTTP-сервер, оновлення обробляються пулом потоків планувальника) або 'processes'
+# (супервізор з кількома робочими процесами), ліміт
+# одночасно оброблюваних оновлень в режимі asyncio, кількість потоків для блокуючих викликів
+# Bot API та тайм-аут довгого опитування getUpdates (секунди)
+bot_run_mode = os.getenv('BOT_RUN_MODE', 'threads')
+bot_max_concurrent_updates = int(os.getenv('BOT_MAX_CONCURRENT_UPDATES', 256))
+bot_io_workers = 64
+bot_poll_timeout = 10
+
+# Вихідні повідомлення: загальний ліміт надсилань за секунду, ліміт для одного чату та скільки
+# повідомлень можна надіслати в чат поспіль, кількість потоків надсилання та скільки разів
+# повторювати надсилання після відповіді 429 (RetryAfter); 0 у лімітах вимикає обмеження
+bot_outbound_global_rate = float(os.getenv('BOT_OUTBOUND_GLOBAL_RATE', 30))
+bot_outbound_chat_rate = float(os.getenv('BOT_OUTBOUND_CHAT_RATE', 1))
+bot_outbound_chat_burst = 3
+bot_outbound_workers = 8
+bot_outbound_max_retries = 5
+
+# Вивід всіх товарів: 'album' (фото альбомами до 10 штук та одна компактна клавіатура додавання
+# товарів) або 'cards' (окрема картка з кнопкою для кожного товару)
+bot_all_details_mode = os.getenv('BOT_ALL_DETAILS_MODE', 'album')
+
+# Придушення повторних натискань кнопок: скільки секунд пам'ятати результат натискання
+# та максимальна кількість запам'ятованих натискань
+press_dedup_window = 3
+press_dedup_maxsize = 10000
+
+# Постійне сховище стану користувачів (user_data) та file_id фото товарів: файл SQLite, інтервал
+# запису змінених користувачів (секунди), інтервал ущільнення бази (секунди) та скільки днів
+# зберігається стан користувачів, що не звертались до бота
+bot_state_path = os.getenv('BOT_STATE_PATH', 'bot_state.sqlite3')
+bot_state_flush_interval = 1.0
+bot_state_compact_interval = 3600
+bot_state_retention_days = 30
+
+# Планувальник оновлень: оновлення одного користувача обробляються по черзі, різних - паралельно.
+# Кількість потоків обробки в режимі threads та максимальна довжина черги одного користувача
+bot_scheduler_workers = 8
+bot_max_pending_per_user = 20
+
+# Режим вебхука: публічна HTTPS-адреса, на яку Telegram надсилає оновлення (обов'язкова), адреса
+# та порт вбудованого HTTP-сервера, шлях вебхука, секретний токен (заголовок
+# X-Telegram-Bot-Api-Secret-Token; якщо не заданий, генерується випадковий при кожному запуску),
+# максимальний розмір тіла запиту (байти) та кількість одночасних з'єднань від Telegram
+bot_webhook_url = os.getenv('WEBHOOK_URL')
+bot_webhook_listen = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+bot_webhook_port = int(os.getenv('WEBHOOK_PORT', 8443))
+bot_webhook_path = os.getenv('WEBHOOK_PATH', '/telegram')
+bot_webhook_secret = os.getenv('WEBHOOK_SECRET')
+bot_webhook_max_body = 1048576
+bot_webhook_max_connections = 100
+
+# Режим processes: кількість робочих процесів (оновлення розподіляються між ними консистентним
+# хешуванням ID користувача), кількість точок кожного процесу на кільці хешів, скільки разів
+# процес можна перезапустити за вікно (секунди), перш ніж його користувачі будуть перерозподілені
+# між іншими процесами, та скільки секунд чекати завершення процесу під час зупинки
+bot_worker_processes = int(os.getenv('BOT_WORKER_PROCESSES', os.cpu_count() or 1))
+bot_hash_ring_replicas = 100
+bot_worker_max_restarts = 5
+bot_worker_restart_window = 60
+bot_worker_stop_timeout = 30
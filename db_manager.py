@@ -1,53 +1,318 @@
+import logging
 import requests
+import config
+import models
 from config import api_url
+from http_transport import HTTPTransport
+from cache import TTLCache
+from catalog_cache import CatalogCache
+from catalog_snapshot import CatalogSnapshot
+from single_flight import SingleFlight
+from cart_queue import CartWriteQueue
 
 class APIClient:
     """
     Клієнт API для взаємодії з веб-сервісом, що керує даними ресторану.
 
     Включає методи для отримання меню, деталей товарів, управління кошиком та користувачами.
+    Усі запити проходять через спільний транспорт з пулом keep-alive з'єднань,
+    а дані каталогу віддаються з кешу з фоновим оновленням. Однакові одночасні GET-запити
+    об'єднуються в один. Кошики та профілі користувачів кешуються локально і оновлюються при записі.
+    Каталог зберігається у знімок на диску, щоб після перезапуску відповідати без запитів до API.
     """
 
+    transport = HTTPTransport()
+    catalog = CatalogCache()
+    snapshot = CatalogSnapshot()
+    single_flight = SingleFlight()
+    carts = TTLCache(maxsize=config.cart_cache_maxsize, ttl=config.cart_cache_ttl)
+    users = TTLCache(maxsize=config.user_cache_maxsize, ttl=config.user_cache_ttl)
+    validators = TTLCache(maxsize=config.catalog_details_maxsize * 2 + 1, ttl=float('inf'))
+    cart_writes = CartWriteQueue(writer=lambda user_id, product_id: APIClient.send_to_cart(user_id, product_id),
+                                 on_flushed=lambda user_id: APIClient.carts.invalidate(user_id),
+                                 on_dropped=lambda user_id, items: APIClient._cart_write_dropped(user_id, items))
+    # Викликається з user_id та ID товарів, які так і не вдалося записати в кошик (див. BotManager)
+    cart_write_dropped = None
+
+    @classmethod
+    def _get(cls, endpoint, url, decode=None):
+        """
+        Виконує GET-запит, об'єднуючи його з однаковими запитами, що вже виконуються.
+
+        Parameters:
+            endpoint (str): Назва логічної групи запитів.
+            url (str): Повна адреса запиту.
+            decode (callable, optional): Перетворює розібраний JSON на модель з models.
+
+        Returns:
+            Розібрана відповідь сервера.
+        """
+        return cls.single_flight.do(url, lambda: cls._decode(cls.transport.get(endpoint, url), decode))
+
+    @staticmethod
+    def _raise_for_status(response):
+        """
+        Піднімає requests.HTTPError, якщо сервер не підтвердив запис відповіддю 2xx.
+        """
+        if not 200 <= response.status_code < 300:
+            raise requests.HTTPError(f"{response.status_code} response from {response.url}", response=response)
+
+    @staticmethod
+    def _decode(response, decode=None):
+        data = models.loads(response.content)
+        return data if decode is None else decode(data)
+
+    @classmethod
+    def _get_catalog_resource(cls, endpoint, url, decode=None):
+        """
+        Виконує умовний GET-запит до ресурсу каталогу.
+
+        Зберігає валідатори (ETag/Last-Modified) відповіді разом з розібраними даними і надсилає
+        їх у наступних запитах. На відповідь 304 повертаються вже розібрані дані без завантаження тіла.
+
+        Parameters:
+            endpoint (str): Назва логічної групи запитів.
+            url (str): Повна адреса запиту.
+            decode (callable, optional): Перетворює розібраний JSON на модель з models.
+
+        Returns:
+            Розібрана відповідь сервера.
+        """
+        return cls.single_flight.do(url, lambda: cls._fetch_conditional(endpoint, url, decode))
+
+    @classmethod
+    def _fetch_conditional(cls, endpoint, url, decode=None):
+        cached = cls.validators.get(url)
+        headers = {}
+        if cached:
+            etag, last_modified, value = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        if headers:
+            response = cls.transport.get(endpoint, url, headers=headers)
+            if response.status_code == 304:
+                return value
+        else:
+            response = cls.transport.get(endpoint, url)
+        value = cls._decode(response, decode)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            cls.validators.set(url, (etag, last_modified, value))
+        else:
+            cls.validators.invalidate(url)
+        return value
+
+    @classmethod
+    def clear_caches(cls):
+        """
+        Очищає всі локальні кеші клієнта.
+        """
+        cls.catalog.clear()
+        cls.carts.clear()
+        cls.users.clear()
+        cls.validators.clear()
+
+    @classmethod
+    def _catalog_resource(cls, key):
+        """
+        Повертає адресу та функцію розбору для запису кешу каталогу.
+        """
+        if key == CatalogCache.MENU_KEY:
+            return f"{api_url}/menu", models.products
+        kind, value = key
+        if kind == 'name':
+            return f"{api_url}/menu/details/{value}", models.Product.from_json
+        return f"{api_url}/menu/details-by-id/{value}", models.Product.from_json
+
+    @classmethod
+    def save_snapshot(cls):
+        """
+        Зберігає каталог разом з валідаторами відповідей у знімок на диску.
+
+        Returns:
+            bool: True, якщо знімок записано.
+        """
+        resources = []
+        for key, value in cls.catalog.export():
+            url, _ = cls._catalog_resource(key)
+            etag, last_modified, _ = cls.validators.get(url) or (None, None, None)
+            resources.append({'key': key, 'url': url, 'etag': etag, 'last_modified': last_modified, 'data': value})
+        if not resources:
+            return False
+        return cls.snapshot.save(api_url, resources)
+
+    @classmethod
+    def load_snapshot(cls):
+        """
+        Заповнює кеш каталогу та валідатори зі знімка на диску.
+
+        Returns:
+            int: Кількість відновлених записів.
+        """
+        restored = 0
+        for resource in cls.snapshot.load(api_url):
+            try:
+                key = resource['key']
+                key = key if key == CatalogCache.MENU_KEY else tuple(key)
+                url, decode = cls._catalog_resource(key)
+                value = decode(resource['data'])
+            except Exception as e:
+                logging.error(f"Catalog snapshot restore error: {e}", exc_info=True)
+                continue
+            if not value:
+                continue
+            cls.catalog.restore(key, value)
+            if resource.get('etag') or resource.get('last_modified'):
+                # Той самий об'єкт, що й у кеші: відповідь 304 не перебудовуватиме індекс каталогу
+                cls.validators.set(url, (resource.get('etag'), resource.get('last_modified'), value))
+            restored += 1
+        return restored
+
+    @classmethod
+    def revalidate_catalog(cls):
+        """
+        Перевіряє актуальність меню умовним запитом і оновлює знімок на диску.
+        """
+        cls.catalog.refresh_menu(cls.fetch_menu)
+        cls.save_snapshot()
+
     @classmethod
     def get_menu(cls):
         """
-        Запитує дані про всі позиції в меню.
+        Повертає дані про всі позиції в меню з кешу каталогу.
 
         Returns:
-            list: Список товарів у форматі JSON.
+            list[Product]: Список товарів меню.
         """
-        return requests.get(f"{api_url}/menu").json()
+        return cls.catalog.get_menu(cls.fetch_menu)
 
     @classmethod
     def get_pizza_details(cls, pizza_name):
         """
-        Отримує деталі піци по назві.
+        Повертає деталі піци по назві з індексу каталогу.
 
         Parameters:
             pizza_name (str): Назва піци для пошуку деталей.
 
         Returns:
-            dict: Деталі піци у форматі JSON.
+            Product: Деталі піци або None, якщо її не знайдено.
         """
-        return requests.get(f"{api_url}/menu/details/{pizza_name}").json()
+        catalog = cls.get_catalog()
+        row = catalog.by_name(pizza_name)
+        if row or catalog.complete:
+            return row
+        return cls.catalog.get_details(pizza_name, lambda: cls.fetch_pizza_details(pizza_name))
 
     @classmethod
     def get_pizza_details_by_id(cls, product_id):
         """
-        Отримує деталі піци по її унікальному ID.
+        Повертає деталі піци по її унікальному ID з індексу каталогу.
+
+        Parameters:
+            product_id (int): Унікальний ID піци.
+
+        Returns:
+            Product: Деталі піци або None, якщо її не знайдено.
+        """
+        catalog = cls.get_catalog()
+        row = catalog.by_id(product_id)
+        if row or catalog.complete:
+            return row
+        return cls.catalog.get_details_by_id(product_id, lambda: cls.fetch_pizza_details_by_id(product_id))
+
+    @classmethod
+    def get_all_pizza_details(cls):
+        """
+        Повертає деталі всіх товарів меню.
+
+        Якщо меню містить повні рядки, деталі беруться з індексу каталогу без додаткових запитів.
+
+        Returns:
+            list[Product]: Деталі товарів у порядку меню.
+        """
+        catalog = cls.get_catalog()
+        if catalog.complete:
+            return list(catalog.rows)
+        rows = (cls.get_pizza_details(row.name) for row in catalog.rows)
+        return [row for row in rows if row]
+
+    @classmethod
+    def get_catalog(cls):
+        """
+        Повертає індекс каталогу, побудований з одного запиту меню.
+
+        Returns:
+            CatalogIndex: Індекс товарів за назвою та ID.
+        """
+        return cls.catalog.get_index(cls.fetch_menu)
+
+    @classmethod
+    def fetch_menu(cls):
+        """
+        Запитує дані про всі позиції в меню з API, оминаючи кеш.
+
+        Returns:
+            list[Product]: Список товарів меню.
+        """
+        return cls._get_catalog_resource("menu", f"{api_url}/menu", models.products)
+
+    @classmethod
+    def fetch_pizza_details(cls, pizza_name):
+        """
+        Отримує деталі піци по назві з API, оминаючи кеш.
+
+        Parameters:
+            pizza_name (str): Назва піци для пошуку деталей.
+
+        Returns:
+            Product: Деталі піци або None, якщо її не знайдено.
+        """
+        return cls._get_catalog_resource("details", f"{api_url}/menu/details/{pizza_name}",
+                                         models.Product.from_json)
+
+    @classmethod
+    def fetch_pizza_details_by_id(cls, product_id):
+        """
+        Отримує деталі піци по її унікальному ID з API, оминаючи кеш.
 
         Parameters:
             product_id (int): Унікальний ID піци.
 
         Returns:
-            dict: Деталі піци у форматі JSON.
+            Product: Деталі піци або None, якщо її не знайдено.
         """
-        return requests.get(f"{api_url}/menu/details-by-id/{product_id}").json()
+        return cls._get_catalog_resource("details", f"{api_url}/menu/details-by-id/{product_id}",
+                                         models.Product.from_json)
 
     @classmethod
     def add_to_cart(cls, user_id, product_id):
         """
-        Додає товар у кошик користувача.
+        Додає товар у кошик користувача через чергу відкладеного запису.
+
+        Запис до API виконується пачкою у фоні або перед наступним читанням кошика.
+
+        Parameters:
+            user_id (int): Унікальний ID користувача.
+            product_id (int): Унікальний ID товару.
+        """
+        cls.cart_writes.enqueue(user_id, product_id)
+
+    @classmethod
+    def _cart_write_dropped(cls, user_id, items):
+        """
+        Прибирає з дзеркала кошика товари, які не вдалося записати, та повідомляє про них.
+        """
+        cls.carts.invalidate(user_id)
+        if cls.cart_write_dropped:
+            cls.cart_write_dropped(user_id, items)
+
+    @classmethod
+    def send_to_cart(cls, user_id, product_id):
+        """
+        Негайно додає товар у кошик користувача через API.
 
         Parameters:
             user_id (int): Унікальний ID користувача.
@@ -55,22 +320,35 @@ class APIClient:
 
         Returns:
             dict: Відповідь сервера у форматі JSON.
+
+        Raises:
+            requests.HTTPError: Якщо сервер відповів не 2xx; товар не вважається записаним.
         """
         data = {'user_id': user_id, 'product_id': product_id}
-        return requests.post(f"{api_url}/cart/add", json=data).json()
+        response = cls.transport.post("cart", f"{api_url}/cart/add", json=data)
+        cls._raise_for_status(response)
+        return cls._decode(response)
 
     @classmethod
-    def get_cart(cls, user_id):
+    def get_cart(cls, user_id, fresh=False):
         """
-        Отримує вміст кошика користувача.
+        Отримує вміст кошика користувача. Спершу записує відкладені додавання товарів,
+        а повторні читання протягом cart_cache_ttl секунд віддаються з локального дзеркала кошика.
 
         Parameters:
             user_id (int): Унікальний ID користувача.
+            fresh (bool): Прочитати кошик з API в обхід дзеркала (наприклад, перед оформленням
+                замовлення, суми якого мають бути саме такими, як у бекенді).
 
         Returns:
-            list: Вміст кошика у форматі JSON.
+            list[CartLine]: Вміст кошика.
         """
-        return requests.get(f"{api_url}/cart/{user_id}").json()
+        cls.cart_writes.flush(user_id)
+        rows = None if fresh else cls.carts.get(user_id)
+        if rows is None:
+            rows = cls._get("cart", f"{api_url}/cart/{user_id}", models.cart_lines)
+            cls.carts.set(user_id, rows)
+        return rows
 
     @classmethod
     def clear_cart(cls, user_id):
@@ -82,21 +360,39 @@ class APIClient:
 
         Returns:
             dict: Відповідь сервера про результат очищення кошика.
+
+        Raises:
+            requests.HTTPError: Якщо сервер відповів не 2xx; дзеркало кошика тоді скидається.
         """
-        return requests.delete(f"{api_url}/cart/clear/{user_id}").json()
+        cls.cart_writes.flush(user_id)
+        try:
+            response = cls.transport.delete("cart", f"{api_url}/cart/clear/{user_id}")
+            cls._raise_for_status(response)
+            result = cls._decode(response)
+        except Exception:
+            cls.carts.invalidate(user_id)
+            raise
+        cls.carts.set(user_id, [])
+        return result
 
     @classmethod
     def get_user(cls, user_id):
         """
-        Отримує інформацію про користувача за його ID.
+        Отримує інформацію про користувача за його ID. Знайдений профіль кешується
+        на user_cache_ttl секунд.
 
         Parameters:
             user_id (int): Унікальний ID користувача.
 
         Returns:
-            dict: Інформація про користувача у форматі JSON.
+            UserProfile: Профіль користувача або None, якщо користувача не знайдено.
         """
-        return requests.get(f"{api_url}/user/{user_id}").json()
+        user = cls.users.get(user_id)
+        if user is None:
+            user = cls._get("user", f"{api_url}/user/{user_id}", models.UserProfile.from_json)
+            if user:
+                cls.users.set(user_id, user)
+        return user
 
     @classmethod
     def add_user(cls, user_id, username, firstname, lastname):
@@ -113,7 +409,10 @@ class APIClient:
             dict: Відповідь сервера у форматі JSON.
         """
         data = {'user_id': user_id, 'username': username, 'firstname': firstname, 'lastname': lastname}
-        return requests.post(f"{api_url}/user/add", json=data).json()
+        try:
+            return cls._decode(cls.transport.post("user", f"{api_url}/user/add", json=data))
+        finally:
+            cls.users.invalidate(user_id)
 
     @classmethod
     def update_user_contact(cls, user_id, phone_number=None, location=None):
@@ -127,12 +426,35 @@ class APIClient:
 
         Returns:
             dict: Відповідь сервера про результат оновлення даних.
+
+        Raises:
+            requests.HTTPError: Якщо сервер відповів не 2xx; кешований профіль тоді скидається.
         """
         data = {'user_id': user_id, 'phone_number': phone_number, 'location': location}
-        return requests.patch(f"{api_url}/user/update/contact", json=data).json()
+        try:
+            response = cls.transport.patch("user", f"{api_url}/user/update/contact", json=data)
+            cls._raise_for_status(response)
+            result = cls._decode(response)
+        except Exception:
+            cls.users.invalidate(user_id)
+            raise
+        cls._refresh_user_contact(user_id, phone_number, location)
+        return result
+
+    @classmethod
+    def _refresh_user_contact(cls, user_id, phone_number, location):
+        """
+        Оновлює контактні дані в кешованому профілі після успішного запису.
+        """
+        user = cls.users.get(user_id)
+        if user is None:
+            return
+        changes = {'phone_number': phone_number, 'location': location}
+        user = user._replace(**{field: value for field, value in changes.items() if value is not None})
+        cls.users.set(user_id, user)
 
     @classmethod
-    def create_order(cls, user_id, phone_number, order_list, total_price, location):
+    def create_order(cls, user_id, phone_number, order_list, total_price, location, idempotency_key=None):
         """
         Створює нове замовлення на основі даних користувача та кошика.
 
@@ -142,9 +464,17 @@ class APIClient:
             order_list (list): Список товарів у замовленні.
             total_price (float): Загальна сума замовлення.
             location (str): Місце доставки замовлення.
+            idempotency_key (str, optional): Ключ ідемпотентності (заголовок Idempotency-Key); повторний
+                запит з тим самим ключем повертає вже створене замовлення.
 
         Returns:
-            dict: Відповідь сервера про створення замовлення.
+            OrderReceipt: Підтвердження створення замовлення з його ID.
+
+        Raises:
+            requests.HTTPError: Якщо сервер відповів не 2xx; замовлення не вважається створеним.
         """
         data = {'user_id': user_id, 'phone_number': phone_number, 'order_list': order_list, 'total_price': total_price, 'location': location}
-        return requests.post(f"{api_url}/order/create", json=data).json()
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        response = cls.transport.post("order", f"{api_url}/order/create", json=data, headers=headers)
+        cls._raise_for_status(response)
+        return cls._decode(response, models.OrderReceipt.from_json)
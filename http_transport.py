@@ -0,0 +1,142 @@
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import config
+from circuit_breaker import breakers as default_breakers, CircuitOpenError
+from metrics import metrics as default_metrics
+
+
+class HTTPTransport:
+    """
+    Спільний HTTP-транспорт для звернень до API.
+
+    Тримає одну сесію requests з пулом keep-alive з'єднань обмеженого розміру,
+    застосовує тайм-аути для кожної логічної групи запитів та повторює ідемпотентні
+    запити (GET) з експоненційною затримкою. Кожна група запитів захищена запобіжником,
+    який при помилках або повільних відповідях API відхиляє запити одразу. Затримки, коди
+    відповідей, розміри відповідей та повторні спроби передаються в приймач метрик.
+    """
+
+    IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, pool_connections=config.api_pool_connections, pool_maxsize=config.api_pool_maxsize,
+                 retries=config.api_retries, backoff_factor=config.api_backoff_factor, timeouts=None,
+                 breakers=None, metrics=None):
+        """
+        Ініціалізує сесію та монтує адаптер з пулом з'єднань.
+
+        Параметри:
+            pool_connections (int): Кількість пулів (окремих хостів), що зберігаються.
+            pool_maxsize (int): Максимальна кількість з'єднань в одному пулі.
+            retries (int): Кількість повторних спроб для ідемпотентних запитів.
+            backoff_factor (float): Множник експоненційної затримки між спробами.
+            timeouts (dict): Тайм-аути (з'єднання, читання) для логічних груп запитів.
+            breakers (CircuitBreakerRegistry): Запобіжники груп запитів (за замовчуванням спільні).
+            metrics (MetricsSink): Приймач метрик (за замовчуванням спільний InMemoryMetrics).
+        """
+        self.breakers = default_breakers if breakers is None else breakers
+        self.metrics = default_metrics if metrics is None else metrics
+        self.timeouts = dict(config.api_timeouts if timeouts is None else timeouts)
+        self.retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                           backoff_factor=backoff_factor, status_forcelist=self.RETRY_STATUSES,
+                           allowed_methods=self.IDEMPOTENT_METHODS, raise_on_status=False)
+        # pool_block=True не дає відкривати з'єднання понад pool_maxsize, потоки чекають вільного
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   max_retries=self.retry, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def timeout_for(self, endpoint):
+        """
+        Повертає тайм-аут для логічної групи запитів.
+
+        Параметри:
+            endpoint (str): Назва групи запитів (menu, details, cart, user, order).
+
+        Повертає:
+            tuple: Тайм-аут з'єднання та читання у секундах.
+        """
+        return self.timeouts.get(endpoint, self.timeouts.get('default'))
+
+    def request(self, method, endpoint, url, **kwargs):
+        """
+        Виконує HTTP-запит через спільну сесію.
+
+        Параметри:
+            method (str): HTTP-метод.
+            endpoint (str): Назва логічної групи запитів для вибору тайм-ауту.
+            url (str): Повна адреса запиту.
+            **kwargs: Додаткові аргументи для requests (json, headers, ...).
+
+        Повертає:
+            requests.Response: Відповідь сервера.
+
+        Піднімає:
+            CircuitOpenError: Якщо запобіжник групи запитів розімкнений.
+        """
+        kwargs.setdefault('timeout', self.timeout_for(endpoint))
+        breaker = self.breakers.get(endpoint)
+        try:
+            breaker.allow()
+        except CircuitOpenError:
+            self.metrics.increment('api.rejected', endpoint=endpoint)
+            raise
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception as e:
+            duration = time.monotonic() - started
+            breaker.record(duration, ok=False)
+            self.metrics.record_request(endpoint, method, type(e).__name__, duration)
+            raise
+        duration = time.monotonic() - started
+        breaker.record(duration, ok=response.status_code < 500)
+        retries = getattr(getattr(response.raw, 'retries', None), 'history', None) or ()
+        self.metrics.record_request(endpoint, method, response.status_code, duration,
+                                    payload_bytes=len(response.content), retries=len(retries))
+        return response
+
+    def get(self, endpoint, url, **kwargs):
+        return self.request('GET', endpoint, url, **kwargs)
+
+    def post(self, endpoint, url, **kwargs):
+        return self.request('POST', endpoint, url, **kwargs)
+
+    def patch(self, endpoint, url, **kwargs):
+        return self.request('PATCH', endpoint, url, **kwargs)
+
+    def delete(self, endpoint, url, **kwargs):
+        return self.request('DELETE', endpoint, url, **kwargs)
+
+    def pool_stats(self):
+        """
+        Збирає статистику використання пулів з'єднань.
+
+        Повертає:
+            dict: Для кожного хоста - розмір пулу, кількість зайнятих та вільних з'єднань,
+            кількість відкритих з'єднань і виконаних запитів.
+        """
+        stats = {}
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            queue = list(pool.pool.queue)
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                'maxsize': pool.pool.maxsize,
+                'in_use': pool.pool.maxsize - len(queue),
+                'idle': sum(1 for conn in queue if conn is not None),
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+            }
+        return stats
+
+    def close(self):
+        """
+        Закриває всі з'єднання пулу.
+        """
+        self.session.close()
@@ -0,0 +1,4 @@
+"""
+Засоби навантажувального тестування бота: підставний сервер API, підставний Telegram Bot API
+та генератор навантаження.
+"""
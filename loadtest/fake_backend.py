@@ -0,0 +1,184 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote
+
+DEFAULT_PRODUCTS = [
+    ['Маргарита', 'Томатний соус, моцарела, базилік', 'https://example.com/margherita.jpg', 180, 1],
+    ['Пепероні', 'Томатний соус, моцарела, пепероні', 'https://example.com/pepperoni.jpg', 220, 2],
+    ['Чотири сири', 'Вершковий соус, моцарела, дорблю, пармезан, чедер', None, 250, 3],
+    ['Гавайська', 'Томатний соус, моцарела, шинка, ананас', 'https://example.com/hawaiian.jpg', 210, 4],
+]
+
+
+class LoadTestHTTPServer(ThreadingHTTPServer):
+    """
+    Багатопотоковий HTTP-сервер з довгою чергою з'єднань, щоб сплески одночасних
+    запитів бота не відхилялися ядром (стандартна черга - лише 5 з'єднань).
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class FakeBackend:
+    """
+    Підставний сервер API, що реалізує всі маршрути, які використовує APIClient.
+
+    Зберігає меню, кошики, користувачів та замовлення в пам'яті. Дозволяє додавати штучну
+    затримку відповідей та повертати помилки 503 із заданою ймовірністю. Ресурси каталогу
+    віддаються з ETag і підтримують умовні запити (304 Not Modified).
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, products=None, latency=0.0, jitter=0.0, error_rate=0.0):
+        """
+        Параметри:
+            host (str): Адреса для прослуховування.
+            port (int): Порт (0 - вибрати вільний).
+            products (list): Рядки меню: назва, склад, фото, ціна, ID.
+            latency (float): Штучна затримка кожної відповіді у секундах.
+            jitter (float): Випадкова добавка до затримки у секундах.
+            error_rate (float): Ймовірність відповіді 503.
+        """
+        self.products = [list(row) for row in (products or DEFAULT_PRODUCTS)]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.carts = {}
+        self.users = {}
+        self.orders = []
+        self.order_keys = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+        self.server = LoadTestHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-backend", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, method, path, body, headers=None):
+        """
+        Обробляє запит до API.
+
+        Параметри:
+            method (str): HTTP-метод.
+            path (str): Шлях запиту.
+            body: Розібране JSON-тіло запиту.
+            headers (Mapping, optional): Заголовки запиту.
+
+        Повертає:
+            tuple: Код відповіді та тіло відповіді.
+        """
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        with self._lock:
+            route = f"{method} /{parts[0]}" if parts and parts[0] else f"{method} /"
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+            if method == 'GET' and parts == ['menu']:
+                return 200, self.products
+            if method == 'GET' and len(parts) == 3 and parts[:2] == ['menu', 'details']:
+                return self._product(lambda row: row[0] == parts[2])
+            if method == 'GET' and len(parts) == 3 and parts[:2] == ['menu', 'details-by-id']:
+                return self._product(lambda row: str(row[4]) == parts[2])
+            if method == 'POST' and parts == ['cart', 'add']:
+                cart = self.carts.setdefault(int(body['user_id']), {})
+                product_id = int(body['product_id'])
+                cart[product_id] = cart.get(product_id, 0) + 1
+                return 200, {'status': 'success'}
+            if method == 'GET' and len(parts) == 2 and parts[0] == 'cart':
+                return 200, self._cart_rows(int(parts[1]))
+            if method == 'DELETE' and len(parts) == 3 and parts[:2] == ['cart', 'clear']:
+                self.carts.pop(int(parts[2]), None)
+                return 200, {'status': 'success'}
+            if method == 'GET' and len(parts) == 2 and parts[0] == 'user':
+                return 200, self.users.get(int(parts[1]))
+            if method == 'POST' and parts == ['user', 'add']:
+                user_id = int(body['user_id'])
+                self.users[user_id] = [user_id, body.get('username'), body.get('firstname'), body.get('lastname'), None, None]
+                return 200, {'status': 'success'}
+            if method == 'PATCH' and parts == ['user', 'update', 'contact']:
+                user = self.users.get(int(body['user_id']))
+                if user is None:
+                    return 404, {'status': 'not found'}
+                if body.get('phone_number') is not None:
+                    user[4] = body['phone_number']
+                if body.get('location') is not None:
+                    user[5] = body['location']
+                return 200, {'status': 'success'}
+            if method == 'POST' and parts == ['order', 'create']:
+                # Повторний запит з тим самим ключем ідемпотентності повертає вже створене замовлення
+                key = (headers or {}).get('Idempotency-Key')
+                if key is not None and key in self.order_keys:
+                    return 200, {'order_id': self.order_keys[key]}
+                self.orders.append(body)
+                if key is not None:
+                    self.order_keys[key] = len(self.orders)
+                return 200, {'order_id': len(self.orders)}
+        return 404, None
+
+    def _product(self, predicate):
+        for row in self.products:
+            if predicate(row):
+                return 200, row
+        return 404, None
+
+    def _cart_rows(self, user_id):
+        rows = []
+        for product_id, quantity in self.carts.get(user_id, {}).items():
+            row = next((row for row in self.products if row[4] == product_id), None)
+            if row:
+                rows.append([row[0], quantity, row[3] * quantity])
+        return rows
+
+    def _handler_class(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                delay = backend.latency + random.uniform(0, backend.jitter)
+                if delay:
+                    time.sleep(delay)
+                if backend.error_rate and random.random() < backend.error_rate:
+                    status, payload = 503, {'status': 'unavailable'}
+                else:
+                    status, payload = backend.handle(self.command, self.path, json.loads(raw) if raw else None,
+                                                     self.headers)
+                data = json.dumps(payload).encode()
+                etag = None
+                if self.command == 'GET' and status == 200 and self.path.startswith('/menu'):
+                    etag = '"' + hashlib.sha1(data).hexdigest()[:16] + '"'
+                    if self.headers.get('If-None-Match') == etag:
+                        status, data = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,196 @@
+import itertools
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler
+from loadtest.fake_backend import LoadTestHTTPServer
+
+BOT_TOKEN = '123456:LOAD-TEST-TOKEN'
+SEND_METHODS = frozenset({'sendMessage', 'sendPhoto', 'sendLocation', 'sendMediaGroup'})
+
+
+class FakeTelegram:
+    """
+    Підставний Telegram Bot API для навантажувального тестування.
+
+    Віддає боту синтетичні оновлення через getUpdates (long polling) або, після setWebhook,
+    надсилає їх POST-запитами на адресу вебхука з секретним токеном. Записує всі
+    вихідні повідомлення бота з часом їх надходження для кожного чату.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, token=BOT_TOKEN):
+        self.token = token
+        self.sent = {}
+        self.calls = {}
+        self._updates = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self.webhook = None
+        self._deliveries = ThreadPoolExecutor(max_workers=32, thread_name_prefix='fake-telegram-webhook')
+        self.server = LoadTestHTTPServer((host, port), self._handler_class())
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-telegram", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._deliveries.shutdown()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def push_update(self, update):
+        """
+        Додає оновлення в чергу getUpdates.
+
+        Параметри:
+            update (dict): Оновлення без update_id.
+
+        Повертає:
+            int: Призначений update_id.
+        """
+        with self._cond:
+            update = dict(update, update_id=next(self._update_ids))
+            if self.webhook is not None:
+                self._deliveries.submit(self._deliver, self.webhook, update)
+            else:
+                self._updates.append(update)
+                self._cond.notify_all()
+            return update['update_id']
+
+    def _deliver(self, webhook, update):
+        url, secret_token = webhook
+        headers = {'Content-Type': 'application/json'}
+        if secret_token:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = secret_token
+        request = urllib.request.Request(url, data=json.dumps(update).encode(), headers=headers, method='POST')
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+
+    def sent_count(self, chat_id):
+        with self._cond:
+            return len(self.sent.get(chat_id, []))
+
+    def wait_for(self, chat_id, count, timeout=10.0):
+        """
+        Чекає, поки бот надішле в чат щонайменше count повідомлень.
+
+        Повертає:
+            list: Вихідні повідомлення чату (метод, параметри, час) або None у разі тайм-ауту.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self.sent.get(chat_id, [])) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return list(self.sent[chat_id])
+
+    def call(self, method, params):
+        """
+        Обробляє виклик методу Bot API.
+
+        Параметри:
+            method (str): Назва методу.
+            params (dict): Параметри виклику.
+
+        Повертає:
+            Поле result відповіді Bot API.
+        """
+        with self._cond:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method == 'getMe':
+            return {'id': int(self.token.split(':')[0]), 'is_bot': True, 'first_name': 'Load Test', 'username': 'load_test_bot'}
+        if method == 'getUpdates':
+            return self._get_updates(int(params.get('offset') or 0), float(params.get('timeout') or 0))
+        if method in SEND_METHODS:
+            return self._record(method, params)
+        if method == 'setWebhook':
+            with self._cond:
+                self.webhook = (params['url'], params.get('secret_token'))
+        if method == 'deleteWebhook':
+            with self._cond:
+                self.webhook = None
+        return True
+
+    def _get_updates(self, offset, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._updates = [update for update in self._updates if update['update_id'] >= offset]
+            while not self._updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+            return list(self._updates[:100])
+
+    def _record(self, method, params):
+        chat_id = int(params['chat_id'])
+        chat = {'id': chat_id, 'type': 'private'}
+        if method == 'sendMediaGroup':
+            media = params['media'] if isinstance(params['media'], list) else json.loads(params['media'])
+            result = [self._message(chat, photo=self._photo()) for _ in media]
+        elif method == 'sendPhoto':
+            result = self._message(chat, photo=self._photo(), caption=params.get('caption'))
+        elif method == 'sendLocation':
+            result = self._message(chat, location={'latitude': float(params['latitude']),
+                                                   'longitude': float(params['longitude'])})
+        else:
+            result = self._message(chat, text=params.get('text'))
+        with self._cond:
+            self.sent.setdefault(chat_id, []).append((method, params, time.monotonic()))
+            self._cond.notify_all()
+        return result
+
+    def _message(self, chat, **fields):
+        message = {'message_id': next(self._message_ids), 'date': int(time.time()), 'chat': chat}
+        message.update({key: value for key, value in fields.items() if value is not None})
+        return message
+
+    def _photo(self):
+        file_id = f"file-{next(self._file_ids)}"
+        return [{'file_id': file_id, 'file_unique_id': file_id, 'width': 800, 'height': 800}]
+
+    def _handler_class(self):
+        telegram = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                method = self.path.rstrip('/').rsplit('/', 1)[-1]
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                params = self._parse(raw)
+                data = json.dumps({'ok': True, 'result': telegram.call(method, params)}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def _parse(self, raw):
+                content_type = self.headers.get('Content-Type', '')
+                if content_type.startswith('multipart/form-data'):
+                    message = BytesParser().parsebytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + raw)
+                    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True).decode()
+                            for part in message.get_payload()}
+                return json.loads(raw) if raw else {}
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,258 @@
+"""
+Генератор навантаження для бота.
+
+Запускає підставний сервер API та підставний Telegram Bot API, піднімає BotManager,
+що працює з ними, і проганяє синтетичних користувачів через повний сценарій замовлення.
+Наприкінці виводить кількість оброблених оновлень за секунду та перцентилі затримки
+для кожної команди.
+
+Запуск: python -m loadtest.load_generator --users 50 --iterations 3 --backend-latency 0.02
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from loadtest.fake_backend import FakeBackend
+from loadtest.fake_telegram import FakeTelegram
+
+_message_ids = itertools.count(1)
+
+
+def _user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': f"User{user_id}", 'username': f"user{user_id}"}
+
+
+def _message(user_id, **fields):
+    message = {'message_id': next(_message_ids), 'date': int(time.time()), 'from': _user(user_id),
+               'chat': {'id': user_id, 'type': 'private'}}
+    message.update(fields)
+    return {'message': message}
+
+
+def command_update(user_id, command):
+    return _message(user_id, text=command, entities=[{'type': 'bot_command', 'offset': 0, 'length': len(command)}])
+
+
+def callback_update(user_id, data):
+    message = _message(user_id, text='...')['message']
+    return {'callback_query': {'id': str(next(_message_ids)), 'from': _user(user_id), 'message': message,
+                               'chat_instance': str(user_id), 'data': data}}
+
+
+def contact_update(user_id):
+    return _message(user_id, contact={'phone_number': f"+380{user_id:09d}", 'first_name': f"User{user_id}",
+                                      'user_id': user_id})
+
+
+def location_update(user_id):
+    return _message(user_id, location={'latitude': 50.45, 'longitude': 30.52})
+
+
+def _buttons(sent):
+    """
+    Повертає callback_data всіх inline-кнопок з вихідних повідомлень.
+    """
+    buttons = []
+    for _, params, _ in sent:
+        markup = params.get('reply_markup')
+        if isinstance(markup, str):
+            markup = json.loads(markup)
+        for row in (markup or {}).get('inline_keyboard', []):
+            buttons.extend(button.get('callback_data') for button in row)
+    return buttons
+
+
+class SyntheticUser(threading.Thread):
+    """
+    Синтетичний користувач, що послідовно проходить сценарій замовлення.
+    """
+
+    def __init__(self, user_id, telegram, iterations, stats, timeout):
+        super().__init__(name=f"user-{user_id}", daemon=True)
+        self.user_id = user_id
+        self.telegram = telegram
+        self.iterations = iterations
+        self.stats = stats
+        self.timeout = timeout
+        self.registered = False
+
+    def step(self, name, update, expected):
+        """
+        Надсилає оновлення і чекає expected відповідей бота.
+
+        Повертає:
+            list: Нові вихідні повідомлення або None у разі тайм-ауту.
+        """
+        before = self.telegram.sent_count(self.user_id)
+        started = time.monotonic()
+        self.telegram.push_update(update)
+        sent = self.telegram.wait_for(self.user_id, before + expected, self.timeout)
+        if sent is None:
+            self.stats.record(name, None)
+            return None
+        self.stats.record(name, sent[before + expected - 1][2] - started)
+        return sent[before:]
+
+    def run(self):
+        uid = self.user_id
+        for _ in range(self.iterations):
+            if self.step('start', command_update(uid, '/start'), 1) is None:
+                return
+            menu = self.step('menu', callback_update(uid, 'menu'), 1)
+            if menu is None:
+                return
+            products = [data for data in _buttons(menu) if data != 'all_details']
+            details = self.step('details', callback_update(uid, products[0]), 1)
+            if details is None:
+                return
+            if self.step('add_to_cart', callback_update(uid, _buttons(details)[0]), 1) is None:
+                return
+            if self.step('open_cart', callback_update(uid, 'open_cart'), 1) is None:
+                return
+            if self.registered:
+                if self.step('start_order', callback_update(uid, 'start_order'), 2) is None:
+                    return
+            else:
+                if self.step('start_order', callback_update(uid, 'start_order'), 1) is None:
+                    return
+                if self.step('got_phone_number', contact_update(uid), 2) is None:
+                    return
+                if self.step('got_location', location_update(uid), 3) is None:
+                    return
+                self.registered = True
+            if self.step('confirm_order', callback_update(uid, 'confirm_order'), 1) is None:
+                return
+
+
+class LatencyStats:
+    """
+    Збирає затримки відповідей бота для кожної команди.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.timeouts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, latency):
+        with self._lock:
+            if latency is None:
+                self.timeouts[name] = self.timeouts.get(name, 0) + 1
+            else:
+                self.samples.setdefault(name, []).append(latency)
+
+    @staticmethod
+    def percentile(values, q):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def report(self):
+        """
+        Повертає перцентилі затримки (мс) та кількість тайм-аутів для кожної команди.
+        """
+        with self._lock:
+            report = {}
+            for name in set(self.samples) | set(self.timeouts):
+                values = self.samples.get(name, [])
+                report[name] = {'count': len(values), 'timeouts': self.timeouts.get(name, 0)}
+                if values:
+                    report[name].update({f"p{int(q * 100)}_ms": round(self.percentile(values, q) * 1000, 2)
+                                         for q in (0.5, 0.95, 0.99)})
+            return report
+
+    @property
+    def total(self):
+        with self._lock:
+            return sum(len(values) for values in self.samples.values()) + sum(self.timeouts.values())
+
+
+def run_load(telegram, users, iterations, timeout=10.0, first_user_id=100000, mode='threads', processes=2):
+    """
+    Запускає BotManager проти підставного Telegram та проганяє синтетичних користувачів.
+
+    Адреса API має бути налаштована (змінна оточення API_URL) до імпорту модулів бота.
+    mode обирає режим роботи бота: 'threads', 'asyncio', 'webhook' або 'processes'
+    (супервізор з processes робочими процесами).
+
+    Повертає:
+        dict: Кількість оновлень, тривалість, оновлення за секунду та затримки команд.
+    """
+    from bot_manager import BotManager
+    from db_manager import APIClient
+    from supervisor import Supervisor
+
+    if mode == 'processes':
+        bot_manager = Supervisor(telegram.token, base_url=telegram.base_url, processes=processes).start()
+        serving = threading.Thread(target=bot_manager.serve, kwargs={'poll_timeout': 1}, daemon=True)
+        serving.start()
+    else:
+        bot_manager = BotManager(telegram.token, base_url=telegram.base_url)
+    if mode == 'asyncio':
+        serving = threading.Thread(target=asyncio.run, args=(bot_manager.serve_async(poll_timeout=1),), daemon=True)
+        serving.start()
+    elif mode == 'webhook':
+        bot_manager.start_webhook(local=True, host='127.0.0.1', port=0, secret_token='load-test-secret')
+    elif mode == 'threads':
+        bot_manager.start_polling(poll_interval=0, timeout=1)
+    stats = LatencyStats()
+    threads = [SyntheticUser(first_user_id + index, telegram, iterations, stats, timeout) for index in range(users)]
+    started = time.monotonic()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+    finally:
+        if mode == 'asyncio':
+            bot_manager.stop_async()
+            serving.join()
+        elif mode == 'processes':
+            bot_manager.stop()
+            serving.join()
+        else:
+            bot_manager.stop()
+        APIClient.cart_writes.flush_all()
+    return {'updates': stats.total, 'seconds': round(elapsed, 3),
+            'updates_per_second': round(stats.total / elapsed, 1) if elapsed else 0.0,
+            'commands': stats.report()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Навантажувальний тест бота на підставних серверах")
+    parser.add_argument('--users', type=int, default=20, help="кількість синтетичних користувачів")
+    parser.add_argument('--iterations', type=int, default=3, help="скільки разів кожен користувач проходить сценарій")
+    parser.add_argument('--backend-latency', type=float, default=0.01, help="затримка відповіді API, с")
+    parser.add_argument('--backend-jitter', type=float, default=0.0, help="випадкова добавка до затримки API, с")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="ймовірність відповіді 503 від API")
+    parser.add_argument('--timeout', type=float, default=10.0, help="тайм-аут очікування відповіді бота, с")
+    parser.add_argument('--mode', choices=('threads', 'asyncio', 'webhook', 'processes'), default='threads',
+                        help="режим роботи бота")
+    parser.add_argument('--processes', type=int, default=2, help="кількість робочих процесів у режимі processes")
+    parser.add_argument('--telegram-limits', action='store_true',
+                        help="надсилати відповіді з лімітами Telegram (за замовчуванням ліміти вимкнено, "
+                             "щоб вимірювати пропускну здатність самого бота)")
+    args = parser.parse_args()
+
+    backend = FakeBackend(latency=args.backend_latency, jitter=args.backend_jitter, error_rate=args.error_rate).start()
+    telegram = FakeTelegram().start()
+    os.environ['API_URL'] = backend.url
+    if not args.telegram_limits:
+        os.environ['BOT_OUTBOUND_GLOBAL_RATE'] = '0'
+        os.environ['BOT_OUTBOUND_CHAT_RATE'] = '0'
+    try:
+        result = run_load(telegram, args.users, args.iterations, args.timeout, mode=args.mode,
+                          processes=args.processes)
+    finally:
+        telegram.stop()
+        backend.stop()
+    result['backend_requests'] = backend.requests
+    result['telegram_calls'] = telegram.calls
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
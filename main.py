@@ -3,7 +3,9 @@
 import os
 import logging
 from dotenv import load_dotenv
+import config
 from bot_manager import BotManager
+from supervisor import Supervisor
 
 
 def setup_logging():
@@ -28,6 +30,10 @@ if __name__ == '__main__':
     load_dotenv()
     token = os.getenv("CLIENT_BOT_TOKEN")  # Отримання токену бота з змінних оточення
 
-    # Створення екземпляру BotManager і запуск бота
-    bot_manager = BotManager(token)
-    bot_manager.run()
+    if config.bot_run_mode == 'processes':
+        # Кожен робочий процес створює власний BotManager; батьківський процес лише розподіляє оновлення
+        Supervisor(token, initializer=setup_logging).run()
+    else:
+        # Створення екземпляру BotManager і запуск бота
+        bot_manager = BotManager(token)
+        bot_manager.run()
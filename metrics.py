@@ -0,0 +1,159 @@
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+DEPTH_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class MetricsSink:
+    """
+    Інтерфейс приймача метрик.
+
+    Базова реалізація нічого не робить; для експорту метрик у зовнішню систему
+    (StatsD, Prometheus, ...) достатньо перевизначити increment та observe.
+    """
+
+    def increment(self, name, value=1, **tags):
+        """
+        Збільшує лічильник.
+
+        Параметри:
+            name (str): Назва метрики.
+            value (int): На скільки збільшити лічильник.
+            **tags: Мітки метрики (endpoint, status, ...).
+        """
+
+    def observe(self, name, value, **tags):
+        """
+        Додає спостереження до гістограми.
+
+        Параметри:
+            name (str): Назва метрики.
+            value (float): Значення спостереження.
+            **tags: Мітки метрики.
+        """
+
+    def record_request(self, endpoint, method, status, duration, payload_bytes=None, retries=0):
+        """
+        Записує метрики одного запиту до API.
+
+        Параметри:
+            endpoint (str): Логічна група запитів (menu, details, cart, user, order).
+            method (str): HTTP-метод.
+            status: Код відповіді або назва помилки, якщо відповіді немає.
+            duration (float): Тривалість запиту у секундах.
+            payload_bytes (int): Розмір тіла відповіді у байтах.
+            retries (int): Кількість повторних спроб.
+        """
+        self.observe('api.latency', duration, endpoint=endpoint, method=method)
+        self.increment('api.status', endpoint=endpoint, status=status)
+        if payload_bytes is not None:
+            self.observe('api.payload_bytes', payload_bytes, endpoint=endpoint)
+        if retries:
+            self.increment('api.retries', retries, endpoint=endpoint)
+
+
+class Histogram:
+    """
+    Гістограма з фіксованими межами кошиків для оцінки перцентилів.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Оцінює перцентиль як верхню межу кошика, в який він потрапляє.
+
+        Параметри:
+            q (float): Перцентиль від 0 до 1.
+
+        Повертає:
+            float: Оцінка значення (для останнього кошика - максимальне спостереження).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {'count': self.count, 'sum': self.sum, 'max': self.max,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99)}
+
+
+class InMemoryMetrics(MetricsSink):
+    """
+    Приймач метрик, що зберігає лічильники та гістограми в пам'яті процесу.
+    """
+
+    def __init__(self, buckets=None):
+        """
+        Параметри:
+            buckets (dict): Межі кошиків гістограм за назвою метрики; решта метрик
+                використовує межі для затримок.
+        """
+        self.buckets = {'api.latency': LATENCY_BUCKETS, 'api.payload_bytes': SIZE_BUCKETS,
+                        'scheduler.queue_depth': DEPTH_BUCKETS}
+        self.buckets.update(buckets or {})
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, tags):
+        if not tags:
+            return name
+        labels = ','.join(f"{key}={value}" for key, value in sorted(tags.items()))
+        return f"{name}{{{labels}}}"
+
+    def increment(self, name, value=1, **tags):
+        key = self._key(name, tags)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **tags):
+        key = self._key(name, tags)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(self.buckets.get(name, LATENCY_BUCKETS))
+                self._histograms[key] = histogram
+            histogram.observe(value)
+
+    def snapshot(self):
+        """
+        Повертає знімок усіх метрик.
+
+        Повертає:
+            dict: Лічильники та зведення гістограм (кількість, сума, максимум, p50/p95/p99).
+        """
+        with self._lock:
+            return {'counters': dict(self._counters),
+                    'histograms': {key: histogram.summary() for key, histogram in self._histograms.items()}}
+
+    def reset(self):
+        """
+        Скидає всі метрики.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+metrics = InMemoryMetrics()
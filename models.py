@@ -0,0 +1,140 @@
+from typing import NamedTuple, Optional
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(value):
+        # orjson не серіалізує NamedTuple, тому моделі записуються як рядки-списки
+        return orjson.dumps(value, default=list)
+except ImportError:  # pragma: no cover - orjson є необов'язковою залежністю
+    import json
+
+    _loads = json.loads
+
+    def _dumps(value):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def loads(data):
+    """
+    Розбирає тіло JSON-відповіді швидким декодером (orjson, якщо встановлений).
+
+    Параметри:
+        data (bytes): Тіло відповіді.
+
+    Повертає:
+        Розібрані дані або None для порожнього тіла.
+    """
+    return _loads(data) if data else None
+
+
+def dumps(value):
+    """
+    Серіалізує дані (зокрема моделі) у компактний JSON.
+
+    Параметри:
+        value: Дані для серіалізації.
+
+    Повертає:
+        bytes: JSON у кодуванні UTF-8.
+    """
+    return _dumps(value)
+
+
+def _int(value):
+    return None if value is None else int(value)
+
+
+class Product(NamedTuple):
+    """
+    Товар каталогу: назва, склад, фото, ціна, ID.
+    """
+    name: str
+    ingredients: Optional[str] = None
+    photo: Optional[str] = None
+    price: Optional[float] = None
+    id: Optional[int] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        Створює товар з рядка (списку полів) або словника відповіді API.
+
+        Повертає:
+            Product | None: Товар або None, якщо даних немає.
+        """
+        if not data:
+            return None
+        if isinstance(data, dict):
+            return cls(data['name'], data.get('ingredients'), data.get('photo'), data.get('price'),
+                       _int(data.get('id', data.get('product_id'))))
+        name, ingredients, photo, price, product_id = (list(data) + [None] * 5)[:5]
+        return cls(name, ingredients, photo, price, _int(product_id))
+
+
+class CartLine(NamedTuple):
+    """
+    Рядок кошика: назва товару, кількість, сума.
+    """
+    name: str
+    quantity: int
+    total: float
+
+    @classmethod
+    def from_json(cls, data):
+        if isinstance(data, dict):
+            return cls(data['name'], int(data['quantity']), data['total'])
+        name, quantity, total = data[:3]
+        return cls(name, int(quantity), total)
+
+
+class UserProfile(NamedTuple):
+    """
+    Профіль користувача: ID, логін, ім'я, прізвище, телефон, адреса доставки.
+    """
+    user_id: int
+    username: Optional[str] = None
+    firstname: Optional[str] = None
+    lastname: Optional[str] = None
+    phone_number: Optional[str] = None
+    location: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        Повертає:
+            UserProfile | None: Профіль або None, якщо користувача не знайдено.
+        """
+        if not data:
+            return None
+        if isinstance(data, dict):
+            return cls(int(data['user_id']), data.get('username'), data.get('firstname'), data.get('lastname'),
+                       data.get('phone_number'), data.get('location'))
+        return cls(int(data[0]), *data[1:6])
+
+
+class OrderReceipt(NamedTuple):
+    """
+    Підтвердження створення замовлення.
+    """
+    order_id: int
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(int(data['order_id']))
+
+
+def products(data):
+    """
+    Перетворює відповідь /menu на список товарів.
+    """
+    return [product for product in map(Product.from_json, data or []) if product]
+
+
+def cart_lines(data):
+    """
+    Перетворює відповідь /cart на список рядків кошика.
+    """
+    return [CartLine.from_json(row) for row in data or []]
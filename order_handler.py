@@ -1,3 +1,4 @@
+import asyncio
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup, \
     ReplyKeyboardRemove
 from telegram.ext import CallbackContext
@@ -5,6 +6,9 @@ from prettytable import PrettyTable
 from start_command import StartCommand
 from command_base import CommandBase
 from db_manager import APIClient
+from async_db_manager import AsyncAPIClient
+from circuit_breaker import CircuitOpenError
+from press_guard import press_key
 import logging
 
 
@@ -26,6 +30,9 @@ class StartOrderCommand(CommandBase):
         Параметри:
             update (Update): Об'єкт Update від Telegram API.
             context (CallbackContext): Контекст виконання команди.
+
+        Повертає:
+            bool: True, якщо оформлення розпочато, інакше None.
         """
         try:
             context.user_data['processing_order'] = True
@@ -39,6 +46,40 @@ class StartOrderCommand(CommandBase):
                 lastname = update.effective_user.last_name
                 APIClient.add_user(user_id, username, firstname, lastname)
                 self.factory.get_command("request_phone_number").execute(update, context)
+            return True
+        except CircuitOpenError:
+            context.user_data['processing_order'] = False
+            self.reply_unavailable(update, context)
+        except Exception as e:
+            logging.error(f"Start Order Command execute error: {e}", exc_info=True)
+
+    async def execute_async(self, update: Update, context: CallbackContext):
+        """
+        Асинхронний варіант execute: дані користувача запитуються без блокування, а наступна
+        команда виконується своїм execute_async.
+
+        Параметри:
+            update (Update): Об'єкт Update від Telegram API.
+            context (CallbackContext): Контекст виконання команди.
+
+        Повертає:
+            bool: True, якщо оформлення розпочато, інакше None.
+        """
+        try:
+            context.user_data['processing_order'] = True
+            user_id = update.effective_user.id
+            user = await AsyncAPIClient.get_user(user_id)
+            if user:
+                await self.factory.get_command("request_order_confirmation").execute_async(update, context)
+            else:
+                effective_user = update.effective_user
+                await AsyncAPIClient.add_user(user_id, effective_user.username, effective_user.first_name,
+                                              effective_user.last_name)
+                await self.factory.get_command("request_phone_number").execute_async(update, context)
+            return True
+        except CircuitOpenError:
+            context.user_data['processing_order'] = False
+            await asyncio.to_thread(self.reply_unavailable, update, context)
         except Exception as e:
             logging.error(f"Start Order Command execute error: {e}", exc_info=True)
 
@@ -52,28 +93,63 @@ class ConfirmOrderCommand(CommandBase):
         """
         Виконує команду підтвердження замовлення та надсилає інформацію про успішне оформлення.
 
+        Замовлення створюється з ключем ідемпотентності, похідним від повідомлення з кнопкою
+        підтвердження, тож API не створить друге замовлення для того самого підтвердження.
+
         Параметри:
             update (Update): Об'єкт Update від Telegram API.
             context (CallbackContext): Контекст виконання команди.
+
+        Повертає:
+            OrderReceipt: Підтвердження створеного замовлення або None.
         """
+        order_id = None
+        receipt = None
+        confirming = False
         try:
             if context.user_data['processing_order']:
                 context.user_data['processing_order'] = False
+                confirming = True
                 user_id = update.effective_user.id
-                cart_items = APIClient.get_cart(user_id)
-                order_list = [(item[0], item[1], item[2]) for item in cart_items]
-                total_price = sum(item[2] for item in cart_items)
+                # Суми замовлення беруться з кошика в бекенді, а не з локального дзеркала
+                cart_items = APIClient.get_cart(user_id, fresh=True)
+                order_list = [(item.name, item.quantity, item.total) for item in cart_items]
+                total_price = sum(item.total for item in cart_items)
                 user_info = APIClient.get_user(user_id)
-                phone_number = user_info[4]
-                location = user_info[5]
-                order_id = APIClient.create_order(user_id, phone_number, order_list, total_price, location)
+                phone_number = user_info.phone_number
+                location = user_info.location
+                idempotency_key = '-'.join(str(part) for part in press_key(update, "confirm_order"))
+                receipt = APIClient.create_order(user_id, phone_number, order_list, total_price, location,
+                                                 idempotency_key=idempotency_key)
+                order_id = receipt.order_id
+                self.repeat_result(receipt, update, context)
                 APIClient.clear_cart(user_id)
-                context.bot.send_message(chat_id=update.effective_chat.id,
-                                         text=f"✅ Ваше замовлення #{order_id['order_id']} оформлено. Очікуйте на дзвінок кур'єра ❣️")
             else:
                 StartCommand().execute(update, context)
         except Exception as e:
-            logging.error(f"Confirm Order Command execute error: {e}", exc_info=True)
+            if order_id is not None:
+                logging.error(f"Confirm Order Command clear cart error: {e}", exc_info=True)
+            else:
+                if not isinstance(e, CircuitOpenError):
+                    logging.error(f"Confirm Order Command execute error: {e}", exc_info=True)
+                if confirming:
+                    # Замовлення ще не створене - користувач зможе підтвердити його пізніше
+                    context.user_data['processing_order'] = True
+                    self.reply_unavailable(update, context)
+        return receipt
+
+    def repeat_result(self, receipt, update: Update, context: CallbackContext):
+        """
+        Надсилає підтвердження оформленого замовлення (також у відповідь на повторне натискання).
+
+        Параметри:
+            receipt (OrderReceipt): Підтвердження замовлення або None, якщо замовлення не створене.
+            update (Update): Об'єкт Update від Telegram API.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        if receipt is not None:
+            context.bot.send_message(chat_id=update.effective_chat.id,
+                                     text=f"✅ Ваше замовлення #{receipt.order_id} оформлено. Очікуйте на дзвінок кур'єра ❣️")
 
 
 class CancelOrderCommand(CommandBase):
@@ -88,6 +164,9 @@ class CancelOrderCommand(CommandBase):
         Параметри:
             update (Update): Об'єкт Update від Telegram API.
             context (CallbackContext): Контекст виконання команди.
+
+        Повертає:
+            bool: True, якщо команду виконано, інакше None.
         """
         try:
             if context.user_data['processing_order']:
@@ -98,6 +177,7 @@ class CancelOrderCommand(CommandBase):
                                          reply_markup=InlineKeyboardMarkup([[menu_button], [cart_button]]))
             else:
                 StartCommand().execute(update, context)
+            return True
         except Exception as e:
             logging.error(f"Cancel Order Command execute error: {e}", exc_info=True)
 
@@ -119,27 +199,61 @@ class RequestOrderConfirmationCommand(CommandBase):
             if context.user_data['processing_order']:
                 user_id = update.effective_user.id
                 cart_items = APIClient.get_cart(user_id)
-                total = sum(item[2] for item in cart_items)
-                output = PrettyTable()
-                output.field_names = ["Назва", "N", "Сума"]
-                output.add_rows(cart_items)
                 user_data = APIClient.get_user(user_id)
-                location = user_data[5].split("|") if user_data and user_data[5] else (0, 0)
-                latitude, longitude = map(float, location)
-                order_button = InlineKeyboardButton("✅ Підтвердити замовлення", callback_data="confirm_order")
-                clean_button = InlineKeyboardButton("❌ Відхилити замовлення", callback_data="cancel_order")
-                menu_button = InlineKeyboardButton("🗺️ Змінити адресу", callback_data="request_location")
-                keyboard = InlineKeyboardMarkup([[order_button], [clean_button], [menu_button]])
-                context.bot.send_message(chat_id=update.effective_chat.id,
-                                         text=f'📄 Ваше замовлення:\n<code>{output}</code>\n\n💵 <b>До сплати:</b> {total}\n\n📱 Номер телефону: {user_data[4]}\n🗺️ Адреса доставки:',
-                                         parse_mode='HTML')
-                context.bot.send_location(chat_id=update.effective_chat.id, latitude=latitude, longitude=longitude,
-                                          reply_markup=keyboard)
+                self.send_confirmation(cart_items, user_data, update, context)
             else:
                 StartCommand().execute(update, context)
+        except CircuitOpenError:
+            self.reply_unavailable(update, context)
+        except Exception as e:
+            logging.error(f"Request Order Confirmation Command execute error: {e}", exc_info=True)
+
+    async def execute_async(self, update: Update, context: CallbackContext):
+        """
+        Асинхронний варіант execute: кошик та дані користувача запитуються одночасно.
+
+        Параметри:
+            update (Update): Об'єкт Update від Telegram API.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        try:
+            if context.user_data['processing_order']:
+                user_id = update.effective_user.id
+                cart_items, user_data = await AsyncAPIClient.get_cart_and_user(user_id)
+                await asyncio.to_thread(self.send_confirmation, cart_items, user_data, update, context)
+            else:
+                await StartCommand().execute_async(update, context)
+        except CircuitOpenError:
+            await asyncio.to_thread(self.reply_unavailable, update, context)
         except Exception as e:
             logging.error(f"Request Order Confirmation Command execute error: {e}", exc_info=True)
 
+    def send_confirmation(self, cart_items, user_data, update: Update, context: CallbackContext):
+        """
+        Надсилає користувачу деталі замовлення та точку доставки з кнопками підтвердження.
+
+        Параметри:
+            cart_items (list[CartLine]): Вміст кошика.
+            user_data (UserProfile): Профіль користувача.
+            update (Update): Об'єкт Update від Telegram API.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        total = sum(item.total for item in cart_items)
+        output = PrettyTable()
+        output.field_names = ["Назва", "N", "Сума"]
+        output.add_rows(cart_items)
+        location = user_data.location.split("|") if user_data and user_data.location else (0, 0)
+        latitude, longitude = map(float, location)
+        order_button = InlineKeyboardButton("✅ Підтвердити замовлення", callback_data="confirm_order")
+        clean_button = InlineKeyboardButton("❌ Відхилити замовлення", callback_data="cancel_order")
+        menu_button = InlineKeyboardButton("🗺️ Змінити адресу", callback_data="request_location")
+        keyboard = InlineKeyboardMarkup([[order_button], [clean_button], [menu_button]])
+        context.bot.send_message(chat_id=update.effective_chat.id,
+                                 text=f'📄 Ваше замовлення:\n<code>{output}</code>\n\n💵 <b>До сплати:</b> {total}\n\n📱 Номер телефону: {user_data.phone_number}\n🗺️ Адреса доставки:',
+                                 parse_mode='HTML')
+        context.bot.send_location(chat_id=update.effective_chat.id, latitude=latitude, longitude=longitude,
+                                  reply_markup=keyboard)
+
 
 class RequestPhoneNumberCommand(CommandBase):
     """
@@ -246,3 +360,25 @@ class GotLocationCommand(CommandBase):
                 StartCommand().execute(update, context)
         except Exception as e:
             logging.error(f"Got Location Command execute error: {e}", exc_info=True)
+
+    async def execute_async(self, update: Update, context: CallbackContext):
+        """
+        Асинхронний варіант execute: адреса зберігається без блокування, а запит підтвердження
+        замовлення виконується своїм execute_async.
+
+        Параметри:
+            update (Update): Об'єкт Update від Telegram API.
+            context (CallbackContext): Контекст виконання команди.
+        """
+        try:
+            if context.user_data['processing_order']:
+                user_id = update.effective_user.id
+                location = f"{update.message.location.latitude}|{update.message.location.longitude}"
+                await AsyncAPIClient.update_user_contact(user_id, location=location)
+                await asyncio.to_thread(context.bot.send_message, chat_id=update.effective_chat.id,
+                                        text="✅ Адресу збережено")
+                await self.factory.get_command("request_order_confirmation").execute_async(update, context)
+            else:
+                await StartCommand().execute_async(update, context)
+        except Exception as e:
+            logging.error(f"Got Location Command execute error: {e}", exc_info=True)
@@ -0,0 +1,356 @@
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from telegram import Bot
+from telegram.error import RetryAfter
+import config
+from metrics import metrics as default_metrics
+
+# Пріоритети вихідних повідомлень: менше значення надсилається раніше
+TRANSACTIONAL = 0
+BULK = 1
+
+_priority = contextvars.ContextVar('outbound_priority', default=TRANSACTIONAL)
+
+
+@contextlib.contextmanager
+def priority(value):
+    """
+    Задає пріоритет повідомлень, що надсилаються всередині блоку with (у поточному потоці
+    або задачі та в asyncio.to_thread, викликаних з неї).
+
+    Параметри:
+        value (int): TRANSACTIONAL або BULK.
+    """
+    token = _priority.set(value)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def bulk():
+    """
+    Блок масового надсилання (наприклад, всі товари меню): такі повідомлення поступаються
+    транзакційним.
+    """
+    return priority(BULK)
+
+
+def transactional():
+    """
+    Блок транзакційних повідомлень (відповіді на дії користувача, підтвердження замовлень).
+    Пріоритет за замовчуванням.
+    """
+    return priority(TRANSACTIONAL)
+
+
+class TokenBucket:
+    """
+    Відро токенів: rate токенів за секунду, не більше capacity накопичених. rate <= 0 - без обмеження.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now):
+        """
+        Повертає, скільки секунд чекати до появи токена (0 - токен є).
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens -= 1
+
+    def full(self, now):
+        """
+        Повертає True, якщо відро повне, тобто його стан можна відкинути без порушення ліміту.
+        """
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Chat:
+    def __init__(self, bucket):
+        self.queues = (deque(), deque())
+        self.bucket = bucket
+        self.busy = False
+        self.paused_until = 0.0
+
+    def head(self):
+        for queue in self.queues:
+            if queue:
+                return queue[0]
+        return None
+
+
+class _Send:
+    __slots__ = ('future', 'call', 'args', 'kwargs', 'priority', 'enqueued_at', 'attempts')
+
+    def __init__(self, call, args, kwargs, priority):
+        self.future = Future()
+        self.call = call
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class OutboundScheduler:
+    """
+    Планувальник вихідних повідомлень Bot API.
+
+    Надсилання ставиться в чергу чату і одразу повертає Future, тож обробник не чекає доставки.
+    Фоновий потік вибирає наступне повідомлення з урахуванням загального ліміту бота та ліміту
+    кожного чату (відра токенів) і передає його пулу потоків надсилання. Повідомлення одного чату
+    надсилаються по одному в порядку надходження, але транзакційні випереджають масові (див. bulk),
+    а серед чатів першими обслуговуються ті, що чекають на транзакційне повідомлення. Після
+    відповіді 429 (RetryAfter) на вказаний час призупиняються і чат, і все надсилання бота, а
+    повідомлення надсилається повторно, не більше max_retries разів. Якщо бот працює в кількох
+    процесах, кожен з них отримує частку загального ліміту (див. share).
+    """
+
+    def __init__(self, global_rate=None, chat_rate=None, chat_burst=None, workers=None, max_retries=None,
+                 metrics=None, share=None):
+        """
+        Параметри:
+            global_rate (float): Надсилань за секунду для всього бота (0 - без обмеження);
+                за замовчуванням config.bot_outbound_global_rate.
+            chat_rate (float): Надсилань за секунду в один чат (0 - без обмеження);
+                за замовчуванням config.bot_outbound_chat_rate.
+            chat_burst (int): Скільки повідомлень можна надіслати в чат поспіль без очікування.
+            workers (int): Кількість потоків надсилання.
+            max_retries (int): Максимальна кількість повторів після RetryAfter.
+            metrics (MetricsSink): Приймач метрик (за замовчуванням спільний InMemoryMetrics).
+            share (callable, optional): Повертає частку global_rate, що належить цьому процесу
+                (наприклад, 1/N для N робочих процесів); за замовчуванням весь ліміт.
+        """
+        self.global_rate = config.bot_outbound_global_rate if global_rate is None else global_rate
+        self.chat_rate = config.bot_outbound_chat_rate if chat_rate is None else chat_rate
+        self.chat_burst = config.bot_outbound_chat_burst if chat_burst is None else chat_burst
+        self.workers = workers or config.bot_outbound_workers
+        self.max_retries = config.bot_outbound_max_retries if max_retries is None else max_retries
+        self.metrics = default_metrics if metrics is None else metrics
+        self.share = share
+        self._bucket = TokenBucket(self.global_rate, self.global_rate)
+        self._paused_until = 0.0
+        self._chats = {}
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+
+    def submit(self, chat_id, call, *args, **kwargs):
+        """
+        Ставить надсилання в чергу чату з пріоритетом поточного блоку (див. bulk).
+
+        Параметри:
+            chat_id: ID чату.
+            call (callable): Метод Bot API, що виконує надсилання.
+            *args, **kwargs: Аргументи call.
+
+        Повертає:
+            Future: Результат call (наприклад, Message) або його помилка.
+        """
+        send = _Send(call, args, kwargs, _priority.get())
+        with self._cond:
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _Chat(TokenBucket(self.chat_rate, self.chat_burst))
+            chat.queues[send.priority].append(send)
+            self._pending += 1
+            self.metrics.observe('outbound.queue_depth', sum(len(queue) for queue in chat.queues))
+            self._ensure_worker()
+            self._cond.notify()
+        return send.future
+
+    def join(self, timeout=None):
+        """
+        Чекає, поки всі поставлені повідомлення будуть надіслані.
+
+        Повертає:
+            bool: True, якщо черги спорожніли до закінчення тайм-ауту.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, timeout=None):
+        """
+        Дочікується надсилання поставлених повідомлень і зупиняє потоки. Наступне надсилання
+        запустить їх знову.
+        """
+        self.join(timeout)
+        with self._cond:
+            thread, self._thread = self._thread, None
+            executor, self._executor = self._executor, None
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        """
+        Повертає поточний стан черг.
+
+        Повертає:
+            dict: Кількість чатів з повідомленнями, загальна кількість повідомлень та кількість
+                масових повідомлень.
+        """
+        with self._cond:
+            chats = [chat for chat in self._chats.values() if chat.head() is not None]
+            return {'chats': len(chats), 'pending': self._pending,
+                    'bulk': sum(len(chat.queues[BULK]) for chat in chats)}
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='outbound-send')
+            self._thread = threading.Thread(target=self._run, name='outbound-scheduler', daemon=True)
+            self._thread.start()
+
+    def _global_delay(self, now):
+        """
+        Повертає, скільки секунд чекати до наступного надсилання з урахуванням загального ліміту
+        та паузи після RetryAfter.
+        """
+        if self.share is not None:
+            rate = self.global_rate * self.share()
+            self._bucket.rate, self._bucket.capacity = rate, max(rate, 1)
+        return max(self._paused_until - now, self._bucket.delay(now))
+
+    def _select(self, now):
+        """
+        Вибирає чат, повідомлення якого можна надіслати зараз.
+
+        Повертає:
+            tuple: (ID чату або None, через скільки секунд з'явиться готовий чат або None).
+        """
+        best = best_key = None
+        wake = None
+        for chat_id, chat in list(self._chats.items()):
+            send = chat.head()
+            if send is None:
+                if not chat.busy and chat.paused_until <= now and chat.bucket.full(now):
+                    del self._chats[chat_id]
+                continue
+            if chat.busy:
+                continue
+            delay = max(chat.paused_until - now, chat.bucket.delay(now))
+            if delay > 0:
+                wake = delay if wake is None else min(wake, delay)
+                continue
+            key = (send.priority, send.enqueued_at)
+            if best_key is None or key < best_key:
+                best, best_key = chat_id, key
+        return best, wake
+
+    def _run(self):
+        """
+        Фоновий цикл: передає потокам надсилання повідомлення, для яких дозволяють ліміти.
+        """
+        while True:
+            with self._cond:
+                if self._thread is not threading.current_thread():
+                    return
+                now = time.monotonic()
+                chat_id, wake = self._select(now)
+                if chat_id is None:
+                    self._cond.wait(wake)
+                    continue
+                delay = self._global_delay(now)
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                chat = self._chats[chat_id]
+                send = chat.queues[chat.head().priority].popleft()
+                chat.busy = True
+                chat.bucket.take(now)
+                self._bucket.take(now)
+                executor = self._executor
+            executor.submit(self._send, chat, send)
+
+    def _send(self, chat, send):
+        send.attempts += 1
+        retry_after = None
+        try:
+            result = send.call(*send.args, **send.kwargs)
+        except RetryAfter as e:
+            self.metrics.increment('outbound.retry_after')
+            if send.attempts <= self.max_retries:
+                retry_after = e.retry_after
+            else:
+                logging.error(f"Outbound send error: {e}", exc_info=True)
+                send.future.set_exception(e)
+        except Exception as e:
+            self.metrics.increment('outbound.failed')
+            logging.error(f"Outbound send error: {e}", exc_info=True)
+            send.future.set_exception(e)
+        else:
+            self.metrics.increment('outbound.sent', priority='bulk' if send.priority == BULK else 'transactional')
+            self.metrics.observe('outbound.wait', time.monotonic() - send.enqueued_at)
+            send.future.set_result(result)
+        with self._cond:
+            chat.busy = False
+            if retry_after is not None:
+                # Повідомлення повертається на початок черги, щоб не порушити порядок у чаті
+                chat.queues[send.priority].appendleft(send)
+                chat.paused_until = time.monotonic() + retry_after
+                # 429 може стосуватися загального ліміту бота, тож пауза діє і на інші чати
+                self._paused_until = max(self._paused_until, chat.paused_until)
+            else:
+                self._pending -= 1
+            self._cond.notify_all()
+
+
+class ScheduledBot(Bot):
+    """
+    Bot, що надсилає повідомлення, фото, місце розташування та альбоми через OutboundScheduler.
+
+    Методи надсилання повертаються одразу з Future замість Message.
+    """
+
+    def __init__(self, *args, outbound=None, **kwargs):
+        """
+        Параметри:
+            *args, **kwargs: Аргументи Bot.
+            outbound (OutboundScheduler, optional): Планувальник; за замовчуванням - новий з лімітами з config.
+        """
+        super().__init__(*args, **kwargs)
+        self.outbound = outbound or OutboundScheduler()
+
+    def send_message(self, chat_id, *args, **kwargs):
+        return self.outbound.submit(chat_id, super().send_message, chat_id, *args, **kwargs)
+
+    def send_photo(self, chat_id, *args, **kwargs):
+        return self.outbound.submit(chat_id, super().send_photo, chat_id, *args, **kwargs)
+
+    def send_location(self, chat_id, *args, **kwargs):
+        return self.outbound.submit(chat_id, super().send_location, chat_id, *args, **kwargs)
+
+    def send_media_group(self, chat_id, *args, **kwargs):
+        return self.outbound.submit(chat_id, super().send_media_group, chat_id, *args, **kwargs)
+
+    sendMessage = send_message
+    sendPhoto = send_photo
+    sendLocation = send_location
+    sendMediaGroup = send_media_group
@@ -0,0 +1,151 @@
+import logging
+import sqlite3
+import threading
+from concurrent.futures import Future
+from telegram import Message
+from telegram.error import BadRequest
+import config
+
+
+class PhotoCache:
+    """
+    Постійний кеш file_id фото товарів у Telegram.
+
+    Після першого надсилання фото за URL Telegram повертає file_id, за яким те саме фото можна
+    надсилати без повторного завантаження з нашого сервера зображень. Записи зберігаються в таблиці
+    бази стану бота за ID товару разом з URL, з якого фото було завантажене, тож після зміни фото
+    в каталозі (нового URL) запис не використовується, а перезаписується при наступному надсиланні.
+    Якщо Telegram відхиляє збережений file_id, запис забувається і фото надсилається за URL.
+    """
+
+    def __init__(self, path=None):
+        """
+        Параметри:
+            path (str, optional): Файл бази; за замовчуванням config.bot_state_path на момент першого звернення.
+        """
+        self.path = path
+        self._connection = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, product_id, url):
+        """
+        Повертає file_id фото товару, якщо воно надсилалось з того самого URL.
+
+        Параметри:
+            product_id (int): ID товару.
+            url (str): Поточний URL фото в каталозі.
+
+        Повертає:
+            str: file_id або None.
+        """
+        with self._lock:
+            self._connect()
+            entry = self._entries.get(product_id)
+        if entry is None or entry[0] != url:
+            return None
+        return entry[1]
+
+    def send(self, rows, send):
+        """
+        Надсилає фото товарів, підставляючи збережені file_id замість URL, і запам'ятовує file_id
+        з результату.
+
+        Параметри:
+            rows (list): Товари в порядку фото.
+            send (callable): Функція send(media), що надсилає фото; media - file_id або URL для кожного товару.
+
+        Повертає:
+            Результат send (Message, список Message або Future з ними).
+        """
+        cached = [self.get(row.id, row.photo) for row in rows]
+        media = [file_id or row.photo for file_id, row in zip(cached, rows)]
+        try:
+            result = send(media)
+        except BadRequest as e:
+            if not any(cached):
+                raise
+            return self._resend(rows, send, e)
+        if isinstance(result, Future):
+            result.add_done_callback(lambda future: self._sent(rows, send, any(cached), future))
+        else:
+            self.remember(rows, result)
+        return result
+
+    def remember(self, rows, result):
+        """
+        Запам'ятовує file_id фото з результату надсилання.
+
+        Параметри:
+            rows (list): Товари в порядку фото.
+            result: Message (sendPhoto) або список Message (sendMediaGroup).
+        """
+        messages = result if isinstance(result, (list, tuple)) else [result]
+        entries = []
+        for row, message in zip(rows, messages):
+            if row.id is None or not isinstance(message, Message) or not message.photo:
+                continue
+            # Будь-який розмір фото з відповіді дає те саме зображення; найбільший - останній
+            entries.append((row.id, row.photo, message.photo[-1].file_id))
+        with self._lock:
+            self._connect()
+            entries = [entry for entry in entries if self._entries.get(entry[0]) != entry[1:]]
+            if not entries:
+                return
+            for product_id, url, file_id in entries:
+                self._entries[product_id] = (url, file_id)
+            self._write('INSERT OR REPLACE INTO photo_file_ids (product_id, url, file_id) VALUES (?, ?, ?)', entries)
+
+    def forget(self, rows):
+        """
+        Видаляє збережені file_id фото товарів.
+        """
+        with self._lock:
+            self._connect()
+            for row in rows:
+                self._entries.pop(row.id, None)
+            self._write('DELETE FROM photo_file_ids WHERE product_id = ?', [(row.id,) for row in rows])
+
+    def close(self):
+        """
+        Закриває базу; наступне звернення відкриє її знову.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+            self._entries = {}
+
+    def _sent(self, rows, send, used_cache, future):
+        error = future.exception()
+        if error is None:
+            self.remember(rows, future.result())
+        elif used_cache and isinstance(error, BadRequest):
+            self._resend(rows, send, error)
+
+    def _resend(self, rows, send, error):
+        logging.warning(f"Cached photo rejected, sending by URL: {error}")
+        self.forget(rows)
+        return self.send(rows, send)
+
+    def _connect(self):
+        if self._connection is not None:
+            return
+        try:
+            self._connection = sqlite3.connect(self.path or config.bot_state_path, timeout=10, check_same_thread=False)
+            with self._connection:
+                self._connection.execute('CREATE TABLE IF NOT EXISTS photo_file_ids ('
+                                         'product_id INTEGER PRIMARY KEY, url TEXT NOT NULL, file_id TEXT NOT NULL)')
+            self._entries = {row[0]: (row[1], row[2]) for row in
+                             self._connection.execute('SELECT product_id, url, file_id FROM photo_file_ids')}
+        except sqlite3.Error as e:
+            logging.error(f"Photo cache load error: {e}", exc_info=True)
+
+    def _write(self, statement, parameters):
+        if self._connection is None:
+            return
+        try:
+            with self._connection:
+                self._connection.executemany(statement, parameters)
+        except sqlite3.Error as e:
+            logging.error(f"Photo cache write error: {e}", exc_info=True)
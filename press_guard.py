@@ -0,0 +1,107 @@
+import config
+from cache import TTLCache
+from single_flight import SingleFlight
+from metrics import metrics as default_metrics
+
+_MISSING = object()
+
+
+def press_key(update, action):
+    """
+    Повертає ключ натискання кнопки: користувач, повідомлення з кнопкою та дія.
+
+    Параметри:
+        update (Update): Оновлення з callback_query.
+        action (str): Назва дії (команди) кнопки.
+
+    Повертає:
+        tuple: (ID користувача, ID повідомлення, дія).
+    """
+    query = update.callback_query
+    message = query.message if query is not None else None
+    if message is not None:
+        message_id = message.message_id
+    else:
+        message_id = query.inline_message_id if query is not None else None
+    return update.effective_user.id, message_id, action
+
+
+class PressGuard:
+    """
+    Придушення повторних натискань однієї кнопки.
+
+    Перше натискання виконує дію і запам'ятовує її результат на window секунд; натискання з тим
+    самим ключем, що надійшли під час виконання (з іншого потоку чи задачі) або протягом вікна
+    після нього, отримують той самий результат без повторного виконання дії. Запам'ятовуються
+    лише успішні результати: якщо дія повернула None (наприклад, замовлення не створене через
+    недоступність API) або підняла виняток, наступне натискання виконає її знову.
+    """
+
+    def __init__(self, window=config.press_dedup_window, maxsize=config.press_dedup_maxsize, metrics=None):
+        """
+        Параметри:
+            window (float): Скільки секунд пам'ятати результат натискання.
+            maxsize (int): Максимальна кількість запам'ятованих натискань.
+            metrics (MetricsSink): Приймач метрик (за замовчуванням спільний InMemoryMetrics).
+        """
+        self.results = TTLCache(maxsize=maxsize, ttl=window)
+        self.flight = SingleFlight()
+        self.metrics = default_metrics if metrics is None else metrics
+
+    def run(self, key, fn):
+        """
+        Виконує дію для першого натискання або повертає результат першого натискання.
+
+        Параметри:
+            key: Ключ натискання (див. press_key).
+            fn (callable): Дія.
+
+        Повертає:
+            tuple: Результат дії та ознака повторного натискання.
+        """
+        result = self.results.get(key, _MISSING)
+        if result is not _MISSING:
+            self.metrics.increment('press.duplicate')
+            return result, True
+        executed = []
+
+        def first():
+            # Результат міг з'явитися між перевіркою вище і входом у single-flight
+            cached = self.results.get(key, _MISSING)
+            if cached is not _MISSING:
+                return cached
+            executed.append(True)
+            value = fn()
+            if value is not None:
+                self.results.set(key, value)
+            return value
+
+        result = self.flight.do(key, first)
+        if not executed:
+            self.metrics.increment('press.duplicate')
+        return result, not executed
+
+    async def run_async(self, key, fn):
+        """
+        Асинхронний варіант run для режиму asyncio. Оновлення одного користувача там обробляються
+        по черзі (AsyncUpdateScheduler), тож натискання з тим самим ключем не виконуються одночасно
+        і достатньо запам'ятованих результатів.
+
+        Параметри:
+            key: Ключ натискання (див. press_key).
+            fn (callable): Функція, що повертає корутину дії.
+
+        Повертає:
+            tuple: Результат дії та ознака повторного натискання.
+        """
+        result = self.results.get(key, _MISSING)
+        if result is not _MISSING:
+            self.metrics.increment('press.duplicate')
+            return result, True
+        result = await fn()
+        if result is not None:
+            self.results.set(key, result)
+        return result, False
+
+    def clear(self):
+        self.results.clear()
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Об'єднання однакових одночасних запитів (single-flight).
+
+    Перший виклик з певним ключем виконує запит, а всі виклики з тим самим ключем, що надійшли,
+    поки він триває, чекають і отримують той самий результат (або ту саму помилку).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.collapsed = 0
+
+    def do(self, key, fn):
+        """
+        Виконує fn або приєднується до вже запущеного виклику з тим самим ключем.
+
+        Параметри:
+            key: Ключ запиту (наприклад, URL).
+            fn (callable): Функція, що виконує запит.
+
+        Повертає:
+            Результат виконання fn.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def do_async(self, key, fn):
+        """
+        Асинхронний варіант do для корутин; виклики об'єднуються в межах одного циклу подій.
+
+        Параметри:
+            key: Ключ запиту (наприклад, URL).
+            fn (callable): Функція, що повертає корутину запиту.
+
+        Повертає:
+            Результат виконання корутини.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            future = self._async_calls.get(loop_key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._async_calls[loop_key] = future
+                self.calls += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            return await asyncio.shield(future)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            # Позначаємо помилку як отриману, навіть якщо на неї ніхто не чекав
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._async_calls.pop(loop_key, None)
+
+    def stats(self):
+        """
+        Повертає лічильники об'єднання запитів.
+
+        Повертає:
+            dict: Кількість виконаних запитів, кількість об'єднаних викликів та запитів у процесі.
+        """
+        with self._lock:
+            return {'calls': self.calls, 'collapsed': self.collapsed,
+                    'in_flight': len(self._calls) + len(self._async_calls)}
@@ -0,0 +1,212 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from telegram.ext import BasePersistence
+import config
+import models
+
+_EMPTY = b'{}'
+
+
+class _LazyUserData(defaultdict):
+    """
+    user_data диспетчера, що завантажує стан користувача з бази при першому зверненні до нього.
+    """
+
+    def __init__(self, load):
+        super().__init__(dict)
+        self._load = load
+
+    def __missing__(self, user_id):
+        value = self._load(user_id)
+        self[user_id] = value
+        return value
+
+    def copy(self):
+        # BasePersistence.insert_bot копіює user_data, копія має зберегти ліниве завантаження
+        copy = _LazyUserData(self._load)
+        copy.update(self)
+        return copy
+
+    __copy__ = copy
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    Сховище user_data в SQLite (режим WAL) з таблицею, проіндексованою за ID користувача.
+
+    Стан користувача читається з бази лише при першому оновленні від нього після старту. Після
+    кожного оновлення стан серіалізується і, якщо він змінився, позначається як змінений; фоновий
+    потік раз на flush_interval секунд записує лише змінених користувачів однією транзакцією, тож
+    вартість запису не залежить від загальної кількості користувачів. Раз на compact_interval
+    секунд видаляється стан користувачів, неактивних довше за retention_days, а файли бази
+    ущільнюються. Стан зберігається як JSON, тому в user_data мають бути лише JSON-сумісні значення.
+    """
+
+    def __init__(self, path=None, flush_interval=config.bot_state_flush_interval,
+                 compact_interval=config.bot_state_compact_interval, retention_days=config.bot_state_retention_days):
+        """
+        Параметри:
+            path (str, optional): Файл бази; за замовчуванням config.bot_state_path.
+            flush_interval (float): Інтервал запису змінених користувачів у секундах.
+            compact_interval (float): Інтервал ущільнення бази у секундах.
+            retention_days (float): Скільки днів зберігається стан неактивних користувачів.
+        """
+        super().__init__(store_user_data=True, store_chat_data=False, store_bot_data=False)
+        self.path = path or config.bot_state_path
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.retention_days = retention_days
+        self._connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._dirty_lock = threading.Lock()
+        self._dirty = {}
+        self._stored = {}
+        self._closed = threading.Event()
+        self._thread = None
+        self._compacted_at = time.monotonic()
+        with self._db_lock:
+            # auto_vacuum діє лише для нової бази, тому задається до створення таблиці
+            self._connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            with self._connection:
+                self._connection.execute('CREATE TABLE IF NOT EXISTS user_data ('
+                                         'user_id INTEGER PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)')
+                self._connection.execute('CREATE INDEX IF NOT EXISTS user_data_updated_at ON user_data (updated_at)')
+
+    def get_user_data(self):
+        return _LazyUserData(self._load_user)
+
+    def get_chat_data(self):
+        return defaultdict(dict)
+
+    def get_bot_data(self):
+        return {}
+
+    def get_conversations(self, name):
+        return {}
+
+    def update_conversation(self, name, key, new_state):
+        pass
+
+    def update_chat_data(self, chat_id, data):
+        pass
+
+    def update_bot_data(self, data):
+        pass
+
+    def update_user_data(self, user_id, data):
+        """
+        Позначає стан користувача як змінений, якщо він відрізняється від записаного.
+
+        Параметри:
+            user_id (int): ID користувача.
+            data (dict): user_data користувача.
+        """
+        try:
+            blob = models.dumps(data)
+        except TypeError as e:
+            logging.error(f"User data serialize error: {e}", exc_info=True)
+            return
+        with self._dirty_lock:
+            if self._stored.get(user_id, _EMPTY) == blob:
+                return
+            # Тримається лише стан користувачів з рядком у базі (неактивних прибирає compact)
+            if blob == _EMPTY:
+                self._stored.pop(user_id, None)
+            else:
+                self._stored[user_id] = blob
+            self._dirty[user_id] = blob
+            if self._thread is None and not self._closed.is_set():
+                self._thread = threading.Thread(target=self._run, name='user-data-flush', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """
+        Записує змінених користувачів у базу.
+        """
+        self.write_dirty()
+
+    def close(self):
+        """
+        Зупиняє фоновий запис, записує змінених користувачів та закриває базу.
+        """
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write_dirty()
+        with self._db_lock:
+            self._connection.close()
+
+    def write_dirty(self):
+        """
+        Записує змінених користувачів однією транзакцією; порожній стан видаляється з бази.
+
+        Повертає:
+            int: Кількість записаних користувачів.
+        """
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+        now = time.time()
+        try:
+            with self._db_lock, self._connection:
+                self._connection.executemany(
+                    'INSERT INTO user_data (user_id, data, updated_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at',
+                    [(user_id, blob, now) for user_id, blob in dirty.items() if blob != _EMPTY])
+                self._connection.executemany('DELETE FROM user_data WHERE user_id = ?',
+                                             [(user_id,) for user_id, blob in dirty.items() if blob == _EMPTY])
+        except sqlite3.Error as e:
+            logging.error(f"User data write error: {e}", exc_info=True)
+            with self._dirty_lock:
+                # Новіші зміни, що з'явились під час запису, мають пріоритет
+                for user_id, blob in dirty.items():
+                    self._dirty.setdefault(user_id, blob)
+            return 0
+        return len(dirty)
+
+    def compact(self):
+        """
+        Видаляє стан неактивних користувачів, повертає звільнені сторінки файлу та обрізає WAL.
+        """
+        cutoff = time.time() - self.retention_days * 86400
+        try:
+            with self._db_lock:
+                with self._connection:
+                    expired = [row[0] for row in self._connection.execute(
+                        'SELECT user_id FROM user_data WHERE updated_at < ?', (cutoff,))]
+                    self._connection.execute('DELETE FROM user_data WHERE updated_at < ?', (cutoff,))
+                self._connection.execute('PRAGMA incremental_vacuum')
+                self._connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except sqlite3.Error as e:
+            logging.error(f"User data compact error: {e}", exc_info=True)
+            return
+        with self._dirty_lock:
+            # Видалений стан буде записано знову при наступному оновленні користувача
+            for user_id in expired:
+                self._stored.pop(user_id, None)
+
+    def _load_user(self, user_id):
+        try:
+            with self._db_lock:
+                row = self._connection.execute('SELECT data FROM user_data WHERE user_id = ?', (user_id,)).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"User data load error: {e}", exc_info=True)
+            return {}
+        if row is None:
+            return {}
+        with self._dirty_lock:
+            self._stored.setdefault(user_id, row[0])
+        return models.loads(row[0]) or {}
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            self.write_dirty()
+            if time.monotonic() - self._compacted_at >= self.compact_interval:
+                self.compact()
+                self._compacted_at = time.monotonic()
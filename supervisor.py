@@ -0,0 +1,352 @@
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from telegram import Bot
+from telegram.error import TelegramError
+import config
+from metrics import metrics as default_metrics
+
+
+def raw_update_key(data):
+    """
+    Повертає ключ маршрутизації для оновлення у вигляді JSON-словника, не розбираючи його в Update.
+
+    Ключ збігається з update_scheduler.update_key: ID користувача, а якщо його немає - ID чату.
+
+    Параметри:
+        data (dict): Оновлення від Telegram API.
+
+    Повертає:
+        Ключ; оновлення без користувача та чату отримують власний ключ.
+    """
+    for name, value in data.items():
+        if name == 'update_id' or not isinstance(value, dict):
+            continue
+        user = value.get('from') or value.get('user')
+        if user:
+            return user['id']
+        chat = value.get('chat') or (value.get('message') or {}).get('chat')
+        if chat:
+            return chat['id']
+    return ('update', data['update_id'])
+
+
+class HashRing:
+    """
+    Кільце консистентного хешування.
+
+    Кожен вузол займає replicas точок на кільці; ключ належить вузлу першої точки за його хешем.
+    При додаванні чи видаленні вузла переміщуються лише ключі, що належали відповідним точкам,
+    тобто приблизно 1/N усіх ключів.
+    """
+
+    def __init__(self, nodes=(), replicas=config.bot_hash_ring_replicas):
+        """
+        Параметри:
+            nodes (iterable): Початкові вузли.
+            replicas (int): Кількість точок кожного вузла на кільці.
+        """
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+    @property
+    def nodes(self):
+        return set(self._owners.values())
+
+    def add(self, node):
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point not in self._owners:
+                self._owners[point] = node
+                bisect.insort(self._points, point)
+
+    def remove(self, node):
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: owner for point, owner in self._owners.items() if owner != node}
+
+    def node_for(self, key):
+        """
+        Повертає вузол, якому належить ключ.
+
+        Піднімає:
+            LookupError: Якщо на кільці немає жодного вузла.
+        """
+        if not self._points:
+            raise LookupError("Hash ring is empty")
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+def _worker_main(token, base_url, inbox, ready, initializer, live):
+    """
+    Точка входу робочого процесу: обробляє оновлення з inbox власним BotManager.
+
+    Загальний ліміт вихідних повідомлень ділиться порівну між live.value працюючими процесами.
+    """
+    # Ctrl+C отримує вся група процесів; зупинкою робочих процесів керує супервізор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if initializer is not None:
+        initializer()
+    from bot_manager import BotManager
+    from db_manager import APIClient
+    from outbound_scheduler import OutboundScheduler
+
+    outbound = OutboundScheduler(share=lambda: 1 / max(live.value, 1))
+    bot_manager = BotManager(token, base_url=base_url, outbound=outbound)
+    bot_manager.warm_up()
+    ready.set()
+    bot_manager.serve_queue(inbox)
+    APIClient.cart_writes.flush_all()
+    APIClient.save_snapshot()
+    bot_manager.persistence.close()
+
+
+class _Worker:
+    def __init__(self, process, inbox, ready):
+        self.process = process
+        self.inbox = inbox
+        self.ready = ready
+        self.restarts = deque()
+
+
+class Supervisor:
+    """
+    Супервізор режиму processes.
+
+    Отримує оновлення довгим опитуванням і розподіляє їх між робочими процесами консистентним
+    хешуванням ID користувача, тож усі оновлення та локальний стан (кошик, профіль) одного
+    користувача залишаються в одному процесі, а обробка масштабується на всі ядра.
+    Процес, що завершився аварійно, перезапускається на тому самому місці кільця; якщо процес
+    падає частіше за max_restarts разів за restart_window секунд, він виводиться з кільця і його
+    користувачі перерозподіляються між іншими процесами. Загальний ліміт вихідних повідомлень
+    бота ділиться між працюючими процесами, тож разом вони не перевищують його.
+    """
+
+    def __init__(self, token, base_url=None, processes=config.bot_worker_processes, initializer=None,
+                 max_restarts=config.bot_worker_max_restarts, restart_window=config.bot_worker_restart_window,
+                 metrics=None):
+        """
+        Параметри:
+            token (str): Токен бота.
+            base_url (str, optional): Адреса Bot API.
+            processes (int): Кількість робочих процесів.
+            initializer (callable, optional): Викликається на старті кожного робочого процесу
+                (наприклад, для налаштування логування).
+            max_restarts (int): Скільки перезапусків процесу допускається за restart_window.
+            restart_window (float): Вікно підрахунку перезапусків у секундах.
+            metrics (MetricsSink): Приймач метрик (за замовчуванням спільний InMemoryMetrics).
+        """
+        self.token = token
+        self.base_url = base_url
+        self.processes = processes
+        self.initializer = initializer
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.metrics = default_metrics if metrics is None else metrics
+        self.bot = Bot(token, base_url=base_url)
+        self.ring = HashRing()
+        self.workers = {}
+        self._context = multiprocessing.get_context('spawn')
+        self.live = self._context.Value('i', 0)
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._monitor = None
+        self._retired = []
+
+    def start(self, timeout=60):
+        """
+        Запускає робочі процеси та дочікується їх готовності.
+
+        Параметри:
+            timeout (float): Скільки секунд чекати на готовність процесів.
+        """
+        self.resize(self.processes, timeout)
+        self._monitor = threading.Thread(target=self._watch, name='supervisor-monitor', daemon=True)
+        self._monitor.start()
+        return self
+
+    def resize(self, processes, timeout=60):
+        """
+        Змінює кількість робочих процесів; переміщуються лише користувачі доданих або вилучених процесів.
+
+        Параметри:
+            processes (int): Нова кількість робочих процесів.
+            timeout (float): Скільки секунд чекати на готовність нових процесів.
+        """
+        with self._lock:
+            self.processes = processes
+            current = sorted(self.workers)
+            added = [index for index in range(processes) if index not in self.workers]
+            for index in added:
+                self.workers[index] = self._spawn(index)
+            for index in current[processes:]:
+                self.ring.remove(index)
+                worker = self.workers.pop(index)
+                worker.inbox.put(None)
+                self._retired.append(worker)
+            self._count_live()
+        deadline = time.monotonic() + timeout
+        for index in added:
+            self.workers[index].ready.wait(max(0.0, deadline - time.monotonic()))
+            with self._lock:
+                self.ring.add(index)
+
+    def route(self, data):
+        """
+        Передає оновлення процесу, якому належить його користувач.
+
+        Параметри:
+            data (dict): Оновлення від Telegram API.
+        """
+        key = raw_update_key(data)
+        with self._lock:
+            try:
+                index = self.ring.node_for(key)
+            except LookupError:
+                logging.error(f"Update {data.get('update_id')} dropped: no worker processes")
+                return
+            self.workers[index].inbox.put(data)
+        self.metrics.increment('supervisor.routed')
+
+    def serve(self, poll_timeout=config.bot_poll_timeout):
+        """
+        Отримує оновлення довгим опитуванням і розподіляє їх до виклику stop,
+        після чого зупиняє робочі процеси, дочекавшись обробки вже розподілених оновлень.
+
+        Параметри:
+            poll_timeout (int): Тайм-аут довгого опитування getUpdates у секундах.
+        """
+        offset = None
+        try:
+            self.bot.delete_webhook()
+            while not self._stop_event.is_set():
+                for data in self._get_updates(offset, poll_timeout):
+                    offset = data['update_id'] + 1
+                    self.route(data)
+        finally:
+            self._shutdown()
+
+    def run(self, poll_timeout=config.bot_poll_timeout):
+        """
+        Запускає робочі процеси та розподіляє оновлення до сигналу SIGINT або SIGTERM.
+        """
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda signum, frame: self.stop())
+        self.start()
+        self.serve(poll_timeout)
+
+    def stop(self):
+        """
+        Зупиняє serve після поточного циклу опитування; можна викликати з будь-якого потоку.
+        """
+        self._stop_event.set()
+
+    def _get_updates(self, offset, timeout):
+        data = {'timeout': timeout}
+        if offset is not None:
+            data['offset'] = offset
+        try:
+            # Оновлення лишаються словниками: в Update їх розбирає робочий процес
+            return self.bot.request.post(f"{self.bot.base_url}/getUpdates", data, timeout=timeout + 2) or []
+        except TelegramError as e:
+            logging.error(f"Get updates error: {e}", exc_info=True)
+            self._stop_event.wait(1)
+            return []
+
+    def _spawn(self, index):
+        inbox = self._context.Queue()
+        ready = self._context.Event()
+        process = self._context.Process(target=_worker_main, name=f"bot-worker-{index}",
+                                        args=(self.token, self.base_url, inbox, ready, self.initializer,
+                                              self.live))
+        process.start()
+        return _Worker(process, inbox, ready)
+
+    def _count_live(self):
+        """
+        Оновлює кількість процесів, між якими ділиться загальний ліміт вихідних повідомлень;
+        процеси, що завершуються після resize, ще надсилають повідомлення і теж враховуються.
+        """
+        self._retired = [worker for worker in self._retired if worker.process.is_alive()]
+        self.live.value = len(self.workers) + len(self._retired)
+
+    def _watch(self):
+        while not self._stop_event.is_set():
+            with self._lock:
+                self._count_live()
+                sentinels = {worker.process.sentinel: index for index, worker in self.workers.items()}
+            for sentinel in wait(list(sentinels), timeout=1):
+                if not self._stop_event.is_set():
+                    self._recover(sentinels[sentinel])
+
+    def _recover(self, index):
+        """
+        Перезапускає процес, що завершився, або виводить його з кільця, якщо він падає надто часто.
+        """
+        with self._lock:
+            worker = self.workers.get(index)
+            if worker is None or worker.process.is_alive():
+                return
+            worker.process.join()
+            now = time.monotonic()
+            while worker.restarts and now - worker.restarts[0] > self.restart_window:
+                worker.restarts.popleft()
+            pending = self._drain(worker.inbox)
+            if len(worker.restarts) >= self.max_restarts:
+                logging.error(f"Worker {index} exited with code {worker.process.exitcode} "
+                              f"{len(worker.restarts)} times, rebalancing its users")
+                self.metrics.increment('supervisor.retired')
+                self.ring.remove(index)
+                del self.workers[index]
+                self._count_live()
+            else:
+                logging.error(f"Worker {index} exited with code {worker.process.exitcode}, restarting")
+                self.metrics.increment('supervisor.restarts')
+                restarts = worker.restarts
+                worker = self.workers[index] = self._spawn(index)
+                worker.restarts = restarts
+                worker.restarts.append(now)
+            for data in pending:
+                self.route(data)
+
+    @staticmethod
+    def _drain(inbox):
+        """
+        Забирає оновлення, які процес не встиг прочитати.
+        """
+        pending = []
+        while True:
+            try:
+                pending.append(inbox.get_nowait())
+            except (queue.Empty, OSError, EOFError):
+                return [data for data in pending if data is not None]
+
+    def _shutdown(self):
+        self._stop_event.set()
+        with self._lock:
+            workers, self.workers = list(self.workers.values()) + self._retired, {}
+            self._retired = []
+            for worker in workers:
+                worker.inbox.put(None)
+        for worker in workers:
+            worker.process.join(config.bot_worker_stop_timeout)
+            if worker.process.is_alive():
+                logging.error(f"Worker {worker.process.name} did not stop, terminating")
+                worker.process.terminate()
+                worker.process.join()
+        if self._monitor is not None:
+            self._monitor.join()
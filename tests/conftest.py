@@ -0,0 +1,23 @@
+import pytest
+import config
+from db_manager import APIClient
+from command_handlers import DetailsCommand
+
+
+@pytest.fixture(autouse=True)
+def clear_api_caches():
+    APIClient.clear_caches()
+    yield
+    APIClient.clear_caches()
+
+
+@pytest.fixture(autouse=True)
+def bot_state_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'bot_state_path', str(tmp_path / 'bot_state.sqlite3'))
+    monkeypatch.setenv('BOT_STATE_PATH', str(tmp_path / 'bot_state.sqlite3'))
+
+
+@pytest.fixture(autouse=True)
+def photo_cache():
+    yield
+    DetailsCommand.photos.close()
@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+import aiohttp
+from circuit_breaker import CircuitBreaker
+from metrics import InMemoryMetrics
+from async_db_manager import AsyncAPIClient
+from db_manager import APIClient
+from config import api_url
+import models
+
+
+@patch.object(AsyncAPIClient, '_request', new_callable=AsyncMock)
+@patch.object(APIClient.transport, 'get')
+def test_catalog_reads_use_catalog_cache(mock_get, mock_request):
+    mock_get.return_value = MagicMock(status_code=200, headers={},
+                                      content=b'[["Pizza1", "Cheese", null, 100, 1], ["Pizza2", "Ham", null, 150, 2]]')
+
+    async def read_catalog():
+        return (await AsyncAPIClient.get_menu(), await AsyncAPIClient.get_pizza_details('Pizza2'),
+                await AsyncAPIClient.get_pizza_details_by_id(1))
+
+    menu, by_name, by_id = asyncio.run(read_catalog())
+    assert menu == [models.Product('Pizza1', 'Cheese', None, 100, 1), models.Product('Pizza2', 'Ham', None, 150, 2)]
+    assert by_name == models.Product('Pizza2', 'Ham', None, 150, 2)
+    assert by_id == models.Product('Pizza1', 'Cheese', None, 100, 1)
+    mock_get.assert_called_once_with("menu", f"{api_url}/menu")
+    mock_request.assert_not_awaited()
+
+
+@patch.object(AsyncAPIClient, '_request', new_callable=AsyncMock)
+def test_create_order(mock_request):
+    mock_request.return_value = {'order_id': 1}
+    result = asyncio.run(AsyncAPIClient.create_order(1, '123456789', [('Pizza1', 1, 100)], 100, '0.0|0.0'))
+    mock_request.assert_awaited_once_with("POST", "order", f"{api_url}/order/create", json={
+        'user_id': 1,
+        'phone_number': '123456789',
+        'order_list': [('Pizza1', 1, 100)],
+        'total_price': 100,
+        'location': '0.0|0.0'
+    }, headers=None, decode=models.OrderReceipt.from_json, check_status=True)
+    assert result == {'order_id': 1}
+
+
+def test_get_cart_and_user_runs_concurrently():
+    in_flight = 0
+    peak = 0
+
+    async def fake_request(method, endpoint, url, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return endpoint
+
+    with patch.object(AsyncAPIClient, '_request', side_effect=fake_request):
+        result = asyncio.run(AsyncAPIClient.get_cart_and_user(1))
+    assert result == ['cart', 'user']
+    assert peak == 2
+
+
+@pytest.mark.parametrize('error', [aiohttp.ClientPayloadError('truncated'), asyncio.CancelledError()])
+def test_failed_probe_reopens_breaker(error):
+    now = [0.0]
+    breaker = CircuitBreaker('cart', open_timeout=30, clock=lambda: now[0])
+    breaker._transition(CircuitBreaker.OPEN)
+    now[0] = 31.0
+    response = MagicMock()
+    response.read = AsyncMock(side_effect=error)
+    response.__aenter__ = AsyncMock(return_value=response)
+    response.__aexit__ = AsyncMock(return_value=False)
+    session = MagicMock()
+    session.request.return_value = response
+    with patch.object(AsyncAPIClient, 'session', return_value=session), \
+            patch.object(AsyncAPIClient, 'breakers', MagicMock(get=MagicMock(return_value=breaker))), \
+            patch.object(AsyncAPIClient, 'metrics', InMemoryMetrics()):
+        with pytest.raises(type(error)):
+            asyncio.run(AsyncAPIClient._request("DELETE", "cart", f"{api_url}/cart/clear/1"))
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] = 62.0
+    breaker.allow()
+
+
+def test_add_to_cart_error_status_raises():
+    response = MagicMock(status=500, reason='Internal Server Error', history=())
+    response.read = AsyncMock(return_value=b'{"detail": "Internal Server Error"}')
+    response.__aenter__ = AsyncMock(return_value=response)
+    response.__aexit__ = AsyncMock(return_value=False)
+    session = MagicMock()
+    session.request.return_value = response
+    with patch.object(AsyncAPIClient, 'session', return_value=session), \
+            patch.object(AsyncAPIClient, 'metrics', InMemoryMetrics()):
+        with pytest.raises(aiohttp.ClientResponseError):
+            asyncio.run(AsyncAPIClient.add_to_cart(1, 1))
+    session.request.assert_called_once()
+
+
+def test_failed_clear_cart_invalidates_mirror():
+    APIClient.carts.set(1, [models.CartLine('Pizza1', 1, 100)])
+    error = aiohttp.ClientResponseError(None, (), status=500)
+    with patch.object(AsyncAPIClient, '_request', new_callable=AsyncMock, side_effect=error) as mock_request:
+        with pytest.raises(aiohttp.ClientResponseError):
+            asyncio.run(AsyncAPIClient.clear_cart(1))
+    mock_request.assert_awaited_once_with("DELETE", "cart", f"{api_url}/cart/clear/1", check_status=True)
+    assert APIClient.carts.get(1) is None
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from telegram import Update
+from bot_manager import BotManager
+from db_manager import APIClient
+from models import Product
+
+TOKEN = '123456:TEST-TOKEN'
+
+
+def callback_update(bot, update_id, data='menu', user_id=1):
+    return Update.de_json({'update_id': update_id, 'callback_query': {
+        'id': str(update_id), 'chat_instance': '1', 'data': data,
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'}}}, bot)
+
+
+def test_process_update_async_routes_to_async_command():
+    bot_manager = BotManager(TOKEN)
+    command = MagicMock()
+    command.execute_async = AsyncMock()
+    with patch.object(bot_manager.factory, 'get_command', return_value=command) as mock_get_command:
+        update = callback_update(bot_manager.updater.bot, 1)
+        asyncio.run(bot_manager.process_update_async(update))
+    mock_get_command.assert_called_once_with("button_handler")
+    command.execute_async.assert_awaited_once()
+    assert command.execute_async.await_args[0][0] is update
+    command.execute.assert_not_called()
+
+
+def test_serve_async_limits_concurrent_updates():
+    bot_manager = BotManager(TOKEN, max_concurrent_updates=3)
+    updates = [callback_update(bot_manager.updater.bot, i, user_id=i) for i in range(1, 11)]
+    batches = iter([updates])
+    active = 0
+    peak = 0
+    handled = []
+
+    async def execute_async(update, context):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        handled.append(update.update_id)
+        if len(handled) == len(updates):
+            bot_manager.stop_async()
+
+    command = MagicMock()
+    command.execute_async = execute_async
+    bot = MagicMock()
+    bot.get_updates.side_effect = lambda offset, timeout: next(batches, [])
+    bot_manager.updater.bot = bot
+    with patch.object(bot_manager.factory, 'get_command', return_value=command):
+        asyncio.run(asyncio.wait_for(bot_manager.serve_async(poll_timeout=0), timeout=5))
+    assert sorted(handled) == list(range(1, 11))
+    assert peak == 3
+
+
+def test_serve_async_serializes_updates_of_one_user():
+    bot_manager = BotManager(TOKEN, max_concurrent_updates=10)
+    updates = [callback_update(bot_manager.updater.bot, i, user_id=1) for i in range(1, 6)]
+    batches = iter([updates])
+    active = 0
+    peak = 0
+    handled = []
+
+    async def execute_async(update, context):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        handled.append(update.update_id)
+        if len(handled) == len(updates):
+            bot_manager.stop_async()
+
+    command = MagicMock()
+    command.execute_async = execute_async
+    bot = MagicMock()
+    bot.get_updates.side_effect = lambda offset, timeout: next(batches, [])
+    bot_manager.updater.bot = bot
+    with patch.object(bot_manager.factory, 'get_command', return_value=command):
+        asyncio.run(asyncio.wait_for(bot_manager.serve_async(poll_timeout=0), timeout=5))
+    assert handled == [1, 2, 3, 4, 5]
+    assert peak == 1
+
+
+def test_threads_mode_dispatches_through_scheduler():
+    bot_manager = BotManager(TOKEN)
+    update = callback_update(bot_manager.updater.bot, 1, user_id=42)
+    with patch.object(bot_manager.scheduler, 'submit') as mock_submit:
+        bot_manager.updater.dispatcher.process_update(update)
+    mock_submit.assert_called_once_with(42, update)
+
+def test_start_webhook_requires_public_https_url():
+    bot_manager = BotManager(TOKEN)
+    for url in (None, 'http://example.com/telegram'):
+        with pytest.raises(ValueError):
+            bot_manager.start_webhook(url=url, host='127.0.0.1', port=0)
+    assert bot_manager.webhook is None
+
+
+def test_start_webhook_registers_generated_secret():
+    bot_manager = BotManager(TOKEN)
+    with patch.object(bot_manager.updater.bot, 'set_webhook') as mock_set_webhook:
+        bot_manager.start_webhook(url='https://example.com/telegram', host='127.0.0.1', port=0, secret_token=None)
+    try:
+        secret_token = bot_manager.webhook.secret_token
+        assert secret_token
+        mock_set_webhook.assert_called_once()
+        assert mock_set_webhook.call_args[1]['url'] == 'https://example.com/telegram'
+        assert mock_set_webhook.call_args[1]['api_kwargs'] == {'secret_token': secret_token}
+    finally:
+        bot_manager.stop()
+
+
+def test_dropped_cart_write_lists_products():
+    bot_manager = BotManager(TOKEN)
+    catalog = MagicMock()
+    catalog.by_id.side_effect = lambda product_id: Product('Пепероні', price=220, id=1) if product_id == 1 else None
+    with patch('bot_manager.APIClient.get_catalog', return_value=catalog), \
+            patch.object(bot_manager.updater.bot, 'send_message') as mock_send_message:
+        APIClient._cart_write_dropped(7, [1, 9])
+    mock_send_message.assert_called_once_with(
+        chat_id=7, text="😔 Не вдалося додати в кошик: Пепероні, товар #9. Спробуйте ще раз")
+
+
+if __name__ == "__main__":
+    pytest.main()
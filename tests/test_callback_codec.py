@@ -0,0 +1,26 @@
+import pytest
+from callback_codec import encode, decode, CallbackPayload, legacy_parser
+
+
+def test_round_trip_fits_telegram_limit():
+    data = encode('add_to_cart', 4294967295, 0x1FFFF)
+    assert len(data.encode()) <= 64
+    assert decode(data) == CallbackPayload('add_to_cart', 4294967295, 0xFFFF)
+    assert decode(encode('product_details', 3)) == CallbackPayload('product_details', 3, 0)
+
+
+def test_decode_rejects_foreign_data():
+    assert decode('menu') is None
+    assert decode('~' + '!' * 11) is None
+    assert decode(encode('add_to_cart', 1)[:-1]) is None
+    assert decode('~AAAAAAAAAAA') is None
+
+
+def test_legacy_parser():
+    parse = legacy_parser('add_to_cart')
+    assert parse('12') == CallbackPayload('add_to_cart', 12)
+    assert parse('abc') is None
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,28 @@
+import pytest
+from callback_router import CallbackRouter, Route, parse_id
+
+
+def router():
+    return CallbackRouter(exact=("menu", "open_cart"), prefixes={"add_to_cart_": ("add_to_cart", parse_id)},
+                          default="details")
+
+
+def test_exact_and_prefix_routes():
+    assert router().resolve("menu") == Route("menu")
+    assert router().resolve("add_to_cart_12") == Route("add_to_cart", 12)
+
+
+def test_unknown_data_goes_to_default_route():
+    assert router().resolve("Маргарита") == Route("details", "Маргарита")
+    assert router().resolve("add_to_cart_abc") == Route("details", "add_to_cart_abc")
+    assert router().resolve("add_to_cart_") == Route("details", "add_to_cart_")
+    assert CallbackRouter(exact=("menu",)).resolve("other") is None
+
+
+def test_prefix_must_end_with_separator():
+    with pytest.raises(ValueError):
+        CallbackRouter(prefixes={"add": ("add_to_cart", parse_id)})
+
+
+if __name__ == "__main__":
+    pytest.main()
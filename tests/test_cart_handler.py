@@ -3,6 +3,8 @@ from unittest.mock import MagicMock, patch
 from cart_handler import AddToCartCommand, OpenCartCommand, CleanCartCommand
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
+from models import CartLine
+from circuit_breaker import CircuitOpenError
 
 @patch('cart_handler.APIClient')
 def test_add_to_cart_command(mock_api_client):
@@ -31,7 +33,7 @@ def test_open_cart_command(mock_api_client):
     update = MagicMock(spec=Update)
     context = MagicMock(spec=CallbackContext)
 
-    mock_api_client.get_cart.return_value = [('Товар1', 2, 200), ('Товар2', 1, 100)]
+    mock_api_client.get_cart.return_value = [CartLine('Товар1', 2, 200), CartLine('Товар2', 1, 100)]
 
     open_cart.execute(update, context)
     mock_api_client.get_cart.assert_called_once_with(update.effective_user.id)
@@ -61,5 +63,21 @@ def test_clean_cart_command(mock_api_client):
         reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("📋 Переглянути меню", callback_data="menu")]])
     )
 
+@pytest.mark.parametrize('command, method, args', [
+    (AddToCartCommand(), 'get_pizza_details_by_id', (1,)),
+    (OpenCartCommand(), 'get_cart', ()),
+    (CleanCartCommand(), 'clear_cart', ()),
+])
+@patch('cart_handler.APIClient')
+def test_cart_commands_reply_when_backend_unavailable(mock_api_client, command, method, args):
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    getattr(mock_api_client, method).side_effect = CircuitOpenError("cart")
+    command.execute(*args, update, context)
+    context.bot.send_message.assert_called_once_with(
+        chat_id=update.effective_chat.id,
+        text="Сервіс тимчасово недоступний 😔 Спробуйте, будь ласка, пізніше"
+    )
+
 if __name__ == "__main__":
     pytest.main()
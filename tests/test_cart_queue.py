@@ -0,0 +1,85 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+from cart_queue import CartWriteQueue
+from circuit_breaker import CircuitOpenError
+
+
+def test_flush_writes_pending_items_in_order():
+    writer = MagicMock()
+    on_flushed = MagicMock()
+    queue = CartWriteQueue(writer, window=60, on_flushed=on_flushed)
+    queue.enqueue(1, 10)
+    queue.enqueue(1, 11)
+    queue.enqueue(2, 10)
+
+    queue.flush(1)
+    assert [c.args for c in writer.call_args_list] == [(1, 10), (1, 11)]
+    on_flushed.assert_called_once_with(1)
+    assert queue.pending(2) == [10]
+
+
+def test_background_flush_after_window():
+    writer = MagicMock()
+    queue = CartWriteQueue(writer, window=0.01)
+    queue.enqueue(1, 10)
+    deadline = time.monotonic() + 1
+    while queue.pending(1) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.assert_called_once_with(1, 10)
+
+
+def test_failed_write_is_requeued():
+    writer = MagicMock(side_effect=[None, ConnectionError("backend down"), None])
+    queue = CartWriteQueue(writer, window=60)
+    queue.enqueue(1, 10)
+    queue.enqueue(1, 11)
+
+    with pytest.raises(ConnectionError):
+        queue.flush(1)
+    assert queue.pending(1) == [11]
+
+    queue.flush(1)
+    assert queue.pending(1) == []
+    assert writer.call_count == 3
+
+
+def test_items_dropped_after_max_failures_are_reported():
+    writer = MagicMock(side_effect=ConnectionError("backend down"))
+    on_dropped = MagicMock()
+    queue = CartWriteQueue(writer, window=60, max_failures=2, on_dropped=on_dropped)
+    queue.enqueue(1, 10)
+    queue.enqueue(1, 11)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            queue.flush(1)
+    on_dropped.assert_called_once_with(1, [10, 11])
+    assert queue.pending(1) == []
+
+
+def test_open_circuit_does_not_count_as_failure():
+    writer = MagicMock(side_effect=[CircuitOpenError('cart', retry_after=20)] * 3 + [None])
+    on_dropped = MagicMock()
+    queue = CartWriteQueue(writer, window=1, max_failures=2, on_dropped=on_dropped)
+    queue.enqueue(1, 10)
+    for _ in range(3):
+        with pytest.raises(CircuitOpenError):
+            queue.flush(1)
+        assert queue._due[1] - time.monotonic() > 15
+    queue.flush(1)
+    on_dropped.assert_not_called()
+    assert writer.call_count == 4
+    assert queue.pending(1) == []
+
+
+def test_overflow_flushes_immediately():
+    writer = MagicMock()
+    queue = CartWriteQueue(writer, window=60, max_pending=3)
+    for product_id in range(3):
+        queue.enqueue(1, product_id)
+    assert writer.call_count == 3
+    assert queue.pending(1) == []
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import MagicMock
+from catalog_cache import CatalogCache, CatalogIndex
+from models import Product
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ManualExecutor:
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, fn, *args):
+        self.tasks.append((fn, args))
+
+    def run_all(self):
+        tasks, self.tasks = self.tasks, []
+        for fn, args in tasks:
+            fn(*args)
+
+
+def test_menu_served_from_cache_until_refresh_ahead():
+    clock = FakeClock()
+    executor = ManualExecutor()
+    cache = CatalogCache(ttl=100, refresh_ahead=10, max_stale=50, executor=executor, clock=clock)
+    loader = MagicMock(return_value=[['Pizza1']])
+
+    assert cache.get_menu(loader) == [['Pizza1']]
+    clock.now = 50
+    assert cache.get_menu(loader) == [['Pizza1']]
+    loader.assert_called_once()
+    assert executor.tasks == []
+
+
+def test_stale_menu_served_while_refresh_in_flight():
+    clock = FakeClock()
+    executor = ManualExecutor()
+    cache = CatalogCache(ttl=100, refresh_ahead=10, max_stale=50, executor=executor, clock=clock)
+    loader = MagicMock(return_value=[['Pizza1']])
+    cache.get_menu(loader)
+
+    loader.return_value = [['Pizza2']]
+    clock.now = 120
+    assert cache.get_menu(loader) == [['Pizza1']]
+    assert cache.get_menu(loader) == [['Pizza1']]
+    assert len(executor.tasks) == 1
+
+    executor.run_all()
+    assert cache.get_menu(loader) == [['Pizza2']]
+    assert loader.call_count == 2
+
+
+def test_failed_refresh_keeps_stale_menu():
+    clock = FakeClock()
+    executor = ManualExecutor()
+    cache = CatalogCache(ttl=100, refresh_ahead=10, max_stale=50, executor=executor, clock=clock)
+    cache.get_menu(MagicMock(return_value=[['Pizza1']]))
+
+    clock.now = 200
+    assert cache.get_menu(MagicMock(side_effect=ConnectionError)) == [['Pizza1']]
+
+
+def test_details_lru_eviction():
+    cache = CatalogCache(details_maxsize=2, executor=ManualExecutor())
+    cache.get_details('Pizza1', lambda: ['Pizza1'])
+    cache.get_details('Pizza2', lambda: ['Pizza2'])
+    cache.get_details('Pizza1', lambda: ['Pizza1'])
+    cache.get_details('Pizza3', lambda: ['Pizza3'])
+
+    assert cache.get_details('Pizza1', MagicMock()) == ['Pizza1']
+    loader = MagicMock(return_value=['Pizza2'])
+    cache.get_details('Pizza2', loader)
+    loader.assert_called_once()
+
+
+def test_catalog_index_lookup():
+    index = CatalogIndex([Product('Pizza1', 'Cheese', None, 100, 1), Product('Pizza2', 'Ham', 'url', 150, 2)])
+    assert index.complete
+    assert index.by_name('Pizza2').id == 2
+    assert index.by_id('1').name == 'Pizza1'
+    assert index.by_id(3) is None
+    assert not CatalogIndex([Product('Pizza1')]).complete
+    assert index.version == CatalogIndex([Product('Pizza1', 'Cheese', None, 100, 1), Product('Pizza2', 'Ham', 'url', 150, 2)]).version
+    assert index.version != CatalogIndex([Product('Pizza1', 'Cheese', None, 120, 1)]).version
+
+
+def test_catalog_index_rebuilt_only_for_new_menu():
+    clock = FakeClock()
+    executor = ManualExecutor()
+    cache = CatalogCache(ttl=100, refresh_ahead=10, max_stale=50, executor=executor, clock=clock)
+    loader = MagicMock(return_value=[Product('Pizza1', 'Cheese', None, 100, 1)])
+    index = cache.get_index(loader)
+    assert cache.get_index(loader) is index
+
+    loader.return_value = [Product('Pizza2', 'Ham', None, 150, 2)]
+    clock.now = 95
+    cache.get_index(loader)
+    executor.run_all()
+    assert cache.get_index(loader) is not index
+    assert cache.get_index(loader).by_name('Pizza2')
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,73 @@
+import json
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from db_manager import APIClient
+from catalog_snapshot import CatalogSnapshot
+from config import api_url
+from models import Product
+
+
+def response(payload=None, status_code=200, headers=None):
+    content = b'' if payload is None else json.dumps(payload).encode()
+    return MagicMock(status_code=status_code, headers=headers or {}, content=content)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    snapshot = CatalogSnapshot(str(tmp_path / 'catalog.json'))
+    with patch.object(APIClient, 'snapshot', snapshot):
+        yield snapshot
+
+
+def test_save_and_load_round_trip(tmp_path):
+    snapshot = CatalogSnapshot(str(tmp_path / 'catalog.json'))
+    resources = [{'key': 'menu', 'url': 'http://api/menu', 'etag': '"v1"', 'last_modified': None,
+                  'data': [Product('Pizza1', 'Cheese', None, 100, 1)]}]
+    assert snapshot.save('http://api', resources)
+    assert snapshot.load('http://api')[0]['data'] == [['Pizza1', 'Cheese', None, 100, 1]]
+    assert snapshot.load('http://other') == []
+    assert list(tmp_path.iterdir()) == [tmp_path / 'catalog.json']
+
+
+def test_load_missing_or_corrupt(tmp_path):
+    snapshot = CatalogSnapshot(str(tmp_path / 'catalog.json'))
+    assert snapshot.load('http://api') == []
+    (tmp_path / 'catalog.json').write_bytes(b'{not json')
+    assert snapshot.load('http://api') == []
+
+
+def test_expired_snapshot_is_ignored(tmp_path):
+    snapshot = CatalogSnapshot(str(tmp_path / 'catalog.json'), max_age=60)
+    resources = [{'key': 'menu', 'url': 'http://api/menu', 'etag': None, 'last_modified': None,
+                  'data': [Product('Pizza1', 'Cheese', None, 100, 1)]}]
+    assert snapshot.save('http://api', resources)
+    assert len(snapshot.load('http://api')) == 1
+    with patch('catalog_snapshot.time.time', return_value=time.time() + 61):
+        assert snapshot.load('http://api') == []
+
+
+@patch.object(APIClient.transport, 'get')
+def test_warm_start_serves_menu_without_api_calls(mock_get, snapshot):
+    menu = [['Pizza1', 'Cheese', 'url', 100, 1]]
+    mock_get.return_value = response(menu, headers={'ETag': '"v1"'})
+    APIClient.get_menu()
+    APIClient.get_pizza_details('Unknown')
+    assert APIClient.save_snapshot()
+
+    APIClient.clear_caches()
+    mock_get.reset_mock()
+    assert APIClient.load_snapshot() == 1
+    assert APIClient.get_menu() == [Product('Pizza1', 'Cheese', 'url', 100, 1)]
+    assert APIClient.get_pizza_details_by_id(1).photo == 'url'
+    mock_get.assert_not_called()
+
+    index = APIClient.get_catalog()
+    mock_get.return_value = response(status_code=304)
+    APIClient.revalidate_catalog()
+    mock_get.assert_called_once_with("menu", f"{api_url}/menu", headers={'If-None-Match': '"v1"'})
+    assert APIClient.get_catalog() is index
+
+
+if __name__ == "__main__":
+    pytest.main()
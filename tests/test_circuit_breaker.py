@@ -0,0 +1,63 @@
+import pytest
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock):
+    return CircuitBreaker("menu", window=4, min_calls=4, error_rate=0.5, slow_call_duration=1.0,
+                          slow_call_rate=0.75, open_timeout=10, clock=clock)
+
+
+def test_trips_on_error_rate_and_fails_fast():
+    breaker = make_breaker(FakeClock())
+    for ok in (True, False, True, False):
+        breaker.allow()
+        breaker.record(0.1, ok)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_trips_on_slow_calls():
+    breaker = make_breaker(FakeClock())
+    for duration in (2.0, 2.0, 2.0, 0.1):
+        breaker.allow()
+        breaker.record(duration, True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(0.1, False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 10
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record(0.1, False)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 14
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.allow()
+    assert error.value.retry_after == 6
+
+    clock.now = 20
+    breaker.allow()
+    breaker.record(0.1, True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.allow()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -23,5 +23,12 @@ def test_get_command():
     with pytest.raises(ValueError):
         factory.get_command("unknown_command")
 
+def test_commands_are_shared():
+    factory = CommandFactory()
+    assert factory.get_command("menu") is factory.get_command("menu")
+    button_handler = factory.get_command("button_handler")
+    assert isinstance(button_handler, ButtonHandler)
+    assert button_handler.command_factory is factory
+
 if __name__ == "__main__":
     pytest.main()
@@ -2,22 +2,27 @@ import pytest
 from unittest.mock import MagicMock, patch
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
-from command_handlers import MenuCommand, DetailsCommand, AllDetailsCommand, ButtonHandler
+from command_handlers import MenuCommand, DetailsCommand, AllDetailsCommand, ProductDetailsCommand, ButtonHandler
+from models import Product
+from catalog_cache import CatalogIndex
+import callback_codec
+from circuit_breaker import CircuitOpenError
 
 @patch('command_handlers.APIClient')
 def test_menu_command(mock_api_client):
     menu_command = MenuCommand()
     update = MagicMock(spec=Update)
     context = MagicMock(spec=CallbackContext)
-    mock_api_client.get_menu.return_value = [('Pizza1',), ('Pizza2',)]
+    catalog = CatalogIndex([Product('Pizza1', 'Cheese', None, 100, 1), Product('Pizza2')])
+    mock_api_client.get_catalog.return_value = catalog
     menu_command.execute(update, context)
-    mock_api_client.get_menu.assert_called_once()
+    mock_api_client.get_catalog.assert_called_once()
     context.bot.send_message.assert_called_once_with(
         chat_id=update.effective_chat.id,
         text='📋 Меню <b>ADP Pizza</b>',
         parse_mode='HTML',
         reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton('Pizza1', callback_data='Pizza1')],
+            [InlineKeyboardButton('Pizza1', callback_data=callback_codec.encode('product_details', 1, catalog.version))],
             [InlineKeyboardButton('Pizza2', callback_data='Pizza2')],
             [InlineKeyboardButton('Показати всі товари', callback_data='all_details')]
         ])
@@ -29,14 +34,15 @@ def test_details_command(mock_api_client):
     update = MagicMock(spec=Update)
     context = MagicMock(spec=CallbackContext)
     context.args = ['Pizza1']
-    mock_api_client.get_pizza_details.return_value = ('Pizza1', 'Ingredients', None, 100, 1)
+    mock_api_client.get_catalog.return_value.version = 7
+    mock_api_client.get_pizza_details.return_value = Product('Pizza1', 'Ingredients', None, 100, 1)
     details_command.execute(update, context)
     mock_api_client.get_pizza_details.assert_called_once_with('Pizza1')
     context.bot.send_message.assert_called_once_with(
         chat_id=update.effective_chat.id,
         text="🍕 <b>Pizza1</b>\n\n💡 <b>Склад:</b> <i>Ingredients</i>\n\n💵 <b>Ціна:</b> 100 грн",
         parse_mode='HTML',
-        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("➕ Додати до замовлення", callback_data="add_to_cart_1")]])
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("➕ Додати до замовлення", callback_data=callback_codec.encode("add_to_cart", 1, 7))]])
     )
 
     context.bot.send_message.reset_mock()
@@ -44,6 +50,52 @@ def test_details_command(mock_api_client):
     details_command.execute(update, context)
     context.bot.send_message.assert_called_once_with(chat_id=update.effective_chat.id, text="Товар не знайдено 😶‍🌫️")
 
+@patch('config.bot_all_details_mode', 'cards')
+@patch('command_handlers.APIClient')
+def test_all_details_command(mock_api_client):
+    all_details_command = AllDetailsCommand()
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    mock_api_client.get_all_pizza_details.return_value = [
+        Product('Pizza1', 'Ingredients', 'photo_url', 100, 1),
+        Product('Pizza2', 'Ingredients', None, 150, 2)
+    ]
+    all_details_command.execute(update, context)
+    mock_api_client.get_all_pizza_details.assert_called_once()
+    mock_api_client.get_pizza_details.assert_not_called()
+    context.bot.send_photo.assert_called_once()
+    assert context.bot.send_photo.call_args[1]['photo'] == 'photo_url'
+    context.bot.send_message.assert_called_once()
+    assert "Pizza2" in context.bot.send_message.call_args[1]['text']
+
+@patch('config.bot_all_details_mode', 'album')
+@patch('command_handlers.APIClient')
+def test_all_details_command_album(mock_api_client):
+    all_details_command = AllDetailsCommand()
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    mock_api_client.get_catalog.return_value.version = 7
+    rows = [Product(f'Pizza{index}', 'Ingredients', f'photo_{index}', 100, index) for index in range(1, 12)]
+    rows.append(Product('Calzone', 'Ingredients', None, 150, 12))
+    mock_api_client.get_all_pizza_details.return_value = rows
+    all_details_command.execute(update, context)
+    albums = [call[1]['media'] for call in context.bot.send_media_group.call_args_list]
+    assert [len(album) for album in albums] == [5, 6]
+    assert albums[0][0].media == 'photo_1'
+    assert "Pizza1" in albums[0][0].caption
+    context.bot.send_photo.assert_not_called()
+    context.bot.send_message.assert_called_once()
+    kwargs = context.bot.send_message.call_args[1]
+    assert "Calzone" in kwargs['text']
+    keyboard = kwargs['reply_markup'].inline_keyboard
+    assert [len(row) for row in keyboard] == [2] * 6
+    assert keyboard[0][0].callback_data == callback_codec.encode("add_to_cart", 1, 7)
+
+def test_all_details_batches():
+    assert AllDetailsCommand.batches(list(range(21)), 10) == [list(range(7)), list(range(7, 14)), list(range(14, 21))]
+    assert AllDetailsCommand.batches([1], 10) == [[1]]
+    assert AllDetailsCommand.batches([], 10) == []
+
 @patch('command_handlers.APIClient')
 def test_button_handler(mock_api_client):
     button_handler = ButtonHandler()
@@ -56,7 +108,80 @@ def test_button_handler(mock_api_client):
     button_handler.execute(update, context)
     button_handler.command_factory.get_command.assert_called_once_with("add_to_cart")
     add_to_cart_command = button_handler.command_factory.get_command.return_value
-    add_to_cart_command.execute.assert_called_once_with("1", update, context)
+    add_to_cart_command.execute.assert_called_once_with(1, update, context)
+
+@patch('command_handlers.APIClient')
+def test_button_handler_routes(mock_api_client):
+    button_handler = ButtonHandler()
+    button_handler.set_factory(MagicMock())
+    get_command = button_handler.command_factory.get_command
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    update.callback_query = MagicMock()
+
+    update.callback_query.data = "open_cart"
+    button_handler.execute(update, context)
+    get_command.assert_called_once_with("open_cart")
+    get_command.return_value.execute.assert_called_once_with(update, context)
+
+    get_command.reset_mock()
+    update.callback_query.data = "Pizza1"
+    button_handler.execute(update, context)
+    get_command.assert_called_once_with("details")
+    get_command.return_value.execute.assert_called_once_with(update, context)
+    assert context.args == ["Pizza1"]
+
+@patch('command_handlers.APIClient')
+def test_button_handler_decodes_product_buttons(mock_api_client):
+    button_handler = ButtonHandler()
+    button_handler.set_factory(MagicMock())
+    get_command = button_handler.command_factory.get_command
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    update.callback_query = MagicMock()
+    mock_api_client.get_catalog.return_value.version = 7
+
+    update.callback_query.data = callback_codec.encode("product_details", 12, 7)
+    button_handler.execute(update, context)
+    get_command.assert_called_once_with("product_details")
+    get_command.return_value.execute.assert_called_once_with(12, update, context)
+
+    get_command.reset_mock()
+    update.callback_query.data = callback_codec.encode("add_to_cart", 12, 7)
+    button_handler.execute(update, context)
+    get_command.assert_called_once_with("add_to_cart")
+    get_command.return_value.execute.assert_called_once_with(12, update, context)
+
+@patch('command_handlers.APIClient')
+def test_product_details_command(mock_api_client):
+    command = ProductDetailsCommand()
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    mock_api_client.get_catalog.return_value.version = 7
+    mock_api_client.get_pizza_details_by_id.return_value = Product('Pizza1', 'Ingredients', None, 100, 1)
+    command.execute(1, update, context)
+    mock_api_client.get_pizza_details_by_id.assert_called_once_with(1)
+    assert "Pizza1" in context.bot.send_message.call_args[1]['text']
+
+    mock_api_client.get_pizza_details_by_id.return_value = None
+    command.execute(2, update, context)
+    context.bot.send_message.assert_called_with(chat_id=update.effective_chat.id, text="Товар не знайдено 😶‍🌫️")
+
+@pytest.mark.parametrize('command, method, args', [
+    (DetailsCommand(), 'get_pizza_details', ()),
+    (ProductDetailsCommand(), 'get_pizza_details_by_id', (1,)),
+])
+@patch('command_handlers.APIClient')
+def test_details_commands_reply_when_backend_unavailable(mock_api_client, command, method, args):
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    context.args = ['Pizza1']
+    getattr(mock_api_client, method).side_effect = CircuitOpenError("details")
+    command.execute(*args, update, context)
+    context.bot.send_message.assert_called_once_with(
+        chat_id=update.effective_chat.id,
+        text="Сервіс тимчасово недоступний 😔 Спробуйте, будь ласка, пізніше"
+    )
 
 if __name__ == "__main__":
     pytest.main()
@@ -1,84 +1,238 @@
+import json
 import pytest
 import requests
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
 from db_manager import APIClient
 from config import api_url
+from models import Product, CartLine, UserProfile, OrderReceipt
 
-@patch('db_manager.requests.get')
+
+def response(payload=None, status_code=200, headers=None):
+    content = b'' if payload is None else json.dumps(payload).encode()
+    return MagicMock(status_code=status_code, headers=headers or {}, content=content)
+
+
+@patch.object(APIClient.transport, 'get')
 def test_get_menu(mock_get):
-    mock_get.return_value.json.return_value = [{'name': 'Pizza1'}, {'name': 'Pizza2'}]
+    mock_get.return_value = response([{'name': 'Pizza1'}, {'name': 'Pizza2'}])
     result = APIClient.get_menu()
-    mock_get.assert_called_once_with(f"{api_url}/menu")
-    assert result == [{'name': 'Pizza1'}, {'name': 'Pizza2'}]
+    mock_get.assert_called_once_with("menu", f"{api_url}/menu")
+    assert result == [Product('Pizza1'), Product('Pizza2')]
+
+@patch.object(APIClient.transport, 'get')
+def test_get_menu_cached(mock_get):
+    mock_get.return_value = response([['Pizza1'], ['Pizza2']])
+    assert APIClient.get_menu() == [Product('Pizza1'), Product('Pizza2')]
+    assert APIClient.get_menu() == [Product('Pizza1'), Product('Pizza2')]
+    mock_get.assert_called_once_with("menu", f"{api_url}/menu")
+
+@patch.object(APIClient.transport, 'get')
+def test_fetch_menu_conditional(mock_get):
+    menu = [['Pizza1', 'Cheese', None, 100, 1]]
+    mock_get.return_value = response(menu, headers={'ETag': '"v1"'})
+    products = APIClient.fetch_menu()
+    assert products == [Product('Pizza1', 'Cheese', None, 100, 1)]
+
+    mock_get.return_value = response(status_code=304, headers={'ETag': '"v1"'})
+    assert APIClient.fetch_menu() is products
+    mock_get.assert_called_with("menu", f"{api_url}/menu", headers={'If-None-Match': '"v1"'})
 
-@patch('db_manager.requests.get')
+@patch.object(APIClient.transport, 'get')
 def test_get_pizza_details(mock_get):
-    mock_get.return_value.json.return_value = {'name': 'Pizza1', 'ingredients': 'Cheese'}
+    mock_get.side_effect = [response([['Pizza1']]), response(['Pizza1', 'Cheese', None, 100, 1])]
     result = APIClient.get_pizza_details('Pizza1')
-    mock_get.assert_called_once_with(f"{api_url}/menu/details/Pizza1")
-    assert result == {'name': 'Pizza1', 'ingredients': 'Cheese'}
+    assert mock_get.call_args_list == [call("menu", f"{api_url}/menu"), call("details", f"{api_url}/menu/details/Pizza1")]
+    assert result == Product('Pizza1', 'Cheese', None, 100, 1)
 
-@patch('db_manager.requests.get')
+@patch.object(APIClient.transport, 'get')
 def test_get_pizza_details_by_id(mock_get):
-    mock_get.return_value.json.return_value = {'name': 'Pizza1', 'ingredients': 'Cheese'}
+    mock_get.side_effect = [response([['Pizza1']]), response(['Pizza1', 'Cheese', None, 100, 1])]
     result = APIClient.get_pizza_details_by_id(1)
-    mock_get.assert_called_once_with(f"{api_url}/menu/details-by-id/1")
-    assert result == {'name': 'Pizza1', 'ingredients': 'Cheese'}
-
-@patch('db_manager.requests.post')
-def test_add_to_cart(mock_post):
-    mock_post.return_value.json.return_value = {'status': 'success'}
-    result = APIClient.add_to_cart(1, 1)
-    mock_post.assert_called_once_with(f"{api_url}/cart/add", json={'user_id': 1, 'product_id': 1})
+    assert mock_get.call_args_list == [call("menu", f"{api_url}/menu"), call("details", f"{api_url}/menu/details-by-id/1")]
+    assert result == Product('Pizza1', 'Cheese', None, 100, 1)
+
+@patch.object(APIClient.transport, 'get')
+def test_get_pizza_details_from_catalog(mock_get):
+    mock_get.return_value = response([['Pizza1', 'Cheese', None, 100, 1], ['Pizza2', 'Ham', 'url', 150, 2]])
+    assert APIClient.get_pizza_details('Pizza2') == Product('Pizza2', 'Ham', 'url', 150, 2)
+    assert APIClient.get_pizza_details_by_id('1') == Product('Pizza1', 'Cheese', None, 100, 1)
+    assert APIClient.get_pizza_details('Unknown') is None
+    assert APIClient.get_all_pizza_details() == [Product('Pizza1', 'Cheese', None, 100, 1), Product('Pizza2', 'Ham', 'url', 150, 2)]
+    mock_get.assert_called_once_with("menu", f"{api_url}/menu")
+
+@patch.object(APIClient.transport, 'post')
+def test_send_to_cart(mock_post):
+    mock_post.return_value = response({'status': 'success'})
+    result = APIClient.send_to_cart(1, 1)
+    mock_post.assert_called_once_with("cart", f"{api_url}/cart/add", json={'user_id': 1, 'product_id': 1})
     assert result == {'status': 'success'}
 
-@patch('db_manager.requests.get')
+@patch.object(APIClient.transport, 'post')
+def test_add_to_cart_is_written_behind(mock_post):
+    mock_post.return_value = response({'status': 'success'})
+    APIClient.add_to_cart(1, 1)
+    APIClient.add_to_cart(1, 2)
+    mock_post.assert_not_called()
+    assert APIClient.cart_writes.pending(1) == [1, 2]
+
+    APIClient.cart_writes.flush(1)
+    assert mock_post.call_args_list == [
+        call("cart", f"{api_url}/cart/add", json={'user_id': 1, 'product_id': 1}),
+        call("cart", f"{api_url}/cart/add", json={'user_id': 1, 'product_id': 2})
+    ]
+    assert APIClient.cart_writes.pending(1) == []
+
+@patch.object(APIClient.transport, 'get')
 def test_get_cart(mock_get):
-    mock_get.return_value.json.return_value = [{'product_id': 1, 'quantity': 2}]
+    mock_get.return_value = response([['Pizza1', 2, 200]])
     result = APIClient.get_cart(1)
-    mock_get.assert_called_once_with(f"{api_url}/cart/1")
-    assert result == [{'product_id': 1, 'quantity': 2}]
+    mock_get.assert_called_once_with("cart", f"{api_url}/cart/1")
+    assert result == [CartLine('Pizza1', 2, 200)]
+    assert result[0].total == 200
+
+@patch.object(APIClient.transport, 'post')
+@patch.object(APIClient.transport, 'get')
+def test_cart_mirror(mock_get, mock_post):
+    mock_get.return_value = response([['Pizza1', 1, 100]])
+    mock_post.return_value = response({'status': 'success'})
+    assert APIClient.get_cart(1) == [CartLine('Pizza1', 1, 100)]
+    assert APIClient.get_cart(1) == [CartLine('Pizza1', 1, 100)]
+    mock_get.assert_called_once_with("cart", f"{api_url}/cart/1")
 
-@patch('db_manager.requests.delete')
+@patch.object(APIClient.transport, 'post')
+@patch.object(APIClient.transport, 'get')
+def test_written_cart_is_read_from_backend(mock_get, mock_post):
+    mock_get.return_value = response([['Pizza1', 1, 100]])
+    mock_post.return_value = response({'status': 'success'})
+    APIClient.get_cart(1)
+    APIClient.add_to_cart(1, 1)
+    mock_get.return_value = response([['Pizza1', 2, 180]])
+    assert APIClient.get_cart(1) == [CartLine('Pizza1', 2, 180)]
+    assert mock_get.call_count == 2
+    assert APIClient.get_cart(1, fresh=True) == [CartLine('Pizza1', 2, 180)]
+    assert mock_get.call_count == 3
+
+@patch.object(APIClient.transport, 'post')
+def test_send_to_cart_error_status_is_not_written(mock_post):
+    mock_post.return_value = response({'detail': 'Internal Server Error'}, status_code=500)
+    with pytest.raises(requests.HTTPError):
+        APIClient.send_to_cart(1, 1)
+
+@patch.object(APIClient.transport, 'post')
+def test_dropped_cart_write_is_reported(mock_post):
+    mock_post.return_value = response({'detail': 'Service Unavailable'}, status_code=503)
+    APIClient.carts.set(1, [])
+    dropped = MagicMock()
+    with patch.object(APIClient, 'cart_write_dropped', dropped), \
+            patch.object(APIClient.cart_writes, 'max_failures', 1):
+        APIClient.cart_writes.enqueue(1, 7)
+        with pytest.raises(requests.HTTPError):
+            APIClient.cart_writes.flush(1)
+    dropped.assert_called_once_with(1, [7])
+    assert APIClient.carts.get(1) is None
+    assert APIClient.cart_writes.pending(1) == []
+
+@patch.object(APIClient.transport, 'delete')
+@patch.object(APIClient.transport, 'get')
+def test_clear_cart_updates_mirror(mock_get, mock_delete):
+    mock_get.return_value = response([['Pizza1', 1, 100]])
+    mock_delete.return_value = response({'status': 'success'})
+    APIClient.get_cart(1)
+    APIClient.clear_cart(1)
+    assert APIClient.get_cart(1) == []
+    mock_get.assert_called_once()
+
+@patch.object(APIClient.transport, 'delete')
+@patch.object(APIClient.transport, 'get')
+def test_failed_clear_cart_invalidates_mirror(mock_get, mock_delete):
+    mock_get.return_value = response([['Pizza1', 1, 100]])
+    mock_delete.return_value = response({'detail': 'Internal Server Error'}, status_code=500)
+    APIClient.get_cart(1)
+    with pytest.raises(requests.HTTPError):
+        APIClient.clear_cart(1)
+    assert APIClient.get_cart(1) == [CartLine('Pizza1', 1, 100)]
+    assert mock_get.call_count == 2
+
+@patch.object(APIClient.transport, 'delete')
 def test_clear_cart(mock_delete):
-    mock_delete.return_value.json.return_value = {'status': 'success'}
+    mock_delete.return_value = response({'status': 'success'})
     result = APIClient.clear_cart(1)
-    mock_delete.assert_called_once_with(f"{api_url}/cart/clear/1")
+    mock_delete.assert_called_once_with("cart", f"{api_url}/cart/clear/1")
     assert result == {'status': 'success'}
 
-@patch('db_manager.requests.get')
+@patch.object(APIClient.transport, 'post')
+def test_create_order_error_status_raises(mock_post):
+    mock_post.return_value = response({'detail': 'Bad Gateway'}, status_code=502)
+    with pytest.raises(requests.HTTPError):
+        APIClient.create_order(1, '123456789', [('Pizza1', 1, 100)], 100, '0.0|0.0')
+
+@patch.object(APIClient.transport, 'get')
 def test_get_user(mock_get):
-    mock_get.return_value.json.return_value = {'user_id': 1, 'username': 'test_user'}
+    mock_get.return_value = response({'user_id': 1, 'username': 'test_user'})
     result = APIClient.get_user(1)
-    mock_get.assert_called_once_with(f"{api_url}/user/1")
-    assert result == {'user_id': 1, 'username': 'test_user'}
+    mock_get.assert_called_once_with("user", f"{api_url}/user/1")
+    assert result == UserProfile(1, 'test_user')
+
+@patch.object(APIClient.transport, 'patch')
+@patch.object(APIClient.transport, 'get')
+def test_user_profile_cache(mock_get, mock_patch):
+    mock_get.return_value = response([1, 'test_user', 'Test', 'User', None, None])
+    mock_patch.return_value = response({'status': 'success'})
+    APIClient.get_user(1)
+    APIClient.update_user_contact(1, phone_number='123456789')
+    APIClient.update_user_contact(1, location='0.0|0.0')
+    assert APIClient.get_user(1) == UserProfile(1, 'test_user', 'Test', 'User', '123456789', '0.0|0.0')
+    mock_get.assert_called_once_with("user", f"{api_url}/user/1")
+
+@patch.object(APIClient.transport, 'patch')
+@patch.object(APIClient.transport, 'get')
+def test_failed_contact_update_is_not_cached(mock_get, mock_patch):
+    mock_get.return_value = response([1, 'test_user', 'Test', 'User', None, None])
+    mock_patch.return_value = response({'detail': 'Internal Server Error'}, status_code=500)
+    APIClient.get_user(1)
+    with pytest.raises(requests.HTTPError):
+        APIClient.update_user_contact(1, phone_number='123456789')
+    assert APIClient.get_user(1) == UserProfile(1, 'test_user', 'Test', 'User', None, None)
+    assert mock_get.call_count == 2
 
-@patch('db_manager.requests.post')
+@patch.object(APIClient.transport, 'post')
+@patch.object(APIClient.transport, 'get')
+def test_missing_user_not_cached(mock_get, mock_post):
+    mock_get.return_value = response(None)
+    mock_post.return_value = response({'status': 'success'})
+    assert APIClient.get_user(1) is None
+    APIClient.add_user(1, 'test_user', 'Test', 'User')
+    mock_get.return_value = response([1, 'test_user', 'Test', 'User', None, None])
+    assert APIClient.get_user(1) == UserProfile(1, 'test_user', 'Test', 'User', None, None)
+    assert mock_get.call_count == 2
+
+@patch.object(APIClient.transport, 'post')
 def test_add_user(mock_post):
-    mock_post.return_value.json.return_value = {'status': 'success'}
+    mock_post.return_value = response({'status': 'success'})
     result = APIClient.add_user(1, 'test_user', 'Test', 'User')
-    mock_post.assert_called_once_with(f"{api_url}/user/add", json={'user_id': 1, 'username': 'test_user', 'firstname': 'Test', 'lastname': 'User'})
+    mock_post.assert_called_once_with("user", f"{api_url}/user/add", json={'user_id': 1, 'username': 'test_user', 'firstname': 'Test', 'lastname': 'User'})
     assert result == {'status': 'success'}
 
-@patch('db_manager.requests.patch')
+@patch.object(APIClient.transport, 'patch')
 def test_update_user_contact(mock_patch):
-    mock_patch.return_value.json.return_value = {'status': 'success'}
+    mock_patch.return_value = response({'status': 'success'})
     result = APIClient.update_user_contact(1, phone_number='123456789', location='Test Location')
-    mock_patch.assert_called_once_with(f"{api_url}/user/update/contact", json={'user_id': 1, 'phone_number': '123456789', 'location': 'Test Location'})
+    mock_patch.assert_called_once_with("user", f"{api_url}/user/update/contact", json={'user_id': 1, 'phone_number': '123456789', 'location': 'Test Location'})
     assert result == {'status': 'success'}
 
-@patch('db_manager.requests.post')
+@patch.object(APIClient.transport, 'post')
 def test_create_order(mock_post):
-    mock_post.return_value.json.return_value = {'status': 'success'}
-    result = APIClient.create_order(1, '123456789', [{'product_id': 1, 'quantity': 2}], 200.0, 'Test Location')
-    mock_post.assert_called_once_with(f"{api_url}/order/create", json={
+    mock_post.return_value = response({'order_id': 42})
+    result = APIClient.create_order(1, '123456789', [{'product_id': 1, 'quantity': 2}], 200.0, 'Test Location',
+                                    idempotency_key='1-10-confirm_order')
+    mock_post.assert_called_once_with("order", f"{api_url}/order/create", json={
         'user_id': 1,
         'phone_number': '123456789',
         'order_list': [{'product_id': 1, 'quantity': 2}],
         'total_price': 200.0,
         'location': 'Test Location'
-    })
-    assert result == {'status': 'success'}
+    }, headers={'Idempotency-Key': '1-10-confirm_order'})
+    assert result == OrderReceipt(42)
 
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import patch
+import requests
+from http_transport import HTTPTransport
+from circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+
+
+def test_request_uses_endpoint_timeout():
+    transport = HTTPTransport(timeouts={'default': (1, 2), 'order': (1, 30)}, breakers=CircuitBreakerRegistry())
+    with patch.object(transport.session, 'request') as mock_request:
+        mock_request.return_value.status_code = 200
+        transport.post("order", "http://api/order/create", json={'user_id': 1})
+        mock_request.assert_called_once_with("POST", "http://api/order/create", json={'user_id': 1}, timeout=(1, 30))
+
+        mock_request.reset_mock()
+        transport.get("menu", "http://api/menu")
+        mock_request.assert_called_once_with("GET", "http://api/menu", timeout=(1, 2))
+
+
+def test_retries_only_idempotent_methods():
+    transport = HTTPTransport(retries=2, backoff_factor=0.1)
+    adapter = transport.session.get_adapter("http://api/menu")
+    assert adapter is transport.adapter
+    assert adapter.max_retries.total == 2
+    assert adapter.max_retries.is_retry("GET", 503)
+    assert not adapter.max_retries.is_retry("POST", 503)
+
+
+def test_pool_stats():
+    transport = HTTPTransport(pool_maxsize=8)
+    assert transport.pool_stats() == {}
+
+    transport.adapter.poolmanager.connection_from_url("http://api:5000/menu")
+    stats = transport.pool_stats()
+    assert stats["http://api:5000"] == {'maxsize': 8, 'in_use': 0, 'idle': 0, 'connections_opened': 0, 'requests': 0}
+
+
+def test_circuit_opens_after_errors():
+    transport = HTTPTransport(breakers=CircuitBreakerRegistry(window=4, min_calls=4, open_timeout=60))
+    with patch.object(transport.session, 'request', side_effect=requests.ConnectionError) as mock_request:
+        for _ in range(4):
+            with pytest.raises(requests.ConnectionError):
+                transport.get("cart", "http://api/cart/1")
+        with pytest.raises(CircuitOpenError):
+            transport.get("cart", "http://api/cart/1")
+        assert mock_request.call_count == 4
+    assert transport.breakers.states() == {'cart': 'open'}
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,63 @@
+import os
+import pytest
+import config
+from unittest.mock import patch
+from db_manager import APIClient
+from models import CartLine, OrderReceipt
+from loadtest.fake_backend import FakeBackend
+from loadtest.fake_telegram import FakeTelegram
+from loadtest.load_generator import run_load
+
+
+@pytest.fixture
+def backend():
+    backend = FakeBackend().start()
+    # Робочі процеси режиму processes читають адресу API зі змінної оточення
+    with patch('db_manager.api_url', backend.url), patch('async_db_manager.api_url', backend.url), \
+            patch.dict(os.environ, {'API_URL': backend.url}):
+        yield backend
+    backend.stop()
+
+
+def test_api_client_against_fake_backend(backend):
+    assert APIClient.get_pizza_details_by_id(2).name == 'Пепероні'
+    APIClient.add_to_cart(7, 2)
+    APIClient.add_to_cart(7, 2)
+    assert APIClient.get_cart(7) == [CartLine('Пепероні', 2, 440)]
+
+    assert APIClient.get_user(7) is None
+    APIClient.add_user(7, 'user7', 'User', 'Seven')
+    APIClient.update_user_contact(7, phone_number='+380000000007')
+    assert APIClient.get_user(7).phone_number == '+380000000007'
+
+    assert APIClient.create_order(7, '+380000000007', APIClient.get_cart(7), 440, '0|0') == OrderReceipt(1)
+    APIClient.clear_cart(7)
+    assert APIClient.get_cart(7) == []
+    assert backend.requests['GET /menu'] == 1
+
+    etag = APIClient.validators.get(f"{backend.url}/menu")[0]
+    response = APIClient.transport.get("menu", f"{backend.url}/menu", headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize('mode', ['threads', 'asyncio', 'webhook', 'processes'])
+def test_run_load(backend, mode, tmp_path, monkeypatch):
+    monkeypatch.setenv('CATALOG_SNAPSHOT_PATH', str(tmp_path / 'catalog_snapshot.json'))
+    # Підставний Telegram не має лімітів надсилання, тест вимірює пропускну здатність бота
+    for name in ('global_rate', 'chat_rate'):
+        monkeypatch.setattr(config, f"bot_outbound_{name}", 0)
+        monkeypatch.setenv(f"BOT_OUTBOUND_{name.upper()}", '0')
+    telegram = FakeTelegram().start()
+    try:
+        result = run_load(telegram, users=2, iterations=2, timeout=5, mode=mode)
+    finally:
+        telegram.stop()
+    commands = result['commands']
+    assert all(stats['timeouts'] == 0 for stats in commands.values())
+    assert commands['confirm_order']['count'] == 4
+    assert len(backend.orders) == 4
+    assert result['updates_per_second'] > 0
+
+
+if __name__ == "__main__":
+    pytest.main()
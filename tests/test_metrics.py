@@ -0,0 +1,42 @@
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+from metrics import Histogram, InMemoryMetrics
+from http_transport import HTTPTransport
+from circuit_breaker import CircuitBreakerRegistry
+
+
+def test_histogram_quantiles():
+    histogram = Histogram((0.1, 0.5, 1.0))
+    for value in [0.05] * 90 + [0.3] * 9 + [2.0]:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.95) == 0.5
+    assert histogram.quantile(1.0) == 2.0
+    assert histogram.summary()['count'] == 100
+
+
+def test_transport_reports_request_metrics():
+    sink = InMemoryMetrics()
+    transport = HTTPTransport(breakers=CircuitBreakerRegistry(), metrics=sink)
+    response = MagicMock(status_code=200, content=b'[["Pizza1"]]')
+    response.raw.retries.history = (MagicMock(), MagicMock())
+    with patch.object(transport.session, 'request', return_value=response):
+        transport.get("menu", "http://api/menu")
+    with patch.object(transport.session, 'request', side_effect=requests.Timeout):
+        with pytest.raises(requests.Timeout):
+            transport.post("order", "http://api/order/create")
+
+    snapshot = sink.snapshot()
+    assert snapshot['counters'] == {
+        'api.status{endpoint=menu,status=200}': 1,
+        'api.retries{endpoint=menu}': 2,
+        'api.status{endpoint=order,status=Timeout}': 1,
+    }
+    assert snapshot['histograms']['api.latency{endpoint=menu,method=GET}']['count'] == 1
+    assert snapshot['histograms']['api.latency{endpoint=order,method=POST}']['count'] == 1
+    assert snapshot['histograms']['api.payload_bytes{endpoint=menu}']['sum'] == 12
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,41 @@
+import json
+import pickle
+import pytest
+import models
+from models import Product, CartLine, UserProfile, OrderReceipt
+
+
+def test_loads():
+    assert models.loads(b'[["Pizza1", 1, 100]]') == [['Pizza1', 1, 100]]
+    assert models.loads(b'') is None
+
+
+def test_product_from_row_and_dict():
+    assert Product.from_json(['Pizza1', 'Cheese', 'url', 100, '1']) == Product('Pizza1', 'Cheese', 'url', 100, 1)
+    assert Product.from_json(['Pizza1']) == Product('Pizza1')
+    assert Product.from_json({'name': 'Pizza1', 'price': 100, 'id': 1}).id == 1
+    assert Product.from_json(None) is None
+
+
+def test_collections():
+    assert models.products([['Pizza1'], None, ['Pizza2']]) == [Product('Pizza1'), Product('Pizza2')]
+    assert models.cart_lines([['Pizza1', '2', 200]]) == [CartLine('Pizza1', 2, 200)]
+    assert models.cart_lines(None) == []
+
+
+def test_user_profile_and_receipt():
+    user = UserProfile.from_json([1, 'test_user', 'Test', 'User', '123', '0|0'])
+    assert (user.phone_number, user.location) == ('123', '0|0')
+    assert UserProfile.from_json({'user_id': '2'}) == UserProfile(2)
+    assert UserProfile.from_json(None) is None
+    assert OrderReceipt.from_json({'order_id': 5}).order_id == 5
+
+
+def test_models_serialize_as_rows():
+    product = Product('Pizza1', 'Cheese', None, 100, 1)
+    assert json.loads(json.dumps(product)) == ['Pizza1', 'Cheese', None, 100, 1]
+    assert pickle.loads(pickle.dumps(product)) == product
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,10 +1,15 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+import requests
+from unittest.mock import MagicMock, AsyncMock, patch
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import CallbackContext
+from command_handlers import ButtonHandler
 from order_handler import StartOrderCommand, ConfirmOrderCommand, CancelOrderCommand, RequestOrderConfirmationCommand, RequestPhoneNumberCommand, RequestLocationCommand, GotPhoneNumberCommand, GotLocationCommand
 from start_command import StartCommand
+from circuit_breaker import CircuitOpenError
 import re
+from models import CartLine, UserProfile, OrderReceipt
 
 @patch('order_handler.APIClient.get_user')
 @patch('order_handler.APIClient.add_user')
@@ -35,18 +40,21 @@ def test_confirm_order_command(mock_clear_cart, mock_create_order, mock_get_user
     update = MagicMock(spec=Update)
     context = MagicMock(spec=CallbackContext)
     context.user_data = {'processing_order': True}
-    mock_get_cart.return_value = [('Pizza1', 2, 200), ('Pizza2', 1, 100)]
-    mock_get_user.return_value = [1, 'test_user', 'Test', 'User', '123456789', 'Test Location']
-    mock_create_order.return_value = {'order_id': 1}
+    update.effective_user.id = 1
+    update.callback_query.message.message_id = 10
+    mock_get_cart.return_value = [CartLine('Pizza1', 2, 200), CartLine('Pizza2', 1, 100)]
+    mock_get_user.return_value = UserProfile(1, 'test_user', 'Test', 'User', '123456789', 'Test Location')
+    mock_create_order.return_value = OrderReceipt(1)
     confirm_order_command.execute(update, context)
-    mock_get_cart.assert_called_once_with(update.effective_user.id)
+    mock_get_cart.assert_called_once_with(update.effective_user.id, fresh=True)
     mock_get_user.assert_called_once_with(update.effective_user.id)
     mock_create_order.assert_called_once_with(
         update.effective_user.id,
         '123456789',
-        [('Pizza1', 2, 200), ('Pizza2', 1, 100)],
+        [CartLine('Pizza1', 2, 200), CartLine('Pizza2', 1, 100)],
         300,
-        'Test Location'
+        'Test Location',
+        idempotency_key='1-10-confirm_order'
     )
     mock_clear_cart.assert_called_once_with(update.effective_user.id)
     context.bot.send_message.assert_called_once_with(
@@ -54,6 +62,68 @@ def test_confirm_order_command(mock_clear_cart, mock_create_order, mock_get_user
         text="✅ Ваше замовлення #1 оформлено. Очікуйте на дзвінок кур'єра ❣️"
     )
 
+@pytest.mark.parametrize('error', [CircuitOpenError("cart"), requests.Timeout("read timeout")])
+@patch('order_handler.APIClient.get_cart')
+@patch('order_handler.APIClient.create_order')
+def test_confirm_order_command_backend_unavailable(mock_create_order, mock_get_cart, error):
+    confirm_order_command = ConfirmOrderCommand()
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    context.user_data = {'processing_order': True}
+    mock_get_cart.side_effect = error
+    confirm_order_command.execute(update, context)
+    mock_create_order.assert_not_called()
+    assert context.user_data['processing_order'] == True
+    context.bot.send_message.assert_called_once_with(
+        chat_id=update.effective_chat.id,
+        text="Сервіс тимчасово недоступний 😔 Спробуйте, будь ласка, пізніше"
+    )
+
+@patch('order_handler.APIClient.get_cart')
+@patch('order_handler.APIClient.get_user')
+@patch('order_handler.APIClient.create_order')
+@patch('order_handler.APIClient.clear_cart')
+def test_double_confirm_creates_one_order(mock_clear_cart, mock_create_order, mock_get_user, mock_get_cart):
+    button_handler = ButtonHandler()
+    button_handler.set_factory(MagicMock())
+    button_handler.command_factory.get_command.return_value = ConfirmOrderCommand()
+    update = MagicMock(spec=Update)
+    update.callback_query.data = "confirm_order"
+    update.callback_query.message.message_id = 20
+    context = MagicMock(spec=CallbackContext)
+    context.user_data = {'processing_order': True}
+    mock_get_cart.return_value = [CartLine('Pizza1', 2, 200)]
+    mock_get_user.return_value = UserProfile(1, 'test_user', 'Test', 'User', '123456789', 'Test Location')
+    mock_create_order.return_value = OrderReceipt(7)
+    button_handler.execute(update, context)
+    button_handler.execute(update, context)
+    mock_create_order.assert_called_once()
+    mock_clear_cart.assert_called_once()
+    assert context.bot.send_message.call_count == 2
+    assert all("#7" in call[1]['text'] for call in context.bot.send_message.call_args_list)
+
+@patch('order_handler.APIClient.get_cart')
+@patch('order_handler.APIClient.get_user')
+@patch('order_handler.APIClient.create_order')
+@patch('order_handler.APIClient.clear_cart')
+def test_confirm_retry_after_failure_is_not_suppressed(mock_clear_cart, mock_create_order, mock_get_user, mock_get_cart):
+    button_handler = ButtonHandler()
+    button_handler.set_factory(MagicMock())
+    button_handler.command_factory.get_command.return_value = ConfirmOrderCommand()
+    update = MagicMock(spec=Update)
+    update.callback_query.data = "confirm_order"
+    update.callback_query.message.message_id = 30
+    context = MagicMock(spec=CallbackContext)
+    context.user_data = {'processing_order': True}
+    mock_get_cart.return_value = [CartLine('Pizza1', 2, 200)]
+    mock_get_user.return_value = UserProfile(1, 'test_user', 'Test', 'User', '123456789', 'Test Location')
+    mock_create_order.side_effect = [CircuitOpenError('order'), OrderReceipt(8)]
+    button_handler.execute(update, context)
+    assert context.user_data['processing_order'] is True
+    button_handler.execute(update, context)
+    assert mock_create_order.call_count == 2
+    assert "#8" in context.bot.send_message.call_args[1]['text']
+
 def test_request_phone_number_command():
     request_phone_number_command = RequestPhoneNumberCommand()
     update = MagicMock(spec=Update)
@@ -111,5 +181,72 @@ def test_got_location_command(mock_update_user_contact):
     got_location_command.factory.get_command.assert_called_once_with("request_order_confirmation")
     got_location_command.factory.get_command.return_value.execute.assert_called_once_with(update, context)
 
+@patch('order_handler.AsyncAPIClient.get_cart_and_user', new_callable=AsyncMock)
+def test_request_order_confirmation_command_async(mock_get_cart_and_user):
+    command = RequestOrderConfirmationCommand()
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    context.user_data = {'processing_order': True}
+    mock_get_cart_and_user.return_value = [[CartLine('Pizza1', 2, 200)],
+                                           UserProfile(1, 'test_user', 'Test', 'User', '123456789', '50.45|30.52')]
+    asyncio.run(command.execute_async(update, context))
+    mock_get_cart_and_user.assert_awaited_once_with(update.effective_user.id)
+    assert '123456789' in context.bot.send_message.call_args[1]['text']
+    context.bot.send_location.assert_called_once()
+    assert context.bot.send_location.call_args[1]['latitude'] == 50.45
+
+@patch('order_handler.AsyncAPIClient.get_user', new_callable=AsyncMock)
+def test_start_order_command_async(mock_get_user):
+    start_order_command = StartOrderCommand()
+    start_order_command.set_factory(MagicMock())
+    next_command = start_order_command.factory.get_command.return_value
+    next_command.execute_async = AsyncMock()
+    update = MagicMock(spec=Update)
+    context = MagicMock(spec=CallbackContext)
+    context.user_data = {}
+    mock_get_user.return_value = UserProfile(1, 'test_user', 'Test', 'User', '123456789', 'Test Location')
+    assert asyncio.run(start_order_command.execute_async(update, context)) is True
+    assert context.user_data['processing_order'] is True
+    mock_get_user.assert_awaited_once_with(update.effective_user.id)
+    start_order_command.factory.get_command.assert_called_once_with("request_order_confirmation")
+    next_command.execute_async.assert_awaited_once_with(update, context)
+
+@patch('order_handler.AsyncAPIClient.update_user_contact', new_callable=AsyncMock)
+def test_got_location_command_async(mock_update_user_contact):
+    got_location_command = GotLocationCommand()
+    got_location_command.set_factory(MagicMock())
+    next_command = got_location_command.factory.get_command.return_value
+    next_command.execute_async = AsyncMock()
+    update = MagicMock(spec=Update)
+    update.message.location.latitude = 50.45
+    update.message.location.longitude = 30.52
+    context = MagicMock(spec=CallbackContext)
+    context.user_data = {'processing_order': True}
+    asyncio.run(got_location_command.execute_async(update, context))
+    mock_update_user_contact.assert_awaited_once_with(update.effective_user.id, location="50.45|30.52")
+    context.bot.send_message.assert_called_once_with(chat_id=update.effective_chat.id, text="✅ Адресу збережено")
+    next_command.execute_async.assert_awaited_once_with(update, context)
+
+@patch('order_handler.APIClient.get_cart')
+@patch('order_handler.APIClient.get_user')
+@patch('order_handler.APIClient.create_order')
+@patch('order_handler.APIClient.clear_cart')
+def test_double_confirm_creates_one_order_async(mock_clear_cart, mock_create_order, mock_get_user, mock_get_cart):
+    button_handler = ButtonHandler()
+    button_handler.set_factory(MagicMock())
+    button_handler.command_factory.get_command.return_value = ConfirmOrderCommand()
+    update = MagicMock(spec=Update)
+    update.callback_query.data = "confirm_order"
+    update.callback_query.message.message_id = 40
+    context = MagicMock(spec=CallbackContext)
+    context.user_data = {'processing_order': True}
+    mock_get_cart.return_value = [CartLine('Pizza1', 2, 200)]
+    mock_get_user.return_value = UserProfile(1, 'test_user', 'Test', 'User', '123456789', 'Test Location')
+    mock_create_order.return_value = OrderReceipt(9)
+    asyncio.run(button_handler.execute_async(update, context))
+    asyncio.run(button_handler.execute_async(update, context))
+    mock_create_order.assert_called_once()
+    assert context.bot.send_message.call_count == 2
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,141 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from telegram.error import RetryAfter, BadRequest
+from metrics import InMemoryMetrics
+import outbound_scheduler
+from outbound_scheduler import OutboundScheduler, ScheduledBot, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = bucket.updated
+    assert bucket.delay(now) == 0
+    bucket.take(now)
+    bucket.take(now)
+    assert bucket.delay(now) == pytest.approx(0.1)
+    assert bucket.delay(now + 0.11) == 0
+    assert not bucket.full(now + 0.11)
+    assert bucket.full(now + 0.21)
+    assert TokenBucket(rate=0).delay(now) == 0
+
+
+def test_transactional_messages_overtake_bulk():
+    scheduler = OutboundScheduler(global_rate=0, chat_rate=0, metrics=InMemoryMetrics())
+    started = threading.Event()
+    release = threading.Event()
+    sent = []
+
+    def send(text):
+        started.set()
+        release.wait(5)
+        sent.append(text)
+        return text
+
+    with outbound_scheduler.bulk():
+        first = scheduler.submit(1, send, 'bulk-1')
+        started.wait(5)
+        for index in range(2, 5):
+            scheduler.submit(1, send, f"bulk-{index}")
+    confirmation = scheduler.submit(1, send, 'order')
+    release.set()
+    assert confirmation.result(5) == 'order'
+    assert first.result(5) == 'bulk-1'
+    scheduler.stop()
+    assert sent == ['bulk-1', 'order', 'bulk-2', 'bulk-3', 'bulk-4']
+    assert scheduler.metrics.snapshot()['counters']['outbound.sent{priority=bulk}'] == 4
+
+
+def test_chat_rate_limit():
+    scheduler = OutboundScheduler(global_rate=0, chat_rate=20, chat_burst=1, metrics=InMemoryMetrics())
+    sent = []
+    started = time.monotonic()
+    for _ in range(3):
+        scheduler.submit(1, lambda: sent.append((1, time.monotonic() - started)))
+    scheduler.submit(2, lambda: sent.append((2, time.monotonic() - started)))
+    scheduler.stop()
+    chat_times = [elapsed for chat_id, elapsed in sent if chat_id == 1]
+    assert chat_times[2] >= 0.09
+    assert [elapsed for chat_id, elapsed in sent if chat_id == 2][0] < 0.05
+
+
+def test_global_rate_limit():
+    scheduler = OutboundScheduler(global_rate=20, chat_rate=0, metrics=InMemoryMetrics())
+    started = time.monotonic()
+    for chat_id in range(25):
+        scheduler.submit(chat_id, lambda: None)
+    scheduler.stop()
+    assert time.monotonic() - started >= 0.2
+
+
+def test_global_rate_is_shared_between_processes():
+    scheduler = OutboundScheduler(global_rate=40, chat_rate=0, metrics=InMemoryMetrics(), share=lambda: 0.5)
+    started = time.monotonic()
+    for chat_id in range(25):
+        scheduler.submit(chat_id, lambda: None)
+    scheduler.stop()
+    assert time.monotonic() - started >= 0.2
+    assert scheduler._bucket.rate == 20
+
+
+def test_retry_after_pauses_all_chats():
+    scheduler = OutboundScheduler(global_rate=0, chat_rate=0, metrics=InMemoryMetrics())
+    limited = threading.Event()
+
+    def send():
+        if not limited.is_set():
+            limited.set()
+            raise RetryAfter(0.2)
+        return 'message'
+
+    started = time.monotonic()
+    first = scheduler.submit(1, send)
+    limited.wait(5)
+    other = scheduler.submit(2, lambda: time.monotonic() - started)
+    assert other.result(5) >= 0.2
+    assert first.result(5) == 'message'
+    scheduler.stop()
+
+
+def test_retry_after_is_handled():
+    scheduler = OutboundScheduler(global_rate=0, chat_rate=0, metrics=InMemoryMetrics())
+    send = MagicMock(side_effect=[RetryAfter(0.05), 'message'])
+    started = time.monotonic()
+    future = scheduler.submit(1, send, 'text')
+    assert future.result(5) == 'message'
+    assert time.monotonic() - started >= 0.05
+    assert send.call_count == 2
+    scheduler.stop()
+    assert scheduler.metrics.snapshot()['counters']['outbound.retry_after'] == 1
+
+
+def test_send_error_is_reported_in_future():
+    scheduler = OutboundScheduler(global_rate=0, chat_rate=0, max_retries=0, metrics=InMemoryMetrics())
+    failed = scheduler.submit(1, MagicMock(side_effect=BadRequest('Chat not found')))
+    limited = scheduler.submit(1, MagicMock(side_effect=RetryAfter(1)))
+    delivered = scheduler.submit(1, lambda: 'ok')
+    with pytest.raises(BadRequest):
+        failed.result(5)
+    with pytest.raises(RetryAfter):
+        limited.result(5)
+    assert delivered.result(5) == 'ok'
+    assert scheduler.join(5)
+
+
+@patch('telegram.Bot.send_message')
+def test_scheduled_bot_returns_before_delivery(mock_send_message):
+    release = threading.Event()
+    mock_send_message.side_effect = lambda *args, **kwargs: release.wait(5) and 'message'
+    scheduler = OutboundScheduler(global_rate=0, chat_rate=0, metrics=InMemoryMetrics())
+    bot = ScheduledBot('123456:TEST-TOKEN', outbound=scheduler)
+    future = bot.send_message(chat_id=1, text='Hello')
+    assert not future.done()
+    release.set()
+    assert future.result(5) == 'message'
+    mock_send_message.assert_called_once_with(1, text='Hello')
+    scheduler.stop()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,70 @@
+import datetime
+import pytest
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+from telegram import Message, Chat, PhotoSize
+from telegram.error import BadRequest
+from models import Product
+from photo_cache import PhotoCache
+
+
+def _message(file_id):
+    photo = [PhotoSize(f"{file_id}-small", f"{file_id}-small", 90, 90), PhotoSize(file_id, file_id, 800, 800)]
+    return Message(1, datetime.datetime.now(), Chat(1, 'private'), photo=photo)
+
+
+def _resolved(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_photo_sent_by_file_id_after_first_send(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    cache = PhotoCache(path)
+    row = Product('Pizza1', 'Cheese', 'https://example.com/1.jpg', 100, 1)
+    send = MagicMock(side_effect=[_message('file-1'), _message('file-1')])
+    cache.send([row], send)
+    cache.send([row], send)
+    assert [call[0][0] for call in send.call_args_list] == [['https://example.com/1.jpg'], ['file-1']]
+    cache.close()
+
+    restarted = PhotoCache(path)
+    assert restarted.get(1, 'https://example.com/1.jpg') == 'file-1'
+    # Нове фото в каталозі надсилається за URL
+    assert restarted.get(1, 'https://example.com/1-new.jpg') is None
+    restarted.close()
+
+
+def test_media_group_file_ids_are_remembered(tmp_path):
+    cache = PhotoCache(str(tmp_path / 'state.sqlite3'))
+    rows = [Product(f'Pizza{index}', 'Cheese', f'photo_{index}', 100, index) for index in (1, 2)]
+    send = MagicMock(return_value=_resolved([_message('file-1'), _message('file-2')]))
+    cache.send(rows, send)
+    assert cache.get(1, 'photo_1') == 'file-1'
+    assert cache.get(2, 'photo_2') == 'file-2'
+    cache.send(rows, send)
+    assert send.call_args[0][0] == ['file-1', 'file-2']
+    cache.close()
+
+
+def test_rejected_file_id_is_resent_by_url(tmp_path):
+    cache = PhotoCache(str(tmp_path / 'state.sqlite3'))
+    row = Product('Pizza1', 'Cheese', 'photo_1', 100, 1)
+    cache.remember([row], _message('stale'))
+    rejected = Future()
+    rejected.set_exception(BadRequest('Wrong file identifier/http url specified'))
+    send = MagicMock(side_effect=[rejected, _resolved(_message('file-2'))])
+    cache.send([row], send)
+    assert [call[0][0] for call in send.call_args_list] == [['stale'], ['photo_1']]
+    assert cache.get(1, 'photo_1') == 'file-2'
+
+    send = MagicMock(side_effect=BadRequest('Wrong remote file identifier specified'))
+    with pytest.raises(BadRequest):
+        cache.send([Product('Pizza3', 'Cheese', 'photo_3', 100, 3)], send)
+    send.assert_called_once()
+    cache.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
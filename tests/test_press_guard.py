@@ -0,0 +1,67 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+from metrics import InMemoryMetrics
+from press_guard import PressGuard, press_key
+
+
+def test_repeated_press_gets_first_result():
+    guard = PressGuard(window=60, metrics=InMemoryMetrics())
+    action = MagicMock(side_effect=[1, 2])
+    assert guard.run(('user', 10, 'confirm_order'), action) == (1, False)
+    assert guard.run(('user', 10, 'confirm_order'), action) == (1, True)
+    assert guard.run(('user', 11, 'confirm_order'), action) == (2, False)
+    assert action.call_count == 2
+    assert guard.metrics.snapshot()['counters']['press.duplicate'] == 1
+
+
+def test_concurrent_presses_run_action_once():
+    guard = PressGuard(window=60, metrics=InMemoryMetrics())
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def action():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'receipt'
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(guard.run('key', action)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(guard.run('key', action)))
+    second.start()
+    release.set()
+    first.join()
+    second.join()
+    assert sorted(results) == [('receipt', False), ('receipt', True)]
+    assert calls == [1]
+
+
+def test_failed_press_is_not_remembered():
+    guard = PressGuard(window=60, metrics=InMemoryMetrics())
+    with pytest.raises(ConnectionError):
+        guard.run('key', MagicMock(side_effect=ConnectionError))
+    assert guard.run('key', lambda: 'ok') == ('ok', False)
+
+
+def test_unsuccessful_press_is_not_remembered():
+    guard = PressGuard(window=60, metrics=InMemoryMetrics())
+    action = MagicMock(side_effect=[None, 'receipt'])
+    assert guard.run('key', action) == (None, False)
+    assert guard.run('key', action) == ('receipt', False)
+    assert guard.run('key', action) == ('receipt', True)
+    assert action.call_count == 2
+
+
+def test_press_key():
+    update = MagicMock()
+    update.effective_user.id = 1
+    update.callback_query.message.message_id = 10
+    assert press_key(update, 'confirm_order') == (1, 10, 'confirm_order')
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+import pytest
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    executions = []
+
+    def fetch():
+        executions.append(1)
+        started.set()
+        release.wait(1)
+        return [['Pizza1']]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.do("/menu", fetch)))
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=lambda: results.append(single_flight.do("/menu", fetch))) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    deadline = time.monotonic() + 1
+    while single_flight.stats()['collapsed'] < 5 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(1)
+
+    assert len(executions) == 1
+    assert results == [[['Pizza1']]] * 6
+    assert single_flight.stats() == {'calls': 1, 'collapsed': 5, 'in_flight': 0}
+
+
+def test_errors_propagate_and_are_not_cached():
+    single_flight = SingleFlight()
+
+    def fail():
+        raise ConnectionError("backend down")
+
+    with pytest.raises(ConnectionError):
+        single_flight.do("/menu", fail)
+    assert single_flight.do("/menu", lambda: "ok") == "ok"
+    assert single_flight.stats()['calls'] == 2
+
+
+def test_async_calls_share_one_execution():
+    single_flight = SingleFlight()
+    executions = []
+
+    async def fetch():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return [['Pizza1']]
+
+    async def burst():
+        return await asyncio.gather(*(single_flight.do_async("/menu", fetch) for _ in range(10)))
+
+    assert asyncio.run(burst()) == [[['Pizza1']]] * 10
+    assert len(executions) == 1
+    assert single_flight.stats() == {'calls': 1, 'collapsed': 9, 'in_flight': 0}
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,84 @@
+import sqlite3
+import pytest
+from sqlite_persistence import SQLitePersistence
+from bot_manager import BotManager
+
+TOKEN = '123456:TEST-TOKEN'
+
+
+def rows(path):
+    with sqlite3.connect(path) as connection:
+        return dict(connection.execute('SELECT user_id, data FROM user_data'))
+
+
+def test_state_survives_restart_and_loads_lazily(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    persistence = SQLitePersistence(path)
+    persistence.update_user_data(1, {'processing_order': True})
+    persistence.update_user_data(2, {'processing_order': False})
+    persistence.close()
+
+    user_data = SQLitePersistence(path).get_user_data()
+    assert len(user_data) == 0
+    assert user_data[1] == {'processing_order': True}
+    assert user_data[3] == {}
+    assert set(user_data) == {1, 3}
+
+
+def test_only_changed_users_are_written(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    persistence = SQLitePersistence(path, flush_interval=3600)
+    persistence.update_user_data(1, {'processing_order': True})
+    persistence.update_user_data(2, {'processing_order': True})
+    assert persistence.write_dirty() == 2
+
+    persistence.update_user_data(1, {'processing_order': True})
+    persistence.update_user_data(2, {'processing_order': True})
+    persistence.update_user_data(3, {})
+    assert persistence.write_dirty() == 0
+
+    persistence.update_user_data(2, {})
+    assert persistence.write_dirty() == 1
+    assert rows(path) == {1: b'{"processing_order":true}'}
+    persistence.close()
+
+
+def test_compact_removes_inactive_users(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    persistence = SQLitePersistence(path, retention_days=0)
+    persistence.update_user_data(1, {'processing_order': True})
+    persistence.flush()
+    persistence.compact()
+    assert rows(path) == {}
+
+    persistence.update_user_data(1, {'processing_order': True})
+    assert persistence.write_dirty() == 1
+    persistence.close()
+
+
+def test_stored_state_is_pruned(tmp_path):
+    persistence = SQLitePersistence(str(tmp_path / 'state.sqlite3'), flush_interval=3600, retention_days=0)
+    for user_id in range(1, 4):
+        persistence.update_user_data(user_id, {'processing_order': True})
+    persistence.update_user_data(3, {})
+    assert set(persistence._stored) == {1, 2}
+    persistence.flush()
+    persistence.compact()
+    assert persistence._stored == {}
+    persistence.close()
+
+
+def test_bot_manager_restores_checkout_state():
+    bot_manager = BotManager(TOKEN)
+    dispatcher = bot_manager.updater.dispatcher
+    dispatcher.user_data[5]['processing_order'] = True
+    dispatcher.update_persistence()
+    bot_manager.persistence.close()
+
+    restarted = BotManager(TOKEN)
+    assert restarted.updater.dispatcher.user_data[5] == {'processing_order': True}
+    restarted.persistence.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,106 @@
+import queue
+import pytest
+from unittest.mock import MagicMock, patch
+from telegram import Update
+from metrics import InMemoryMetrics
+from supervisor import HashRing, Supervisor, raw_update_key, _Worker
+from update_scheduler import update_key
+
+TOKEN = '123456:TEST-TOKEN'
+
+
+def message_update(update_id, user_id):
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': 0, 'text': 'hi', 'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'}}}
+
+
+def fake_worker(alive=True):
+    process = MagicMock()
+    process.is_alive.return_value = alive
+    process.exitcode = None if alive else 1
+    return _Worker(process, queue.Queue(), MagicMock())
+
+
+def supervisor(processes=3, **kwargs):
+    supervisor = Supervisor(TOKEN, processes=processes, metrics=InMemoryMetrics(), **kwargs)
+    for index in range(processes):
+        supervisor.workers[index] = fake_worker()
+        supervisor.ring.add(index)
+    return supervisor
+
+
+def test_raw_update_key_matches_update_key():
+    channel_post = {'update_id': 3, 'channel_post': {'message_id': 1, 'date': 0, 'chat': {'id': -5, 'type': 'channel'}}}
+    for data in (message_update(1, 42), channel_post, {'update_id': 4}):
+        assert raw_update_key(data) == update_key(Update.de_json(data, None))
+
+
+def test_hash_ring_moves_only_keys_of_removed_node():
+    ring = HashRing(range(4))
+    before = {key: ring.node_for(key) for key in range(2000)}
+    assert set(before.values()) == {0, 1, 2, 3}
+    ring.remove(2)
+    after = {key: ring.node_for(key) for key in range(2000)}
+    assert all(after[key] == node for key, node in before.items() if node != 2)
+    assert 2 not in after.values()
+    with pytest.raises(LookupError):
+        HashRing().node_for(1)
+
+
+def test_route_keeps_user_on_one_worker():
+    sup = supervisor()
+    for update_id in range(1, 31):
+        sup.route(message_update(update_id, 100 + update_id % 3))
+    for index, worker in sup.workers.items():
+        received = list(worker.inbox.queue)
+        assert all(sup.ring.node_for(raw_update_key(data)) == index for data in received)
+    assert sum(worker.inbox.qsize() for worker in sup.workers.values()) == 30
+    assert sup.metrics.snapshot()['counters']['supervisor.routed'] == 30
+
+
+def test_crashed_worker_is_restarted_with_its_pending_updates():
+    sup = supervisor()
+    user = next(user for user in range(1000) if sup.ring.node_for(user) == 1)
+    sup.route(message_update(1, user))
+    sup.workers[1].process.is_alive.return_value = False
+    restarted = fake_worker()
+    with patch.object(sup, '_spawn', return_value=restarted) as mock_spawn:
+        sup._recover(1)
+    mock_spawn.assert_called_once_with(1)
+    assert sup.workers[1] is restarted
+    assert [data['update_id'] for data in restarted.inbox.queue] == [1]
+    assert len(restarted.restarts) == 1
+    assert sup.metrics.snapshot()['counters']['supervisor.restarts'] == 1
+
+
+def test_worker_crashing_too_often_is_rebalanced():
+    sup = supervisor(max_restarts=2)
+    user = next(user for user in range(1000) if sup.ring.node_for(user) == 1)
+    with patch.object(sup, '_spawn', side_effect=lambda index: fake_worker()):
+        for _ in range(3):
+            sup.workers[1].process.is_alive.return_value = False
+            sup._recover(1)
+    assert 1 not in sup.workers
+    assert sup.ring.nodes == {0, 2}
+    sup.route(message_update(1, user))
+    assert sum(worker.inbox.qsize() for worker in sup.workers.values()) == 1
+    assert sup.metrics.snapshot()['counters']['supervisor.retired'] == 1
+
+
+def test_outbound_limit_is_shared_by_running_workers():
+    sup = supervisor()
+    sup._count_live()
+    assert sup.live.value == 3
+    with patch.object(sup, '_spawn', side_effect=lambda index: fake_worker()):
+        sup.resize(1, timeout=0)
+    # Вилучені процеси ще дочікуються своїх повідомлень
+    assert sup.live.value == 3
+    for worker in sup._retired:
+        worker.process.is_alive.return_value = False
+    sup._count_live()
+    assert sup.live.value == 1
+
+
+if __name__ == "__main__":
+    pytest.main()
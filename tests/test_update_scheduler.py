@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from metrics import InMemoryMetrics
+from update_scheduler import UpdateScheduler, AsyncUpdateScheduler, update_key
+
+
+def test_update_key():
+    update = MagicMock()
+    update.effective_user.id = 7
+    assert update_key(update) == 7
+    update.effective_user = None
+    update.effective_chat.id = -100
+    assert update_key(update) == -100
+    update.effective_chat = None
+    update.update_id = 5
+    assert update_key(update) == ('update', 5)
+
+
+def test_serializes_per_key_and_parallelizes_across_keys():
+    lock = threading.Lock()
+    processed = {1: [], 2: []}
+    active = {1: 0, 2: 0}
+    overlap = []
+    per_key = []
+
+    def process(item):
+        key, index = item
+        with lock:
+            active[key] += 1
+            overlap.append(sum(active.values()))
+            per_key.append(active[key])
+        time.sleep(0.01)
+        with lock:
+            active[key] -= 1
+            processed[key].append(index)
+
+    scheduler = UpdateScheduler(process, workers=4, max_pending=10, metrics=InMemoryMetrics()).start()
+    for index in range(5):
+        scheduler.submit(1, (1, index))
+        scheduler.submit(2, (2, index))
+    assert scheduler.join(timeout=5)
+    scheduler.stop()
+    assert processed == {1: [0, 1, 2, 3, 4], 2: [0, 1, 2, 3, 4]}
+    assert max(per_key) == 1
+    assert max(overlap) == 2
+
+
+def test_bounded_queue_rejects_and_reports_depth():
+    metrics = InMemoryMetrics()
+    release = threading.Event()
+    scheduler = UpdateScheduler(lambda item: release.wait(5), workers=1, max_pending=2, metrics=metrics).start()
+    assert scheduler.submit(1, 'a')
+    assert scheduler.submit(1, 'b')
+    assert not scheduler.submit(1, 'c')
+    assert scheduler.stats() == {'keys': 1, 'pending': 2, 'max_depth': 2}
+    release.set()
+    scheduler.stop(timeout=5)
+    snapshot = metrics.snapshot()
+    assert snapshot['counters']['scheduler.rejected'] == 1
+    assert snapshot['histograms']['scheduler.queue_depth']['max'] == 2
+    assert scheduler.stats() == {'keys': 0, 'pending': 0, 'max_depth': 0}
+
+
+def test_async_scheduler_orders_per_key():
+    events = []
+
+    async def process(item):
+        key, index = item
+        events.append(('start', key, index))
+        await asyncio.sleep(0.01)
+        events.append(('end', key, index))
+
+    async def run():
+        scheduler = AsyncUpdateScheduler(process, max_pending=10, metrics=InMemoryMetrics())
+        done = []
+        for index in range(3):
+            scheduler.submit('a', ('a', index), on_done=lambda: done.append(1))
+        scheduler.submit('b', ('b', 0))
+        await scheduler.join()
+        return done
+
+    assert len(asyncio.run(run())) == 3
+    per_key = [(kind, index) for kind, key, index in events if key == 'a']
+    assert per_key == [('start', 0), ('end', 0), ('start', 1), ('end', 1), ('start', 2), ('end', 2)]
+    assert events.index(('start', 'b', 0)) < events.index(('end', 'a', 0))
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,88 @@
+import http.client
+import json
+import pytest
+import requests
+from unittest.mock import MagicMock
+from telegram import Bot, Update
+from metrics import InMemoryMetrics
+from webhook_server import WebhookServer, SECRET_HEADER
+
+
+def update(update_id):
+    return {'update_id': update_id, 'callback_query': {
+        'id': str(update_id), 'chat_instance': '1', 'data': 'menu',
+        'from': {'id': update_id, 'is_bot': False, 'first_name': 'User'}}}
+
+
+@pytest.fixture
+def webhook():
+    dispatcher = MagicMock()
+    dispatcher.bot = Bot('123456:TEST-TOKEN')
+    server = WebhookServer(dispatcher, host='127.0.0.1', port=0, path='/hook', secret_token='s3cret',
+                           max_body=4096, metrics=InMemoryMetrics()).start()
+    yield server
+    server.stop()
+
+
+def post(webhook, body, secret='s3cret', path='/hook'):
+    headers = {SECRET_HEADER: secret} if secret else {}
+    return requests.post(f"http://127.0.0.1:{webhook.port}{path}", data=body, headers=headers, timeout=5)
+
+
+def test_accepts_single_update_and_batch(webhook):
+    assert post(webhook, json.dumps(update(1))).status_code == 200
+    assert post(webhook, json.dumps([update(2), update(3)])).status_code == 200
+    updates = [call.args[0] for call in webhook.dispatcher.process_update.call_args_list]
+    assert all(isinstance(item, Update) for item in updates)
+    assert [item.update_id for item in updates] == [1, 2, 3]
+    assert updates[0].callback_query.data == 'menu'
+    assert webhook.metrics.snapshot()['counters']['webhook.updates'] == 3
+
+
+def test_rejects_bad_requests(webhook):
+    assert post(webhook, json.dumps(update(1)), secret='wrong').status_code == 403
+    assert post(webhook, json.dumps(update(1)), secret=None).status_code == 403
+    assert post(webhook, json.dumps(update(1)), path='/other').status_code == 404
+    assert post(webhook, b'{not json').status_code == 400
+    assert post(webhook, json.dumps({'ok': True})).status_code == 400
+    assert post(webhook, b'x' * 5000).status_code == 413
+    webhook.dispatcher.process_update.assert_not_called()
+
+
+@pytest.mark.parametrize('length', ['abc', '-5'])
+def test_rejects_invalid_content_length(webhook, length):
+    connection = http.client.HTTPConnection('127.0.0.1', webhook.port, timeout=5)
+    connection.putrequest('POST', '/hook')
+    connection.putheader(SECRET_HEADER, 's3cret')
+    connection.putheader('Content-Length', length)
+    connection.endheaders()
+    assert connection.getresponse().status == 400
+    connection.close()
+    webhook.dispatcher.process_update.assert_not_called()
+
+
+def test_stop_drains_and_refuses_new_requests(webhook):
+    assert post(webhook, json.dumps(update(1))).status_code == 200
+    webhook.stop()
+    with pytest.raises(requests.ConnectionError):
+        post(webhook, json.dumps(update(2)))
+    assert webhook.dispatcher.process_update.call_count == 1
+
+
+def test_generates_secret_when_not_configured():
+    dispatcher = MagicMock()
+    first = WebhookServer(dispatcher, host='127.0.0.1', port=0, secret_token=None)
+    second = WebhookServer(dispatcher, host='127.0.0.1', port=0, secret_token=None)
+    try:
+        assert len(first.secret_token) >= 32
+        assert first.secret_token != second.secret_token
+        assert not first.authorized(None)
+        assert not first.authorized('')
+        assert first.authorized(first.secret_token)
+    finally:
+        first.server.server_close()
+        second.server.server_close()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+import config
+from metrics import metrics as default_metrics
+
+
+def update_key(update):
+    """
+    Повертає ключ, за яким оновлення впорядковуються: ID користувача, а якщо його немає - ID чату.
+
+    Параметри:
+        update (Update): Оновлення від Telegram API.
+
+    Повертає:
+        Ключ черги; оновлення без користувача та чату отримують власний ключ і не чекають інших.
+    """
+    user = update.effective_user
+    if user is not None:
+        return user.id
+    chat = update.effective_chat
+    if chat is not None:
+        return chat.id
+    return ('update', update.update_id)
+
+
+class _KeyedQueues:
+    """
+    Черги оновлень для кожного ключа з обмеженою довжиною та метриками глибини.
+    """
+
+    def __init__(self, max_pending, metrics):
+        self.max_pending = max_pending
+        self.metrics = default_metrics if metrics is None else metrics
+        self._queues = {}
+
+    def _push(self, key, item):
+        """
+        Додає елемент у чергу ключа.
+
+        Повертає:
+            tuple: (додано, черга була порожня - тобто ключ треба взяти в обробку).
+        """
+        pending = self._queues.get(key)
+        if pending is None:
+            pending = deque()
+            self._queues[key] = pending
+        elif len(pending) >= self.max_pending:
+            self.metrics.increment('scheduler.rejected')
+            logging.warning(f"Update queue for {key} is full, update dropped")
+            return False, False
+        pending.append((item, time.monotonic()))
+        self.metrics.observe('scheduler.queue_depth', len(pending))
+        return True, len(pending) == 1
+
+    def _peek(self, key):
+        item, enqueued_at = self._queues[key][0]
+        self.metrics.observe('scheduler.wait', time.monotonic() - enqueued_at)
+        return item
+
+    def _pop(self, key):
+        """
+        Видаляє оброблений елемент. Повертає True, якщо в черзі ключа ще є елементи.
+        """
+        pending = self._queues[key]
+        pending.popleft()
+        if pending:
+            return True
+        del self._queues[key]
+        return False
+
+    def stats(self):
+        """
+        Повертає поточний стан черг.
+
+        Повертає:
+            dict: Кількість ключів з оновленнями, загальна кількість оновлень та найдовша черга.
+        """
+        depths = [len(pending) for pending in list(self._queues.values())]
+        return {'keys': len(depths), 'pending': sum(depths), 'max_depth': max(depths, default=0)}
+
+
+class UpdateScheduler(_KeyedQueues):
+    """
+    Планувальник оновлень для пулу потоків.
+
+    Оновлення одного користувача обробляються строго по черзі в порядку надходження, а оновлення
+    різних користувачів - паралельно на workers потоках. Черга кожного користувача обмежена
+    max_pending оновленнями; надлишкові оновлення відкидаються з попередженням у лозі.
+    """
+
+    def __init__(self, process, workers=config.bot_scheduler_workers, max_pending=config.bot_max_pending_per_user,
+                 metrics=None):
+        """
+        Параметри:
+            process (callable): Обробник одного оновлення.
+            workers (int): Кількість потоків обробки.
+            max_pending (int): Максимальна кількість оновлень у черзі одного користувача.
+            metrics (MetricsSink): Приймач метрик (за замовчуванням спільний InMemoryMetrics).
+        """
+        super().__init__(max_pending, metrics)
+        self.process = process
+        self.workers = workers
+        self._ready = queue.Queue()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._threads = []
+
+    def start(self):
+        """
+        Запускає потоки обробки.
+        """
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"update-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, key, update):
+        """
+        Ставить оновлення в чергу користувача.
+
+        Параметри:
+            key: Ключ черги (див. update_key).
+            update: Оновлення.
+
+        Повертає:
+            bool: False, якщо черга користувача переповнена і оновлення відкинуто.
+        """
+        with self._lock:
+            accepted, schedule = self._push(key, update)
+        if schedule:
+            self._ready.put(key)
+        return accepted
+
+    def join(self, timeout=None):
+        """
+        Чекає, поки всі поставлені оновлення будуть оброблені.
+
+        Повертає:
+            bool: True, якщо всі черги спорожніли до закінчення тайм-ауту.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._queues, timeout)
+
+    def stop(self, timeout=None):
+        """
+        Дочікується обробки поставлених оновлень і зупиняє потоки.
+        """
+        self.join(timeout)
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._ready.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return super().stats()
+
+    def _run(self):
+        while True:
+            key = self._ready.get()
+            if key is None:
+                return
+            with self._lock:
+                update = self._peek(key)
+            try:
+                self.process(update)
+            except Exception as e:
+                logging.error(f"Update scheduler process error: {e}", exc_info=True)
+            with self._lock:
+                more = self._pop(key)
+                if not self._queues:
+                    self._idle.notify_all()
+            if more:
+                # Ключ повертається в кінець черги, щоб активний користувач не витісняв інших
+                self._ready.put(key)
+
+
+class AsyncUpdateScheduler(_KeyedQueues):
+    """
+    Планувальник оновлень для циклу подій.
+
+    Для кожного користувача з оновленнями працює одна задача, що обробляє його оновлення по черзі;
+    оновлення різних користувачів обробляються одночасно.
+    """
+
+    def __init__(self, process, max_pending=config.bot_max_pending_per_user, metrics=None):
+        """
+        Параметри:
+            process (coroutine function): Асинхронний обробник одного оновлення.
+            max_pending (int): Максимальна кількість оновлень у черзі одного користувача.
+            metrics (MetricsSink): Приймач метрик (за замовчуванням спільний InMemoryMetrics).
+        """
+        super().__init__(max_pending, metrics)
+        self.process = process
+        self._tasks = set()
+
+    def submit(self, key, update, on_done=None):
+        """
+        Ставить оновлення в чергу користувача. Викликається з потоку циклу подій.
+
+        Параметри:
+            key: Ключ черги (див. update_key).
+            update: Оновлення.
+            on_done (callable, optional): Викликається після обробки або відкидання оновлення.
+
+        Повертає:
+            bool: False, якщо черга користувача переповнена і оновлення відкинуто.
+        """
+        accepted, schedule = self._push(key, (update, on_done))
+        if not accepted:
+            if on_done is not None:
+                on_done()
+            return False
+        if schedule:
+            task = asyncio.get_running_loop().create_task(self._drain(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def join(self):
+        """
+        Чекає, поки всі поставлені оновлення будуть оброблені.
+        """
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _drain(self, key):
+        more = True
+        while more:
+            update, on_done = self._peek(key)
+            try:
+                await self.process(update)
+            except Exception as e:
+                logging.error(f"Update scheduler process error: {e}", exc_info=True)
+            finally:
+                more = self._pop(key)
+                if on_done is not None:
+                    on_done()
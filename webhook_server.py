@@ -0,0 +1,163 @@
+import hmac
+import logging
+import secrets
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from telegram import Update
+import config
+import models
+from metrics import metrics as default_metrics
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class _WebhookHTTPServer(ThreadingHTTPServer):
+    # Черга з'єднань розрахована на max_connections одночасних з'єднань від Telegram
+    request_queue_size = max(128, config.bot_webhook_max_connections)
+    # Потоки запитів не демонічні: server_close дочікується їх завершення
+    daemon_threads = False
+
+
+class WebhookServer:
+    """
+    Вбудований HTTP-сервер для отримання оновлень Telegram через вебхук.
+
+    Перевіряє секретний токен із заголовка X-Telegram-Bot-Api-Secret-Token (якщо токен не заданий,
+    сервер генерує випадковий, тож запити без токена не приймаються ніколи), розбирає тіло
+    запиту (одне оновлення або масив оновлень) і передає оновлення одразу диспетчеру,
+    без проміжної черги getUpdates. Під час зупинки перестає приймати нові запити та
+    дочікується завершення тих, що вже приймаються.
+    """
+
+    def __init__(self, dispatcher, host=config.bot_webhook_listen, port=config.bot_webhook_port,
+                 path=config.bot_webhook_path, secret_token=config.bot_webhook_secret,
+                 max_body=config.bot_webhook_max_body, metrics=None):
+        """
+        Параметри:
+            dispatcher (Dispatcher): Диспетчер, якому передаються оновлення.
+            host (str): Адреса для прослуховування.
+            port (int): Порт (0 - вибрати вільний).
+            path (str): Шлях вебхука.
+            secret_token (str): Секретний токен для setWebhook; None - згенерувати випадковий
+                (доступний в атрибуті secret_token).
+            max_body (int): Максимальний розмір тіла запиту у байтах.
+            metrics (MetricsSink): Приймач метрик (за замовчуванням спільний InMemoryMetrics).
+        """
+        self.dispatcher = dispatcher
+        self.path = path
+        self.secret_token = secret_token or secrets.token_urlsafe(32)
+        self.max_body = max_body
+        self.metrics = default_metrics if metrics is None else metrics
+        self.server = _WebhookHTTPServer((host, port), self._handler_class())
+        self.draining = False
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        """
+        Запускає сервер у фоновому потоці.
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, name='webhook-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Припиняє приймати запити та дочікується обробки запитів, що вже надійшли.
+        """
+        self.draining = True
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def authorized(self, token):
+        """
+        Перевіряє секретний токен запиту за сталий час.
+
+        Параметри:
+            token (str): Значення заголовка X-Telegram-Bot-Api-Secret-Token.
+
+        Повертає:
+            bool: True, якщо токен збігається.
+        """
+        return hmac.compare_digest((token or '').encode(), self.secret_token.encode())
+
+    def handle(self, body):
+        """
+        Розбирає тіло запиту та передає оновлення диспетчеру.
+
+        Параметри:
+            body (bytes): JSON з одним оновленням або масивом оновлень.
+
+        Повертає:
+            int: Кількість переданих оновлень.
+
+        Піднімає:
+            ValueError: Якщо тіло не є оновленням або масивом оновлень.
+        """
+        data = models.loads(body)
+        batch = data if isinstance(data, list) else [data]
+        if not all(isinstance(item, dict) and 'update_id' in item for item in batch):
+            raise ValueError("Webhook body is not an update")
+        bot = self.dispatcher.bot
+        for item in batch:
+            self.dispatcher.process_update(Update.de_json(item, bot))
+        self.metrics.increment('webhook.updates', len(batch))
+        return len(batch)
+
+    def _handler_class(self):
+        webhook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+            # Бездіяльні keep-alive з'єднання закриваються, щоб не затримувати зупинку сервера
+            timeout = 5
+
+            def do_POST(self):
+                if self.path != webhook.path:
+                    return self._reply(404)
+                if not webhook.authorized(self.headers.get(SECRET_HEADER)):
+                    webhook.metrics.increment('webhook.rejected', reason='secret')
+                    return self._reply(403)
+                length = None
+                try:
+                    length = int(self.headers.get('Content-Length') or 0)
+                    if length < 0:
+                        raise ValueError(f"Invalid Content-Length: {length}")
+                    if length > webhook.max_body:
+                        webhook.metrics.increment('webhook.rejected', reason='size')
+                        self.close_connection = True
+                        return self._reply(413)
+                    webhook.handle(self.rfile.read(length))
+                except ValueError as e:
+                    logging.error(f"Webhook request error: {e}", exc_info=True)
+                    webhook.metrics.increment('webhook.rejected', reason='body')
+                    if length is None or length < 0:
+                        # Тіло запиту не прочитане, тож з'єднання не можна використати повторно
+                        self.close_connection = True
+                    return self._reply(400)
+                except Exception as e:
+                    logging.error(f"Webhook handle error: {e}", exc_info=True)
+                    return self._reply(500)
+                self._reply(200)
+
+            def do_GET(self):
+                self._reply(405)
+
+            def _reply(self, status):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                if webhook.draining:
+                    self.send_header('Connection', 'close')
+                    self.close_connection = True
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler